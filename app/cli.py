@@ -0,0 +1,263 @@
+# app/cli.py
+"""
+Headless batch mode: runs a file of questions (or SQL statements) against a database without the GUI.
+
+Usage, from the project root:
+    python -m app.cli questions.txt --database shop --output-dir reports/ [--format csv|jsonl|parquet]
+
+Input is either a text file with one question per line (blank lines and lines starting with #
+are skipped; lines starting with "sql:" are run as SQL), or a .jsonl file of
+{"id": ..., "question": ...} / {"id": ..., "sql": ...} objects. With --sql every line is SQL.
+
+Questions are translated with at most --llm-concurrency Gemini requests in flight and run with at
+most --db-concurrency MySQL queries in flight, so translation of later questions overlaps with
+execution of earlier ones. Each result is streamed to <output-dir>/<id>.<format> chunk by chunk,
+and summary.jsonl gets one line per item (SQL, status, row count, per-stage latency) as it
+finishes, which makes two runs easy to diff when a prompt changes. Overall throughput and
+latency percentiles are printed at the end. The exit status is 1 if any item failed.
+"""
+import argparse
+import asyncio
+import getpass
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))) # Modules import each other as services.*, core.*
+
+from core.config import (
+    MAX_RESULT_ROWS, MAX_RESULT_BYTES, SCHEMA_PROMPT_TOKEN_BUDGET, CLI_LLM_CONCURRENCY, CLI_DB_CONCURRENCY,
+    GUARD_MAX_ROWS_EXAMINED, GUARD_WARN_ROWS_EXAMINED, GUARD_DEFAULT_LIMIT, GUARD_MAX_EXECUTION_MS
+)
+from core.lazy import lazy_import
+from core.tracing import tracer, percentile
+
+# Not needed for --help or argument errors
+db_service = lazy_import("services.db_service")
+export_service = lazy_import("services.export_service")
+nlp_service = lazy_import("services.nlp_service")
+query_guard = lazy_import("services.query_guard")
+schema_catalog = lazy_import("services.schema_catalog")
+schema_retrieval = lazy_import("services.schema_retrieval")
+
+OUTPUT_FORMATS = ("csv", "jsonl", "parquet") # export_service.EXPORT_FORMATS, without importing it for --help
+_SQL_PREFIX_RE = re.compile(r"^sql:\s*", re.IGNORECASE)
+_UNSAFE_FILENAME_RE = re.compile(r"[^\w.-]+")
+
+
+class WorkItem:
+    """One line of the workload: a natural-language question or a SQL statement."""
+    def __init__(self, item_id, text, is_sql=False):
+        self.item_id = str(item_id)
+        self.text = text
+        self.is_sql = is_sql
+
+
+def load_workload(path, all_sql=False):
+    """Reads WorkItems from a text or .jsonl file (see the module docstring for the format)."""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            default_id = f"q{line_no:04d}"
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                if "sql" in record:
+                    items.append(WorkItem(record.get("id", default_id), record["sql"], is_sql=True))
+                else:
+                    items.append(WorkItem(record.get("id", default_id), record["question"]))
+            elif all_sql or _SQL_PREFIX_RE.match(line):
+                items.append(WorkItem(default_id, _SQL_PREFIX_RE.sub("", line), is_sql=True))
+            else:
+                items.append(WorkItem(default_id, line))
+    return items
+
+
+class BatchRunner:
+    """
+    Runs WorkItems concurrently on one event loop. The blocking service calls (Gemini, MySQL) run in
+    worker threads via asyncio.to_thread; two semaphores bound how many of each are in flight.
+    """
+    def __init__(self, pool, output_dir, output_format="csv", llm_concurrency=CLI_LLM_CONCURRENCY,
+                 db_concurrency=CLI_DB_CONCURRENCY, max_rows=MAX_RESULT_ROWS, default_limit=GUARD_DEFAULT_LIMIT,
+                 translate_only=False, use_translation_cache=True):
+        self.pool = pool
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.llm_concurrency = llm_concurrency
+        self.db_concurrency = db_concurrency
+        self.max_rows = max_rows
+        self.default_limit = default_limit
+        self.translate_only = translate_only
+        self.use_translation_cache = use_translation_cache
+        self.catalog = None
+        self.basic_schema = None
+
+    async def run(self, items):
+        """Processes all items and returns their summary records, in input order."""
+        loop = asyncio.get_running_loop()
+        # One thread per possible in-flight call; the default executor may be smaller than that
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.llm_concurrency + self.db_concurrency))
+        self._llm_slots = asyncio.Semaphore(self.llm_concurrency)
+        self._db_slots = asyncio.Semaphore(self.db_concurrency)
+        self._done = 0
+        self._total = len(items)
+
+        if any(not item.is_sql for item in items):
+            await asyncio.to_thread(self._load_schema)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        summary_path = os.path.join(self.output_dir, "summary.jsonl")
+        with open(summary_path, "w", encoding="utf-8") as summary_file:
+            async def _run_and_record(item):
+                with tracer.trace("cli.item", id=item.item_id): # Each gather() task has its own context
+                    record = await self._run_item(item)
+                summary_file.write(json.dumps(record, default=str) + "\n")
+                summary_file.flush()
+                self._report_progress(record)
+                return record
+            return await asyncio.gather(*(_run_and_record(item) for item in items))
+
+    def _load_schema(self):
+        self.catalog = schema_catalog.get_schema_catalog(self.pool)
+        if not self.catalog:
+            with self.pool.connection() as connection:
+                self.basic_schema = db_service.get_basic_schema_string(connection)
+
+    async def _run_item(self, item):
+        record = {"id": item.item_id, "input": item.text, "sql": item.text if item.is_sql else None,
+                  "status": "ok", "error": None, "warnings": [], "rows": 0, "output": None,
+                  "translate_ms": 0.0, "guard_ms": 0.0, "execute_ms": 0.0}
+        started = time.perf_counter()
+        try:
+            if not item.is_sql:
+                async with self._llm_slots:
+                    stage_start = time.perf_counter()
+                    sql = await asyncio.to_thread(self._translate, item.text)
+                    record["translate_ms"] = (time.perf_counter() - stage_start) * 1000
+                record["sql"] = sql
+                if not sql or sql.startswith("Error:"):
+                    record["status"], record["error"] = "error", sql or "Failed to generate SQL."
+            if record["status"] == "ok" and not self.translate_only:
+                async with self._db_slots:
+                    await asyncio.to_thread(self._execute, item, record["sql"], record)
+        except Exception as e:
+            record["status"], record["error"] = "error", f"{type(e).__name__}: {e}"
+        # Time actually spent on the item; the rest of the wall time was queueing for a slot
+        record["latency_ms"] = record["translate_ms"] + record["guard_ms"] + record["execute_ms"]
+        record["wall_ms"] = (time.perf_counter() - started) * 1000
+        for key in ("translate_ms", "guard_ms", "execute_ms", "latency_ms", "wall_ms"):
+            record[key] = round(record[key], 1)
+        return record
+
+    def _translate(self, question):
+        if self.catalog:
+            schema_str = schema_retrieval.select_relevant_schema(self.catalog, question, SCHEMA_PROMPT_TOKEN_BUDGET)
+            fingerprint = self.catalog.fingerprint
+        else:
+            schema_str, fingerprint = self.basic_schema, None
+        return nlp_service.nl_to_sql_stream(question, schema_str, fingerprint, use_cache=self.use_translation_cache)
+
+    def _execute(self, item, sql, record):
+        """Runs in a worker thread: guard the SQL, then stream its result to the output file."""
+        stage_start = time.perf_counter()
+        guard = query_guard.guard_query(
+            self.pool, sql,
+            max_rows_examined=GUARD_MAX_ROWS_EXAMINED, warn_rows_examined=GUARD_WARN_ROWS_EXAMINED,
+            default_limit=self.default_limit, max_execution_ms=GUARD_MAX_EXECUTION_MS
+        )
+        record["guard_ms"] = (time.perf_counter() - stage_start) * 1000
+        record["warnings"] = guard.warnings
+        if guard.error:
+            record["status"], record["error"] = "rejected", guard.error
+            return
+
+        stage_start = time.perf_counter()
+        path = os.path.join(self.output_dir, f"{_UNSAFE_FILENAME_RE.sub('_', item.item_id)}.{self.output_format}")
+        try:
+            record["rows"] = export_service.export_query(self.pool, guard.sql, path, self.output_format,
+                                                         max_rows=self.max_rows, max_bytes=MAX_RESULT_BYTES)
+            record["output"] = path if record["rows"] else None
+        except db_service.Error as e:
+            record["status"], record["error"] = "error", f"Error executing query: {e}"
+        finally:
+            record["execute_ms"] = (time.perf_counter() - stage_start) * 1000
+
+    def _report_progress(self, record):
+        self._done += 1
+        detail = f"{record['rows']:,} rows" if record["status"] == "ok" else record["error"]
+        print(f"[{self._done:>{len(str(self._total))}}/{self._total}] {record['id']} {record['status']}: "
+              f"{detail} ({record['latency_ms']:.0f} ms)")
+
+
+def print_report(records, wall_s):
+    failed = [r for r in records if r["status"] != "ok"]
+    print(f"\n{len(records)} items in {wall_s:.1f} s: {len(records) - len(failed)} ok, {len(failed)} failed")
+    if not records:
+        return
+    print(f"Throughput: {len(records) / wall_s:.2f} items/s")
+    print(f"{'latency ms':<12} {'p50':>8} {'p95':>8} {'max':>8}")
+    for label, key in (("total", "latency_ms"), ("translate", "translate_ms"),
+                       ("guard", "guard_ms"), ("execute", "execute_ms")):
+        values = [r[key] for r in records if r[key]]
+        if values:
+            print(f"{label:<12} {percentile(values, 50):>8.0f} {percentile(values, 95):>8.0f} {max(values):>8.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a file of questions or SQL statements without the GUI.")
+    parser.add_argument("workload", help="Text file (one question per line) or .jsonl file")
+    parser.add_argument("--output-dir", required=True, help="Where result files and summary.jsonl are written")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv")
+    parser.add_argument("--host", default=os.getenv("MYSQL_HOST", "localhost"))
+    parser.add_argument("--user", default=os.getenv("MYSQL_USER", "root"))
+    parser.add_argument("--password", default=os.getenv("MYSQL_PWD"), help="Defaults to $MYSQL_PWD, else prompts")
+    parser.add_argument("--database", default=os.getenv("MYSQL_DATABASE"), required=not os.getenv("MYSQL_DATABASE"))
+    parser.add_argument("--sql", action="store_true", help="Every line of a text workload is SQL")
+    parser.add_argument("--llm-concurrency", type=int, default=CLI_LLM_CONCURRENCY)
+    parser.add_argument("--db-concurrency", type=int, default=CLI_DB_CONCURRENCY)
+    parser.add_argument("--max-rows", type=int, default=MAX_RESULT_ROWS, help="Rows written per item at most")
+    parser.add_argument("--default-limit", type=int, default=GUARD_DEFAULT_LIMIT,
+                        help="LIMIT added to unbounded SELECTs (0 = none)")
+    parser.add_argument("--translate-only", action="store_true", help="Only generate SQL; nothing is executed")
+    parser.add_argument("--no-translation-cache", action="store_true",
+                        help="Always ask Gemini, e.g. to compare prompt changes")
+    parser.add_argument("--trace-out", help="Write the run's per-stage trace spans (the last TRACE_BUFFER_SIZE) to this JSONL file")
+    args = parser.parse_args(argv)
+    if args.format not in export_service.available_formats():
+        parser.error(f"--format {args.format} needs pyarrow (pip install pyarrow)")
+
+    items = load_workload(args.workload, all_sql=args.sql)
+    if not items:
+        print(f"No questions found in {args.workload}.")
+        return 0
+    password = args.password if args.password is not None else getpass.getpass(f"MySQL password for {args.user}: ")
+
+    pool = db_service.create_connection_pool(args.host, args.user, password, args.database,
+                                             pool_size=args.db_concurrency)
+    if not pool:
+        return 2
+    runner = BatchRunner(
+        pool, args.output_dir, args.format,
+        llm_concurrency=args.llm_concurrency, db_concurrency=args.db_concurrency,
+        max_rows=args.max_rows, default_limit=args.default_limit,
+        translate_only=args.translate_only, use_translation_cache=not args.no_translation_cache
+    )
+    start = time.perf_counter()
+    try:
+        records = asyncio.run(runner.run(items))
+    finally:
+        pool.close()
+    print_report(records, time.perf_counter() - start)
+    if args.trace_out:
+        print(f"Wrote {tracer.export_jsonl(args.trace_out):,} trace spans to {args.trace_out}")
+    return 1 if any(r["status"] != "ok" for r in records) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,8 @@
 # app/core/app_state.py
 class AppState:
     def __init__(self):
-        self.db_connection = None
+        self.db_pool = None # db_service.ConnectionPool; check out a connection per task
         self.db_name = None
 
 # Global instance (simple approach for now)
-current_app_state = AppState() 
\ No newline at end of file
+current_app_state = AppState()
\ No newline at end of file
@@ -7,4 +7,64 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
 # Basic check
 if not GOOGLE_API_KEY:
-    print("WARNING: GOOGLE_API_KEY not found in .env file or environment variables.") 
\ No newline at end of file
+    print("WARNING: GOOGLE_API_KEY not found in .env file or environment variables.") 
+
+# Result paging and budgets for the Converse tab (see db_service.LazyResult)
+RESULT_PAGE_SIZE = int(os.getenv("RESULT_PAGE_SIZE", "500"))
+MAX_RESULT_ROWS = int(os.getenv("MAX_RESULT_ROWS", "100000"))
+MAX_RESULT_BYTES = int(os.getenv("MAX_RESULT_MB", "256")) * 1024 * 1024
+
+# Local cache directory (schema catalog, translation cache, ...)
+CACHE_DIR = os.getenv("DB_CONVERSE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".db_converse"))
+# How long a cached schema is trusted before its fingerprint is re-checked against the server
+SCHEMA_FINGERPRINT_TTL_S = int(os.getenv("SCHEMA_FINGERPRINT_TTL_S", "60"))
+
+# Dashboard exact row counts: parallel COUNT(*) queries and their per-table time limit
+ROW_COUNT_CONCURRENCY = int(os.getenv("ROW_COUNT_CONCURRENCY", "4"))
+ROW_COUNT_TIMEOUT_S = float(os.getenv("ROW_COUNT_TIMEOUT_S", "10"))
+
+# NL-to-SQL translation cache (see services.translation_cache)
+TRANSLATION_CACHE_ENABLED = os.getenv("TRANSLATION_CACHE_ENABLED", "1") == "1"
+TRANSLATION_CACHE_TTL_S = int(os.getenv("TRANSLATION_CACHE_TTL_S", str(7 * 24 * 3600)))
+TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "5000"))
+# Token-set similarity (0..1) for matching near-identical phrasings; 0 disables the fuzzy tier
+TRANSLATION_CACHE_FUZZY_THRESHOLD = float(os.getenv("TRANSLATION_CACHE_FUZZY_THRESHOLD", "0"))
+
+# Query result cache (see db_service.ResultCache). Results younger than the staleness
+# bound are reused without asking the server; older ones only if their tables are unchanged.
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_MB", "128")) * 1024 * 1024
+RESULT_CACHE_MAX_STALENESS_S = float(os.getenv("RESULT_CACHE_MAX_STALENESS_S", "0"))
+
+# Approximate token budget for the schema section of the NL-to-SQL prompt
+SCHEMA_PROMPT_TOKEN_BUDGET = int(os.getenv("SCHEMA_PROMPT_TOKEN_BUDGET", "2000"))
+
+# Pre-execution cost guard (see services.query_guard)
+GUARD_MAX_ROWS_EXAMINED = int(os.getenv("GUARD_MAX_ROWS_EXAMINED", "50000000"))
+GUARD_WARN_ROWS_EXAMINED = int(os.getenv("GUARD_WARN_ROWS_EXAMINED", "1000000"))
+GUARD_DEFAULT_LIMIT = int(os.getenv("GUARD_DEFAULT_LIMIT", "10000"))
+GUARD_MAX_EXECUTION_MS = int(os.getenv("GUARD_MAX_EXECUTION_MS", "30000"))
+
+# Headless batch runner (app/cli.py): concurrent Gemini requests and concurrent MySQL queries
+CLI_LLM_CONCURRENCY = int(os.getenv("CLI_LLM_CONCURRENCY", "4"))
+CLI_DB_CONCURRENCY = int(os.getenv("CLI_DB_CONCURRENCY", "4"))
+
+# Per-stage tracing (see core.tracing): spans kept in memory for the Performance tab and JSONL export
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1") == "1"
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "5000"))
+
+# Local analytical snapshot (see services.snapshot_service): selected tables mirrored into DuckDB
+# (SQLite without duckdb installed) and used for read-only analytical queries while fresh enough
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "0") == "1"
+SNAPSHOT_ENGINE = os.getenv("SNAPSHOT_ENGINE", "auto") # auto, duckdb or sqlite
+SNAPSHOT_TABLES = [t.strip() for t in os.getenv("SNAPSHOT_TABLES", "").split(",") if t.strip()] # Empty: all tables
+# Watermark columns for incremental copies, e.g. "orders.updated_at,customers.modified_on";
+# columns named updated_at, modified_at, last_modified, ... are picked up without this
+SNAPSHOT_WATERMARK_COLUMNS = dict(
+    entry.strip().split(".", 1) for entry in os.getenv("SNAPSHOT_WATERMARK_COLUMNS", "").split(",") if "." in entry
+)
+SNAPSHOT_SYNC_INTERVAL_S = float(os.getenv("SNAPSHOT_SYNC_INTERVAL_S", "300"))
+SNAPSHOT_MAX_STALENESS_S = float(os.getenv("SNAPSHOT_MAX_STALENESS_S", "900")) # Older tables are queried in MySQL
+SNAPSHOT_FULL_REFRESH_S = float(os.getenv("SNAPSHOT_FULL_REFRESH_S", "86400")) # Picks up deletes missed by incremental syncs
+
+# Streaming export of Converse results (see services.export_service): rows in memory at a time
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "50000"))
@@ -0,0 +1,71 @@
+# app/core/lazy.py
+import importlib
+import sys
+import threading
+import time
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Unlike importlib.util.LazyLoader this goes through a normal import_module() call, so the
+    import lock makes a first access from several threads (UI thread, workers, warm-up) safe.
+    `from x import y` would load the module immediately; use `x = lazy_import("x")` and x.y.
+    """
+    def __init__(self, name):
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            module = importlib.import_module(self.__dict__["_lazy_name"])
+            self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module {self.__dict__['_lazy_name']!r} ({state})>"
+
+
+def lazy_import(name):
+    """Returns the module if it is already imported, else a LazyModule that imports it on first use."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def warm_up(module_names):
+    """
+    Imports modules ahead of first use, e.g. on a background thread once the window is shown.
+    Returns {module: seconds} for the modules imported here; failures are reported, not raised.
+    """
+    timings = {}
+    for name in module_names:
+        if name in sys.modules:
+            continue
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"Warm-up import of {name} failed: {e}")
+            continue
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+_warm_up_thread = None
+
+def start_warm_up(module_names):
+    """Runs warm_up() once on a daemon thread so it never delays shutdown."""
+    global _warm_up_thread
+    if _warm_up_thread is None:
+        _warm_up_thread = threading.Thread(target=warm_up, args=(list(module_names),),
+                                           name="dbconverse-warmup", daemon=True)
+        _warm_up_thread.start()
+    return _warm_up_thread
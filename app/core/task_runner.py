@@ -0,0 +1,137 @@
+# app/core/task_runner.py
+import contextvars
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_INTERVAL_MS = 50 # How often the Tk thread drains the callback queue
+CANCEL_POLL_S = 0.05 # How often run_cancellable checks for cancellation while it waits
+
+
+class CancelledError(Exception):
+    """Raised inside a background job when it has been cancelled or superseded."""
+
+
+class Job:
+    """Handle for one unit of background work (e.g. a single NL question)."""
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.job_id = next(Job._ids)
+        self.cancel_event = threading.Event()
+        self.db_connection_id = None # Set while a MySQL statement is running for this job
+        self.db_kill_details = None # Connection details used to open the KILL QUERY connection
+        self.on_cancel = None # Optional hook, e.g. to issue KILL QUERY
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        if self.cancel_event.is_set():
+            return
+        self.cancel_event.set()
+        if self.on_cancel:
+            try:
+                self.on_cancel(self)
+            except Exception as e:
+                print(f"Error while cancelling job {self.job_id}: {e}")
+
+    def check(self):
+        """Raises CancelledError if the job was cancelled. Call between stages."""
+        if self.cancel_event.is_set():
+            raise CancelledError(f"Job {self.job_id} cancelled.")
+
+
+class TaskRunner:
+    """
+    Runs blocking work on a worker pool and marshals results back onto the Tk thread.
+    Tk is not thread-safe, so workers never touch widgets: they push callbacks onto a
+    queue which the Tk thread drains with after().
+    """
+    def __init__(self, tk_root, max_workers=4):
+        self.tk_root = tk_root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dbconverse")
+        self._abandonable = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dbconverse-io")
+        self._callbacks = queue.Queue()
+        self._closed = False
+        self.tk_root.after(POLL_INTERVAL_MS, self._drain)
+
+    def submit(self, fn, *args, on_success=None, on_error=None, **kwargs):
+        """Runs fn(*args, **kwargs) on a worker; on_success/on_error run on the Tk thread."""
+        def _run():
+            try:
+                result = fn(*args, **kwargs)
+            except CancelledError:
+                return # Cancelled work reports nothing
+            except Exception as e:
+                print(f"Background task {getattr(fn, '__name__', fn)} failed: {e}")
+                if on_error:
+                    self.post(on_error, e)
+                return
+            if on_success:
+                self.post(on_success, result)
+        return self.executor.submit(_run)
+
+    def run_detached(self, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) on a short-lived thread of its own, for urgent work that must not
+        queue behind busy pools, e.g. KILL QUERY for the statement a worker is blocked on. Nothing
+        is reported back; errors are printed.
+        """
+        def _run():
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                print(f"Detached task {getattr(fn, '__name__', fn)} failed: {e}")
+        threading.Thread(target=_run, name="dbconverse-urgent", daemon=True).start()
+
+    def post(self, callback, *args):
+        """Schedules callback(*args) on the Tk thread. Safe to call from any thread."""
+        self._callbacks.put((callback, args))
+
+    def _drain(self):
+        while True:
+            try:
+                callback, args = self._callbacks.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Error in UI callback {getattr(callback, '__name__', callback)}: {e}")
+        if not self._closed:
+            self.tk_root.after(POLL_INTERVAL_MS, self._drain)
+
+    def run_cancellable(self, job, fn, *args, **kwargs):
+        """
+        Runs a blocking call that cannot be interrupted (e.g. a Gemini request) so that the
+        calling worker returns as soon as the job is cancelled. The abandoned call finishes
+        in the background and its result is discarded.
+        """
+        return self.wait_cancellable(job, self.start_abandonable(fn, *args, **kwargs))
+
+    def start_abandonable(self, fn, *args, **kwargs):
+        """
+        Starts fn(*args, **kwargs) on the pool for calls that may be abandoned, separate from the
+        worker pool, so a worker waiting on it can never wait behind itself. Returns the future;
+        wait for it with wait_cancellable.
+        """
+        # Carries the caller's context over, e.g. the trace the call's spans belong to
+        return self._abandonable.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+    def wait_cancellable(self, job, future):
+        """Waits for a future from start_abandonable; raises CancelledError as soon as the job is cancelled."""
+        done = threading.Event()
+        future.add_done_callback(lambda _: done.set())
+        # Returns as soon as the call finishes; a cancel is noticed within CANCEL_POLL_S
+        while not done.wait(CANCEL_POLL_S):
+            job.check()
+        job.check()
+        return future.result()
+
+    def shutdown(self):
+        self._closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self._abandonable.shutdown(wait=False, cancel_futures=True)
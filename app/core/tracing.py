@@ -0,0 +1,131 @@
+# app/core/tracing.py
+import contextvars
+import itertools
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from core.config import TRACE_ENABLED, TRACE_BUFFER_SIZE
+
+# Trace id of the operation (e.g. one Converse question) the current code runs for.
+# Worker pools don't propagate context by themselves; submit through contextvars.copy_context().run.
+_current_trace = contextvars.ContextVar("dbconverse_trace", default=None)
+_trace_ids = itertools.count(1)
+
+PAYLOAD_KEYS = ("rows", "bytes", "prompt_tokens") # Span attributes summarized by stage_stats()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(pct * len(ordered) / 100))) # round() would round half to even
+    return ordered[rank - 1]
+
+
+class Span:
+    """One timed stage. attrs carry payload sizes and context (rows, bytes, prompt_tokens, sql, ...)."""
+    __slots__ = ("name", "trace_id", "start", "duration_ms", "attrs", "error", "thread")
+
+    def __init__(self, name, trace_id, attrs):
+        self.name = name
+        self.trace_id = trace_id
+        self.start = time.time()
+        self.duration_ms = None
+        self.attrs = attrs
+        self.error = None
+        self.thread = threading.current_thread().name
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {"name": self.name, "trace_id": self.trace_id, "start": self.start,
+                "duration_ms": self.duration_ms, "error": self.error, "thread": self.thread, **self.attrs}
+
+
+class Tracer:
+    """
+    Records finished spans into a fixed-size ring buffer, so tracing can stay on in production.
+    Recording is a perf_counter pair and a deque append; nothing is written to disk until
+    export_jsonl() is called.
+    """
+    def __init__(self, capacity=TRACE_BUFFER_SIZE, enabled=TRACE_ENABLED):
+        self.enabled = enabled
+        self._spans = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Times the with-block as a span; yields the Span so payload sizes can be added with set()."""
+        span = Span(name, _current_trace.get(), attrs)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - start) * 1000
+            if self.enabled:
+                with self._lock:
+                    self._spans.append(span)
+
+    @contextmanager
+    def trace(self, name, **attrs):
+        """Like span(), but starts a new trace: spans opened inside (same context) share its trace id."""
+        token = _current_trace.set(next(_trace_ids))
+        try:
+            with self.span(name, **attrs) as span:
+                yield span
+        finally:
+            _current_trace.reset(token)
+
+    def spans(self, name=None):
+        with self._lock:
+            spans = list(self._spans)
+        return [s for s in spans if name is None or s.name == name]
+
+    def stage_stats(self):
+        """
+        {span name: {"count", "p50_ms", "p95_ms", "max_ms", "errors", <payload key>: mean}} over the
+        buffer; payload keys (PAYLOAD_KEYS) are averaged over the spans that carry them.
+        """
+        durations = {}
+        errors = {}
+        payloads = {}
+        for span in self.spans():
+            durations.setdefault(span.name, []).append(span.duration_ms)
+            errors[span.name] = errors.get(span.name, 0) + (span.error is not None)
+            for key in PAYLOAD_KEYS:
+                value = span.attrs.get(key)
+                if value is not None:
+                    payloads.setdefault((span.name, key), []).append(value)
+        stats = {
+            name: {"count": len(values), "p50_ms": percentile(values, 50), "p95_ms": percentile(values, 95),
+                   "max_ms": max(values), "errors": errors[name]}
+            for name, values in durations.items()
+        }
+        for (name, key), values in payloads.items():
+            stats[name][key] = sum(values) / len(values)
+        return stats
+
+    def slowest(self, name, n=10):
+        return sorted(self.spans(name), key=lambda s: s.duration_ms, reverse=True)[:n]
+
+    def export_jsonl(self, path):
+        """Writes the buffered spans, oldest first, one JSON object per line. Returns the count."""
+        spans = self.spans()
+        with open(path, "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+        return len(spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+# Process-wide tracer used by the services and UI frames
+tracer = Tracer()
@@ -1,15 +1,33 @@
 import customtkinter as ctk
 from ui.connect_dialog import ConnectDialog
-from services import db_service
 from core.app_state import current_app_state
+from core.config import RESULT_CACHE_MAX_BYTES, RESULT_CACHE_MAX_STALENESS_S, SNAPSHOT_ENABLED, SNAPSHOT_SYNC_INTERVAL_S
+from core.lazy import lazy_import, start_warm_up
+from core.task_runner import Job, TaskRunner
 from ui.converse_frame import ConverseFrame
 from ui.dashboard_frame import DashboardFrame
+from ui.performance_frame import PerformanceFrame
+
+db_service = lazy_import("services.db_service")
+snapshot_service = lazy_import("services.snapshot_service")
+
+# Heavy modules nothing needs for the first frame; imported in the background once the window is up,
+# roughly in order of first use (connect, dashboard, first question)
+WARM_UP_MODULES = [
+    "services.db_service", "services.schema_catalog", "services.row_count_service", "services.query_guard",
+    "services.chart_service", "services.schema_retrieval", "services.nlp_service", "google.generativeai",
+]
+WARM_UP_DELAY_MS = 100
 
 class App(ctk.CTk):
     def __init__(self):
         super().__init__()
         self.title("DB-Converse")
         self.geometry("800x600")
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        self.task_runner = TaskRunner(self)
+        self.snapshot_job = None # Periodic snapshot sync for the connected database
 
         self.connection_status_label = ctk.CTkLabel(self, text="Status: Not Connected")
         self.connection_status_label.pack(pady=10)
@@ -22,34 +40,46 @@ class App(ctk.CTk):
 
         self.tab_view.add("Converse")
         self.tab_view.add("Dashboard")
+        self.tab_view.add("Performance")
 
-        self.converse_frame = ConverseFrame(self.tab_view.tab("Converse"))
+        self.converse_frame = ConverseFrame(self.tab_view.tab("Converse"), self.task_runner)
         self.converse_frame.pack(fill="both", expand=True)
 
-        self.dashboard_frame = DashboardFrame(self.tab_view.tab("Dashboard"))
+        self.dashboard_frame = DashboardFrame(self.tab_view.tab("Dashboard"), self.task_runner)
         self.dashboard_frame.pack(fill="both", expand=True)
 
+        self.performance_frame = PerformanceFrame(self.tab_view.tab("Performance"), self.task_runner)
+        self.performance_frame.pack(fill="both", expand=True)
+
         self.dashboard_frame.load_dashboard_data()
+        self.after(WARM_UP_DELAY_MS, start_warm_up, WARM_UP_MODULES) # Runs once the first frame is drawn
 
     def open_connect_dialog(self):
         dialog = ConnectDialog(self)
         details = dialog.get_details()
         if details:
-            if current_app_state.db_connection:
-                db_service.disconnect_from_db(current_app_state.db_connection)
+            self.converse_frame.cancel_current_job()
+            self.converse_frame.cancel_export() # It streams from the old connection pool
+            self.dashboard_frame.cancel_loading()
+            self._stop_snapshot_sync()
+            if current_app_state.db_pool:
+                current_app_state.db_pool.close()
 
-            conn = db_service.connect_to_db(
+            db_service.result_cache.clear() # Results of the old connection are never served for the new one
+            db_service.result_cache.configure(max_bytes=RESULT_CACHE_MAX_BYTES, max_staleness_s=RESULT_CACHE_MAX_STALENESS_S)
+            pool = db_service.create_connection_pool(
                 details["host"],
                 details["user"],
                 details["password"],
                 details["database"]
             )
-            if conn:
-                current_app_state.db_connection = conn
+            if pool:
+                current_app_state.db_pool = pool
                 current_app_state.db_name = details["database"]
                 self.connection_status_label.configure(text=f"Status: Connected to {details['database']}")
+                self._start_snapshot_sync(pool)
             else:
-                current_app_state.db_connection = None
+                current_app_state.db_pool = None
                 current_app_state.db_name = None
                 self.connection_status_label.configure(text="Status: Connection Failed")
             
@@ -58,8 +88,36 @@ class App(ctk.CTk):
             print("Connection dialog cancelled or closed.")
             self.dashboard_frame.load_dashboard_data()
 
+    def _start_snapshot_sync(self, pool):
+        """Keeps the local analytical snapshot of the database up to date in the background."""
+        if not SNAPSHOT_ENABLED:
+            return
+        job = Job()
+        self.snapshot_job = job
+        self._sync_snapshot(job, pool)
+
+    def _sync_snapshot(self, job, pool):
+        if job.cancelled:
+            return
+        # On its own thread and connection; skipped while the previous sync is still running
+        snapshot_service.start_sync_thread(pool, cancel_event=job.cancel_event)
+        self.after(int(SNAPSHOT_SYNC_INTERVAL_S * 1000), self._sync_snapshot, job, pool)
+
+    def _stop_snapshot_sync(self):
+        if self.snapshot_job:
+            self.snapshot_job.cancel()
+            self.snapshot_job = None
+
+    def _on_close(self):
+        self.converse_frame.cancel_current_job()
+        self.converse_frame.cancel_export()
+        self.dashboard_frame.cancel_loading()
+        self._stop_snapshot_sync()
+        self.task_runner.shutdown()
+        self.destroy()
+
 if __name__ == "__main__":
     app = App()
     app.mainloop()
-    if current_app_state.db_connection:
-        db_service.disconnect_from_db(current_app_state.db_connection) 
\ No newline at end of file
+    if current_app_state.db_pool:
+        current_app_state.db_pool.close() 
\ No newline at end of file
@@ -1,24 +1,397 @@
-import matplotlib.pyplot as plt
+import datetime
+import math
+import re
+import threading
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.figure import Figure
+from matplotlib.patches import Patch
 import seaborn as sns # For styling
+from services import columnar, query_guard, snapshot_service
+from core.tracing import tracer
 
-# Apply a modern, minimal theme once
-# sns.set_theme(style="whitegrid", palette="muted")
-# Or apply per chart if more control is needed.
+# "Chart this result": server-side aggregation limits (see chart_query_result)
+DEFAULT_MAX_POINTS = 1000 # Points plotted for a time series after LTTB downsampling
+DEFAULT_MAX_BUCKETS = 5000 # Time buckets fetched from MySQL before downsampling
+DEFAULT_TOP_CATEGORIES = 30 # Bars in a category chart
+DEFAULT_HISTOGRAM_BINS = 40
 
-def generate_bar_chart_figure(labels, values, title="Bar Chart", xlabel="Categories", ylabel="Values"):
-    """Generates a Matplotlib Figure object for a bar chart."""
-    fig = Figure(figsize=(5, 4), dpi=100) # Create a Figure
-    ax = fig.add_subplot(111) # Add an Axes to the figure
+# Round time bucket widths (seconds) up to one of these, so buckets line up with the calendar
+_BUCKET_STEPS_S = [1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 10800, 21600, 43200, 86400, 7 * 86400]
+_ID_COLUMN_RE = re.compile(r"(^id$|_id$|^id_)", re.IGNORECASE) # Identifiers are not measures
 
-    # Use Seaborn for better aesthetics if desired, or plain Matplotlib
-    # sns.barplot(x=labels, y=values, ax=ax, palette="viridis")
-    ax.bar(labels, values, color=sns.color_palette("viridis", len(labels)))
+# Apply a modern, minimal theme once for charts, when this module is first loaded
+# You can choose different styles: "whitegrid", "darkgrid", "white", "ticks"
+# Palettes: "muted", "pastel", "viridis", "rocket", etc.
+sns.set_theme(style="whitegrid", palette="muted")
 
+def rgba_to_ppm(buffer):
+    """Binary PPM (P6) bytes from an RGBA pixel array; Tk's PhotoImage loads these without PIL."""
+    height, width = buffer.shape[:2]
+    return f"P6 {width} {height} 255 ".encode("ascii") + np.ascontiguousarray(buffer[:, :, :3]).tobytes()
 
-    ax.set_title(title)
-    ax.set_xlabel(xlabel)
-    ax.set_ylabel(ylabel)
-    ax.tick_params(axis='x', rotation=45) # Rotate x-labels if they are long
-    fig.tight_layout() # Adjust layout to prevent labels from overlapping
-    return fig 
\ No newline at end of file
+
+class AggChart:
+    """
+    Base for charts that are kept across data refreshes and rasterized off the UI thread.
+
+    render() draws with Agg into a pixel buffer and returns it as PPM bytes. Artists returned by
+    _animated_artists() are drawn over a cached background, so an update that only touches them
+    is a blit (restore background, redraw those artists). The full draw and tight_layout only run
+    when a subclass flags them or the output size changes. Calls are serialized by a lock.
+    """
+    def __init__(self, title="", xlabel="", ylabel="", dpi=100):
+        self.figure = Figure(figsize=(5, 4), dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_title(title)
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+        self._size = None
+        self._background = None
+        self._needs_layout = True # tight_layout before the next draw
+        self._needs_full_draw = True # Background must be redrawn before blitting
+        self._lock = threading.Lock()
+
+    def render(self, width_px, height_px):
+        """Rasterizes the chart at the given pixel size. Returns (ppm_bytes, width, height)."""
+        with self._lock, tracer.span("chart.render", width=width_px, height=height_px) as span:
+            dpi = self.figure.dpi
+            if self._size != (width_px, height_px):
+                self.figure.set_size_inches(max(width_px, 50) / dpi, max(height_px, 50) / dpi)
+                self._size = (width_px, height_px)
+                self._needs_layout = True
+            if self._needs_layout:
+                self.figure.tight_layout() # Adjust layout to prevent labels from overlapping
+                self._needs_layout = False
+                self._needs_full_draw = True
+            span.set(full_draw=self._needs_full_draw or self._background is None)
+            if self._needs_full_draw or self._background is None:
+                self.canvas.draw() # Animated artists are left out of this pass
+                self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+                self._needs_full_draw = False
+            else:
+                self.canvas.restore_region(self._background)
+            for artist in self._animated_artists():
+                self.ax.draw_artist(artist)
+            buffer = np.asarray(self.canvas.buffer_rgba())
+            return rgba_to_ppm(buffer), buffer.shape[1], buffer.shape[0]
+
+    def _animated_artists(self):
+        return []
+
+
+class BarChart(AggChart):
+    """
+    A bar chart whose update() changes bar heights, styles and the legend in place; the bars
+    are only rebuilt when the labels change. Bars and legend are animated, so refreshes that
+    keep the axis limits are blits.
+    """
+    def __init__(self, title="Bar Chart", xlabel="Categories", ylabel="Values", dpi=100):
+        super().__init__(title, xlabel, ylabel, dpi)
+        self.labels = []
+        self.bars = []
+        self._legend = None
+
+    def update(self, labels, values, estimated=None):
+        """
+        Sets the data. estimated: optional list of bools; bars flagged True are drawn hatched
+        and faded so approximate values are visually distinct from exact ones.
+        """
+        labels = [str(label) for label in labels]
+        estimated = estimated or [False] * len(labels)
+        with self._lock:
+            if labels != self.labels:
+                self._rebuild_bars(labels, values)
+            else:
+                for bar, value in zip(self.bars, values):
+                    bar.set_height(value)
+            for bar, is_estimate in zip(self.bars, estimated):
+                bar.set_alpha(0.45 if is_estimate else None)
+                bar.set_hatch("//" if is_estimate else None)
+            self._set_legend(any(estimated))
+            self._fit_ylim(values)
+
+    def _animated_artists(self):
+        return self.bars + ([self._legend] if self._legend is not None else [])
+
+    def _rebuild_bars(self, labels, values):
+        for bar in self.bars:
+            bar.remove()
+        positions = range(len(labels)) # Numeric x keeps old categories from lingering on the axis
+        container = self.ax.bar(positions, values, color=sns.color_palette("viridis", len(labels)))
+        self.bars = list(container.patches)
+        for bar in self.bars:
+            bar.set_animated(True)
+        self.ax.set_xticks(list(positions))
+        self.ax.set_xticklabels(labels, rotation=45, ha="right") # Rotate x-labels if they are long
+        self.ax.set_xlim(-0.6, max(len(labels), 1) - 0.4)
+        self.labels = labels
+        self._needs_layout = True
+
+    def _set_legend(self, show):
+        if show and self._legend is None:
+            self._legend = self.ax.legend(handles=[
+                Patch(facecolor="grey", label="Exact"),
+                Patch(facecolor="grey", alpha=0.45, hatch="//", label="Estimate"),
+            ], loc="upper right", fontsize="small")
+            self._legend.set_animated(True) # Drawn after the bars so they never cover it
+        elif not show and self._legend is not None:
+            self._legend.remove()
+            self._legend = None
+
+    def _fit_ylim(self, values):
+        low = min(0, min(values, default=0))
+        high = max(0, max(values, default=0))
+        current_low, current_high = self.ax.get_ylim()
+        # Grow with headroom and only shrink when far off, so most refreshes keep the axes and blit
+        if high > current_high * 0.95 or low < current_low * 0.95 or high < current_high * 0.5 or self._needs_layout:
+            self.ax.set_ylim(low * 1.1, high * 1.1 if high > 0 else 1)
+            self._needs_full_draw = True
+
+
+class ChartData:
+    """An aggregated, plot-ready result produced by chart_query_result."""
+    def __init__(self, kind, x, y, title="", xlabel="", ylabel="", note="", bin_width=None):
+        self.kind = kind # "line", "bar" or "histogram"
+        self.x = x
+        self.y = y
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.note = note # How the data was reduced, for display under the chart
+        self.bin_width = bin_width # Histogram only
+
+
+class ChartPlan:
+    """Which chart to draw for a result: x column, optional y (measure) column and chart kind."""
+    def __init__(self, kind, x, y=None):
+        self.kind = kind
+        self.x = x
+        self.y = y
+
+
+def plan_chart(df):
+    """
+    Picks a chart from the result's column types (a first page is enough):
+    a time column gives a line over time buckets, a text column a bar chart per category,
+    and a lone numeric column a histogram. The first non-identifier numeric column is the measure.
+    Returns None if nothing sensible can be drawn.
+    """
+    columns = list(df.columns)
+    if len(set(columns)) != len(columns):
+        return None # Duplicate names cannot be selected from a derived table
+    time_columns = [c for c in columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+    measures = [c for c in columns if pd.api.types.is_numeric_dtype(df[c])
+                and not pd.api.types.is_bool_dtype(df[c]) and not _ID_COLUMN_RE.search(str(c))]
+    categories = [c for c in columns if c not in time_columns and not pd.api.types.is_numeric_dtype(df[c])]
+    if time_columns:
+        return ChartPlan("line", time_columns[0], measures[0] if measures else None)
+    if categories:
+        return ChartPlan("bar", categories[0], measures[0] if measures else None)
+    if measures:
+        return ChartPlan("histogram", measures[0])
+    return None
+
+
+def _quote_identifier(name):
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def _literal(value):
+    """SQL literal for a value that came back from the server (number or datetime)."""
+    if isinstance(value, (datetime.datetime, pd.Timestamp)):
+        return "'" + value.strftime("%Y-%m-%d %H:%M:%S.%f") + "'"
+    return repr(float(value))
+
+
+def _run_aggregate(pool, sql, max_execution_ms, max_rows_examined):
+    """
+    Runs an aggregate query; df.attrs["source"] says where (for the chart note). On MySQL it goes
+    through query_guard first (EXPLAIN estimate and MAX_EXECUTION_TIME), like a question's SQL.
+    Raises RuntimeError if the guard rejects it.
+    """
+    df, _ = snapshot_service.query_snapshot(pool, sql) # Local columnar copy, if enabled and fresh
+    if df is not None:
+        df.attrs["source"] = "the local snapshot"
+        return df
+    guard = query_guard.guard_query(pool, sql, max_rows_examined=max_rows_examined, warn_rows_examined=0,
+                                    default_limit=0, max_execution_ms=max_execution_ms)
+    if guard.error:
+        raise RuntimeError(guard.error)
+    with pool.connection() as connection:
+        cursor = connection.cursor()
+        try:
+            with tracer.span("chart.aggregate") as span:
+                cursor.execute(guard.sql)
+                rows = cursor.fetchall()
+                span.set(rows=len(rows))
+            df = columnar.rows_to_dataframe(rows, cursor.description)
+            df.attrs["source"] = "MySQL"
+            return df
+        finally:
+            cursor.close()
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling: keeps threshold points (including the first and
+    last) that preserve the visual shape of the series. x must be numeric and ascending.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    bucket_size = (n - 2) / (threshold - 2)
+    previous = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        if i == threshold - 3:
+            next_x, next_y = x[n - 1], y[n - 1] # The last bucket is the fixed final point
+        else:
+            next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        # Twice the triangle area between the previous pick, each candidate and the next bucket's mean
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return x[selected], y[selected]
+
+
+def _line_chart(pool, source, plan, max_points, max_buckets, max_execution_ms, max_rows_examined):
+    x_col = _quote_identifier(plan.x)
+    stats = _run_aggregate(pool, f"SELECT MIN({x_col}) AS lo, MAX({x_col}) AS hi, COUNT({x_col}) AS n FROM {source}",
+                           max_execution_ms, max_rows_examined)
+    lo, hi, total = stats["lo"].iloc[0], stats["hi"].iloc[0], int(stats["n"].iloc[0])
+    if total == 0 or pd.isna(lo):
+        return None
+    lo, hi = pd.Timestamp(lo), pd.Timestamp(hi) # A SQLite snapshot returns ISO strings
+    span_s = max(1.0, (hi - lo).total_seconds())
+    bucket_s = _nice_bucket_seconds(span_s / max_buckets)
+    value = f"AVG({_quote_identifier(plan.y)})" if plan.y is not None else "COUNT(*)"
+    # Buckets are counted from the minimum, so the session time zone and pre-1970 dates don't matter
+    df = _run_aggregate(pool, (
+        f"SELECT FLOOR(TIMESTAMPDIFF(SECOND, {_literal(lo)}, {x_col}) / {bucket_s}) AS bucket, {value} AS value "
+        f"FROM {source} WHERE {x_col} IS NOT NULL GROUP BY bucket ORDER BY bucket"
+    ), max_execution_ms, max_rows_examined)
+    source_name = df.attrs["source"]
+    df = df.dropna()
+    offsets, values = lttb(df["bucket"].to_numpy(dtype=np.float64) * bucket_s, df["value"].to_numpy(dtype=np.float64),
+                           max_points)
+    x = pd.Timestamp(lo) + pd.to_timedelta(offsets, unit="s")
+    ylabel = f"avg({plan.y})" if plan.y is not None else "rows"
+    note = (f"{total:,} rows -> {len(df):,} buckets of {_format_seconds(bucket_s)} in {source_name}"
+            + (f" -> {len(values):,} points (LTTB)" if len(values) < len(df) else ""))
+    return ChartData("line", x, values, title=f"{ylabel} over {plan.x}", xlabel=str(plan.x), ylabel=ylabel, note=note)
+
+
+def _bar_chart(pool, source, plan, top_categories, max_execution_ms, max_rows_examined):
+    x_col = _quote_identifier(plan.x)
+    value = f"SUM({_quote_identifier(plan.y)})" if plan.y is not None else "COUNT(*)"
+    top = int(top_categories)
+    # One row past the top tells whether there are more groups, without a window function (MySQL 8 only)
+    df = _run_aggregate(pool, (
+        f"SELECT {x_col} AS category, {value} AS value "
+        f"FROM {source} GROUP BY {x_col} ORDER BY value DESC LIMIT {top + 1}"
+    ), max_execution_ms, max_rows_examined)
+    if df.empty:
+        return None
+    total_categories = len(df)
+    if len(df) > top:
+        df = df.iloc[:top]
+        # COUNT(DISTINCT) skips NULL, which GROUP BY keeps as a group of its own
+        counts = _run_aggregate(pool, (
+            f"SELECT COUNT(DISTINCT {x_col}) + MAX(CASE WHEN {x_col} IS NULL THEN 1 ELSE 0 END) AS categories "
+            f"FROM {source}"
+        ), max_execution_ms, max_rows_examined)
+        total_categories = int(counts["categories"].iloc[0])
+    labels = ["NULL" if pd.isna(v) else str(v) for v in df["category"]]
+    ylabel = f"sum({plan.y})" if plan.y is not None else "rows"
+    note = f"{total_categories:,} groups in {df.attrs['source']}" + (f", top {len(df)} shown" if total_categories > len(df) else "")
+    return ChartData("bar", labels, df["value"].to_numpy(dtype=np.float64), title=f"{ylabel} by {plan.x}",
+                     xlabel=str(plan.x), ylabel=ylabel, note=note)
+
+
+def _histogram(pool, source, plan, bins, max_execution_ms, max_rows_examined):
+    x_col = _quote_identifier(plan.x)
+    stats = _run_aggregate(pool, f"SELECT MIN({x_col}) AS lo, MAX({x_col}) AS hi, COUNT({x_col}) AS n FROM {source}",
+                           max_execution_ms, max_rows_examined)
+    lo, hi, total = stats["lo"].iloc[0], stats["hi"].iloc[0], int(stats["n"].iloc[0])
+    if total == 0 or pd.isna(lo):
+        return None
+    lo, hi = float(lo), float(hi)
+    width = (hi - lo) / bins if hi > lo else 1.0
+    df = _run_aggregate(pool, (
+        f"SELECT LEAST(FLOOR(({x_col} - {_literal(lo)}) / {_literal(width)}), {int(bins) - 1}) AS bin, COUNT(*) AS n "
+        f"FROM {source} WHERE {x_col} IS NOT NULL GROUP BY bin ORDER BY bin"
+    ), max_execution_ms, max_rows_examined)
+    edges = lo + df["bin"].to_numpy(dtype=np.float64) * width
+    return ChartData("histogram", edges, df["n"].to_numpy(dtype=np.float64), title=f"Distribution of {plan.x}",
+                     xlabel=str(plan.x), ylabel="rows", note=f"{total:,} values in {len(df)} bins computed in {df.attrs['source']}",
+                     bin_width=width)
+
+
+def chart_query_result(pool, sql, sample_df, max_points=DEFAULT_MAX_POINTS, max_buckets=DEFAULT_MAX_BUCKETS,
+                       top_categories=DEFAULT_TOP_CATEGORIES, histogram_bins=DEFAULT_HISTOGRAM_BINS,
+                       max_execution_ms=None, max_rows_examined=query_guard.DEFAULT_MAX_ROWS_EXAMINED):
+    """
+    "Chart this result": picks a chart from sample_df's column types (see plan_chart) and computes
+    it in MySQL over the query as a derived table: GROUP BY for categories, fixed-width time buckets
+    for time series (then LTTB-downsampled to max_points) and FLOOR() bins for histograms. Only the
+    aggregates are transferred, never the raw rows. While a fresh local snapshot covers the query's
+    tables (see snapshot_service) the aggregates run there instead; on MySQL each one is checked by
+    query_guard first. Returns ChartData, or None if the result has nothing to chart. Raises
+    mysql.connector.Error, or RuntimeError if an aggregate would examine over max_rows_examined rows.
+    """
+    plan = plan_chart(sample_df)
+    if plan is None:
+        return None
+    source = f"({sql.strip().rstrip(';')}) AS _chart_source"
+    if plan.kind == "line":
+        return _line_chart(pool, source, plan, max_points, max_buckets, max_execution_ms, max_rows_examined)
+    if plan.kind == "bar":
+        return _bar_chart(pool, source, plan, top_categories, max_execution_ms, max_rows_examined)
+    return _histogram(pool, source, plan, histogram_bins, max_execution_ms, max_rows_examined)
+
+
+def _nice_bucket_seconds(raw_seconds):
+    for step in _BUCKET_STEPS_S:
+        if step >= raw_seconds:
+            return step
+    return math.ceil(raw_seconds / 86400) * 86400 # Whole days beyond a week
+
+
+def _format_seconds(seconds):
+    for unit, size in (("d", 86400), ("h", 3600), ("min", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{seconds // size} {unit}"
+    return f"{seconds} s"
+
+
+class ResultChart(AggChart):
+    """Draws a ChartData (line, bar or histogram); every update() is a full redraw."""
+    def update(self, data):
+        with self._lock:
+            ax = self.ax
+            ax.clear()
+            if data.kind == "line":
+                ax.plot(data.x, data.y, linewidth=1.2)
+                ax.tick_params(axis="x", rotation=30)
+            elif data.kind == "bar":
+                positions = range(len(data.x))
+                ax.bar(positions, data.y, color=sns.color_palette("viridis", len(data.x)))
+                ax.set_xticks(list(positions))
+                ax.set_xticklabels([label[:24] for label in data.x], rotation=45, ha="right")
+            else:
+                ax.bar(data.x, data.y, width=data.bin_width, align="edge")
+            ax.set_title(data.title)
+            ax.set_xlabel(data.xlabel)
+            ax.set_ylabel(data.ylabel)
+            self._needs_layout = True
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from mysql.connector import FieldType, FieldFlag
+from core.tracing import tracer
+
+DEFAULT_CATEGORY_MAX_RATIO = 0.5 # Encode strings as categories when unique values / rows is at most this
+CATEGORY_MIN_ROWS = 100 # Smaller columns are not worth encoding
+CATEGORY_SAMPLE_ROWS = 1000 # Leading rows checked before factorizing a whole column
+
+_INTEGER_TYPES = {FieldType.TINY, FieldType.SHORT, FieldType.INT24, FieldType.LONG, FieldType.LONGLONG,
+                  FieldType.YEAR, FieldType.BIT}
+_FLOAT_TYPES = {FieldType.FLOAT, FieldType.DOUBLE}
+_DECIMAL_TYPES = {FieldType.DECIMAL, FieldType.NEWDECIMAL}
+_DATETIME_TYPES = {FieldType.DATETIME, FieldType.TIMESTAMP}
+_DATE_TYPES = {FieldType.DATE, FieldType.NEWDATE}
+_STRING_TYPES = {FieldType.VARCHAR, FieldType.VAR_STRING, FieldType.STRING, FieldType.ENUM, FieldType.SET}
+
+
+def _is_unsigned(column_description):
+    flags = column_description[7] if len(column_description) > 7 else 0
+    return bool((flags or 0) & FieldFlag.UNSIGNED)
+
+
+def _object_column(values):
+    # Not np.array(values): that would split bytes/bytearray/tuple values into a second dimension
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def _integer_column(values, unsigned):
+    dtype = np.uint64 if unsigned else np.int64
+    if None not in values:
+        return np.fromiter(values, dtype=dtype, count=len(values))
+    mask = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+    if mask.all():
+        return pd.array([None] * len(values), dtype="Int64")
+    filled = np.array([0 if v is None else v for v in values], dtype=dtype)
+    return pd.arrays.IntegerArray(filled, mask) # Nullable integers instead of float64 with NaN
+
+
+def _decimal_column(values, exact_decimals):
+    if exact_decimals:
+        return _object_column(values)
+    # Decimal -> nearest double, which is what the charts and aggregations need; None -> NaN
+    if None not in values:
+        return np.array(list(map(float, values)), dtype=np.float64)
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def _temporal_column(values, dtype):
+    # pandas converts datetime/date/timedelta objects (and None -> NaT) in C, far faster than numpy.
+    # Microsecond resolution covers MySQL's whole DATETIME range ('1000-01-01' .. '9999-12-31').
+    return pd.array(_object_column(values), dtype=dtype)
+
+
+def _string_column(values, categorize, category_max_ratio):
+    array = _object_column(values)
+    if not categorize or len(values) < CATEGORY_MIN_ROWS:
+        return array
+    sample = values[:CATEGORY_SAMPLE_ROWS]
+    if len(set(sample)) > len(sample) * category_max_ratio:
+        return array # Clearly high-cardinality; skip the full factorize
+    codes, uniques = pd.factorize(array) # None gets code -1, i.e. missing
+    if len(uniques) > len(values) * category_max_ratio:
+        return array
+    return pd.Categorical.from_codes(codes, pd.Index(uniques))
+
+
+def column_array(values, column_description, exact_decimals=False, categorize=False,
+                 category_max_ratio=DEFAULT_CATEGORY_MAX_RATIO):
+    """
+    Builds one typed column from a sequence of values and its cursor.description entry.
+    Falls back to an object array if the values don't match the declared type.
+    """
+    type_code = column_description[1]
+    try:
+        if type_code in _INTEGER_TYPES:
+            return _integer_column(values, _is_unsigned(column_description))
+        if type_code in _FLOAT_TYPES:
+            return np.array(values, dtype=np.float64) # None becomes NaN
+        if type_code in _DECIMAL_TYPES:
+            return _decimal_column(values, exact_decimals)
+        if type_code in _DATETIME_TYPES or type_code in _DATE_TYPES:
+            return _temporal_column(values, "datetime64[us]")
+        if type_code == FieldType.TIME:
+            return _temporal_column(values, "timedelta64[us]")
+        if type_code in _STRING_TYPES:
+            return _string_column(values, categorize, category_max_ratio)
+    except (TypeError, ValueError, OverflowError, AttributeError):
+        pass
+    return _object_column(values) # BLOB, JSON, GEOMETRY, NULL and anything unexpected
+
+
+def rows_to_dataframe(rows, description, exact_decimals=False, categorize=False,
+                      category_max_ratio=DEFAULT_CATEGORY_MAX_RATIO):
+    """
+    Converts tuple rows from a (non-dictionary) cursor into a DataFrame column by column,
+    using cursor.description type codes instead of letting pandas infer from per-row dicts.
+
+    DECIMAL becomes float64 (or stays exact Decimal objects with exact_decimals), DATE/DATETIME/
+    TIMESTAMP become datetime64, TIME becomes timedelta64 and integer columns with NULLs use the
+    nullable Int64 dtype. With categorize, low-cardinality string columns are category-encoded.
+    Duplicate column names (e.g. SELECT * over a join) are kept, unlike dictionary cursors.
+    """
+    names = [column[0] for column in description]
+    if not rows:
+        return pd.DataFrame(columns=names)
+    with tracer.span("df.build", rows=len(rows), columns=len(names)):
+        arrays = {}
+        for i, column_description in enumerate(description):
+            values = [row[i] for row in rows] # Much cheaper than zip(*rows) for millions of rows
+            arrays[i] = column_array(values, column_description, exact_decimals, categorize, category_max_ratio)
+        df = pd.DataFrame(arrays, copy=False)
+        df.columns = names
+    return df
@@ -1,6 +1,44 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
 import pandas as pd
+import sqlglot
+from sqlglot import exp
+from services import columnar
+from core.tracing import tracer
+
+DEFAULT_POOL_SIZE = 5
+POOL_ACQUIRE_TIMEOUT_S = 30 # How long a task waits for a free connection
+HEALTH_CHECK_IDLE_S = 30 # Connections idle longer than this are pinged before reuse
+
+# Defaults for streamed / paged results (see iter_query_chunks and LazyResult)
+DEFAULT_FETCH_BATCH_SIZE = 1000
+DEFAULT_MAX_RESULT_ROWS = 100_000
+DEFAULT_MAX_RESULT_BYTES = 256 * 1024 * 1024
+DRAIN_MAX_ROWS = 10_000 # Unread rows discarded on close before the statement is killed instead
+
+# Result cache defaults (see ResultCache)
+DEFAULT_RESULT_CACHE_MAX_BYTES = 128 * 1024 * 1024
+DEFAULT_RESULT_CACHE_MAX_STALENESS_S = 0 # Reuse without asking the server only within this age
+
+# Functions whose result changes between executions; queries using them are never cached
+_NON_DETERMINISTIC_FUNCTIONS = {
+    "NOW", "SYSDATE", "CURRENT_TIMESTAMP", "CURRENT_DATE", "CURRENT_TIME", "CURDATE", "CURTIME",
+    "UTC_TIMESTAMP", "UTC_DATE", "UTC_TIME", "UNIX_TIMESTAMP", "RAND", "UUID", "UUID_SHORT",
+    "CONNECTION_ID", "LAST_INSERT_ID", "FOUND_ROWS", "ROW_COUNT", "SLEEP",
+}
+
+_TRAILING_LIMIT_RE = re.compile(r"\bLIMIT\s+\d+(\s*(,|OFFSET)\s*\d+)?\s*;?\s*$", re.IGNORECASE)
+# LIMIT n, LIMIT offset, n or LIMIT n OFFSET offset at the end of a query
+_TRAILING_LIMIT_PARTS_RE = re.compile(r"\bLIMIT\s+(\d+)(?:\s*,\s*(\d+)|\s+OFFSET\s+(\d+))?\s*;?\s*$", re.IGNORECASE)
+_LEADING_SELECT_RE = re.compile(r"^\s*(\(\s*)*SELECT\b", re.IGNORECASE)
+_TRAILING_ORDER_BY_RE = re.compile(
+    r"\bORDER\s+BY\s+((?:`?[\w$]+`?\.)?`?([\w$]+)`?)(?:\s+(ASC|DESC))?\s*;?\s*$", re.IGNORECASE
+)
 
 def connect_to_db(host, user, password, database_name):
     """Establishes a connection to the MySQL database."""
@@ -26,6 +64,98 @@ def disconnect_from_db(connection):
         connection.close()
         print("MySQL connection is closed.")
 
+class ConnectionPool:
+    """
+    Bounded pool of MySQL connections, handed out one per task.
+
+    mysql.connector's pool raises PoolError instead of waiting when it is exhausted,
+    so a semaphore makes callers queue for a free connection instead. Connections
+    that sat idle long enough to hit the server's wait_timeout are pinged (and
+    transparently reconnected) before being handed out.
+    """
+    def __init__(self, host, user, password, database_name, pool_size=DEFAULT_POOL_SIZE):
+        self.details = {"host": host, "user": user, "password": password, "database": database_name}
+        self.pool_size = pool_size
+        self._pool = pooling.MySQLConnectionPool(
+            pool_name=f"dbconverse_{id(self)}",
+            pool_size=pool_size,
+            pool_reset_session=True,
+            host=host,
+            user=user,
+            password=password,
+            database=database_name
+        )
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._last_used = {} # id(raw connection) -> monotonic time of last checkout
+
+    @contextmanager
+    def connection(self, timeout=POOL_ACQUIRE_TIMEOUT_S):
+        """Checks a healthy connection out of the pool for the duration of a with-block."""
+        if not self._slots.acquire(timeout=timeout):
+            raise Error(msg=f"Timed out after {timeout}s waiting for a free database connection.")
+        connection = None
+        try:
+            connection = self._pool.get_connection()
+            self._ensure_alive(connection)
+            yield connection
+        finally:
+            if connection:
+                self._last_used[id(getattr(connection, "_cnx", connection))] = time.monotonic()
+                try:
+                    connection.close() # Returns the connection to the pool
+                except Error as e:
+                    print(f"Error returning connection to pool: {e}")
+            self._slots.release()
+
+    def _ensure_alive(self, connection):
+        raw = getattr(connection, "_cnx", connection)
+        last_used = self._last_used.get(id(raw))
+        if last_used is not None and time.monotonic() - last_used < HEALTH_CHECK_IDLE_S:
+            return
+        # Reconnects in place if the server dropped us (wait_timeout, restarts, ...)
+        connection.ping(reconnect=True, attempts=3, delay=1)
+
+    def close(self):
+        try:
+            self._pool._remove_connections()
+            print("MySQL connection pool is closed.")
+        except Error as e:
+            print(f"Error while closing connection pool: {e}")
+
+def create_connection_pool(host, user, password, database_name, pool_size=DEFAULT_POOL_SIZE):
+    """Creates a ConnectionPool for the database, or returns None if it cannot connect."""
+    try:
+        pool = ConnectionPool(host, user, password, database_name, pool_size=pool_size)
+        print(f"Successfully created connection pool for database: {database_name}")
+        return pool
+    except Error as e:
+        print(f"Error while connecting to MySQL: {e}")
+        return None
+
+def kill_query(host, user, password, database_name, connection_id):
+    """
+    Aborts the statement currently running on another connection by issuing
+    KILL QUERY from a separate, short-lived connection.
+    """
+    if connection_id is None:
+        return False
+    killer = connect_to_db(host, user, password, database_name)
+    if not killer:
+        return False
+    cursor = None
+    try:
+        cursor = killer.cursor()
+        cursor.execute(f"KILL QUERY {int(connection_id)}")
+        print(f"Sent KILL QUERY for connection {connection_id}.")
+        return True
+    except Error as e:
+        print(f"Error killing query on connection {connection_id}: {e}")
+        return False
+    finally:
+        if cursor:
+            cursor.close()
+        disconnect_from_db(killer)
+
 def get_table_names(connection):
     """Fetches a list of table names from the connected database."""
     if not connection or not connection.is_connected():
@@ -51,27 +181,489 @@ def get_basic_schema_string(connection):
         return "No tables found or unable to fetch schema."
     return f"Tables: {', '.join(table_names)}"
 
-def execute_query(connection, query):
-    """Executes a given SQL query and returns results as a Pandas DataFrame."""
+def _check_read_only(query):
+    """Returns an error message if the query is not an allowed read-only statement."""
+    # Basic safety for MVP: Allow SELECT and SHOW queries
+    query_upper = query.strip().upper() if query else ""
+    if not query or not (query_upper.startswith("SELECT") or query_upper.startswith("SHOW")):
+        return "Error: Only SELECT or SHOW queries are allowed for MVP."
+    return None
+
+def strip_trailing_comments(query):
+    """
+    The query without comments after its last token, so text appended to it (e.g. a LIMIT)
+    cannot end up inside a trailing -- or # comment.
+    """
+    query = query.strip()
+    try:
+        tokens = sqlglot.tokenize(query, read="mysql")
+    except sqlglot.errors.TokenError:
+        return query
+    return query[:tokens[-1].end + 1] if tokens else query
+
+def _with_row_limit(query, max_rows):
+    """Appends a LIMIT to an unbounded SELECT so the server stops producing rows past the budget."""
+    query = strip_trailing_comments(query).rstrip(";").strip()
+    if not query.upper().startswith("SELECT") or _TRAILING_LIMIT_RE.search(query):
+        return query
+    return f"{query} LIMIT {int(max_rows)}"
+
+def add_max_execution_time(query, max_execution_ms):
+    """Adds a MAX_EXECUTION_TIME optimizer hint to a top-level SELECT (idempotent)."""
+    match = _LEADING_SELECT_RE.match(query)
+    if not match or "MAX_EXECUTION_TIME" in query[match.end():match.end() + 40].upper():
+        return query
+    return f"{query[:match.end()]} /*+ MAX_EXECUTION_TIME({int(max_execution_ms)}) */{query[match.end():]}"
+
+def _drain_and_close(cursor, connection=None, connection_details=None):
+    """
+    Discards unread rows of an unbuffered cursor so its connection can be reused. Given the
+    connection and its pool's details, a remainder larger than DRAIN_MAX_ROWS is stopped with
+    KILL QUERY rather than pulled over the network to be thrown away; the connection stays usable.
+    """
+    discarded = 0
+    try:
+        while True:
+            rows = cursor.fetchmany(DEFAULT_FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            discarded += len(rows)
+            if connection_details is not None and discarded >= DRAIN_MAX_ROWS:
+                kill_query(connection_details["host"], connection_details["user"], connection_details["password"],
+                           connection_details["database"], connection.connection_id)
+                connection_details = None # What is already in flight ends with an "interrupted" error
+    except Error:
+        pass
+    cursor.close()
+
+def cache_scope(pool):
+    """ResultCache scope of a pool's connections: the server and the database unqualified names resolve in."""
+    return (pool.details["host"], pool.details["database"])
+
+def connection_cache_scope(connection):
+    """cache_scope for a single connection (asks the server for its current database)."""
+    return (connection.server_host, connection.database)
+
+class ResultCache:
+    """
+    Memory-bounded LRU cache of query results keyed by scope (see cache_scope), normalized SQL
+    text and flags for anything else that shapes the result (e.g. categorize). Look up the SQL
+    that actually runs, i.e. after any rewrites such as an injected LIMIT.
+
+    Each entry remembers the tables the query reads and their UPDATE_TIME at execution time.
+    Within max_staleness_s an entry is reused without contacting the server; after that it is
+    reused only if none of its tables has a newer (or unknown) UPDATE_TIME. Sizes are accounted
+    with DataFrame.memory_usage(deep=True) and least recently used entries are evicted first.
+    """
+    def __init__(self, max_bytes=DEFAULT_RESULT_CACHE_MAX_BYTES, max_staleness_s=DEFAULT_RESULT_CACHE_MAX_STALENESS_S):
+        self.max_bytes = max_bytes
+        self.max_staleness_s = max_staleness_s
+        self._entries = OrderedDict() # key -> dict(tables, versions, created_at, df, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def configure(self, max_bytes=None, max_staleness_s=None):
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if max_staleness_s is not None:
+                self.max_staleness_s = max_staleness_s
+            self._evict()
+
+    @staticmethod
+    def analyze(query):
+        """Returns (normalized_sql, tables) for a cacheable query, or None."""
+        try:
+            tree = sqlglot.parse_one(query, read="mysql")
+        except sqlglot.errors.ParseError:
+            return None
+        for func in tree.find_all(exp.Func):
+            name = func.name if isinstance(func, exp.Anonymous) else func.sql_name()
+            if name.upper() in _NON_DETERMINISTIC_FUNCTIONS:
+                return None
+        cte_names = {cte.alias for cte in tree.find_all(exp.CTE)}
+        tables = sorted({(t.db or None, t.name) for t in tree.find_all(exp.Table) if t.name not in cte_names},
+                        key=lambda t: (t[0] or "", t[1]))
+        if not tables:
+            return None
+        return tree.sql(dialect="mysql"), tuple(tables)
+
+    @staticmethod
+    def table_versions(connection, tables):
+        """{(db, table): UPDATE_TIME or None} for the given tables, in one query."""
+        cursor = connection.cursor()
+        try:
+            try:
+                # MySQL 8 otherwise serves information_schema statistics cached for up to a day
+                cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+            except Error:
+                pass # Older servers always report live values
+            conditions = " OR ".join(["(TABLE_SCHEMA = COALESCE(%s, DATABASE()) AND TABLE_NAME = %s)"] * len(tables))
+            params = [value for table in tables for value in table]
+            cursor.execute(
+                f"SELECT TABLE_SCHEMA, TABLE_NAME, UPDATE_TIME, (TABLE_SCHEMA = DATABASE()) "
+                f"FROM information_schema.TABLES WHERE {conditions}",
+                params
+            )
+            found = {}
+            for schema, name, update_time, is_current_db in cursor.fetchall():
+                found[(schema, name)] = update_time
+                if is_current_db:
+                    found[(None, name)] = update_time
+        finally:
+            cursor.close()
+        return {table: found.get(table) for table in tables}
+
+    def lookup(self, connection, query, scope, flags=()):
+        """
+        Returns (df, pending). df is a cached result or None. On a miss, pending carries what
+        store() needs (table versions are captured *before* execution) or None if uncacheable.
+        """
+        analyzed = self.analyze(query)
+        if analyzed is None:
+            return None, None
+        normalized, tables = analyzed
+        key = (scope, normalized, tuple(sorted(flags)))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry["created_at"] <= self.max_staleness_s:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry["df"].copy(deep=False), None
+
+        try:
+            versions = self.table_versions(connection, tables)
+        except Error as e:
+            print(f"Result cache: could not read table versions: {e}")
+            return None, None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                unchanged = all(v is not None for v in versions.values()) and versions == entry["versions"]
+                if unchanged:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry["df"].copy(deep=False), None
+                self._drop(key)
+                self._stats["invalidations"] += 1
+            self._stats["misses"] += 1
+        return None, {"key": key, "tables": tables, "versions": versions}
+
+    def store(self, pending, df):
+        if not pending:
+            return
+        nbytes = int(df.memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes // 4:
+            return # One huge result should not flush everything else
+        with self._lock:
+            self._drop(pending["key"])
+            self._entries[pending["key"]] = {
+                "tables": pending["tables"],
+                "versions": pending["versions"],
+                "created_at": time.monotonic(),
+                "df": df,
+                "nbytes": nbytes,
+            }
+            self._bytes += nbytes
+            self._evict()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._bytes)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._bytes -= entry["nbytes"]
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry["nbytes"]
+            self._stats["evictions"] += 1
+
+# Shared process-wide cache; configured from core.config in main.py
+result_cache = ResultCache()
+
+def execute_query(connection, query, use_cache=False, categorize=False):
+    """
+    Executes a given SQL query and returns results as a Pandas DataFrame.
+    With use_cache=True an unchanged earlier result may be served from result_cache.
+    With categorize=True low-cardinality string columns are category-encoded.
+    """
     if not connection or not connection.is_connected():
         return pd.DataFrame(), "Error: Not connected to a database."
     
-    # Basic safety for MVP: Allow SELECT and SHOW queries
-    query_upper = query.strip().upper()
-    if not query or not (query_upper.startswith("SELECT") or query_upper.startswith("SHOW")):
-        return pd.DataFrame(), "Error: Only SELECT or SHOW queries are allowed for MVP."
+    error_msg = _check_read_only(query)
+    if error_msg:
+        return pd.DataFrame(), error_msg
+
+    pending = None
+    if use_cache:
+        flags = ("categorize",) if categorize else ()
+        cached_df, pending = result_cache.lookup(connection, query, connection_cache_scope(connection), flags)
+        if cached_df is not None:
+            return cached_df, None
 
     cursor = None
     try:
-        cursor = connection.cursor(dictionary=True) # Get results as dictionaries
-        cursor.execute(query)
-        results = cursor.fetchall()
-        column_names = [i[0] for i in cursor.description] # Get column names
-        df = pd.DataFrame(results, columns=column_names)
+        with tracer.span("db.execute_query") as span:
+            cursor = connection.cursor() # Plain tuples; columnar builds typed columns from them
+            cursor.execute(query)
+            results = cursor.fetchall()
+            span.set(rows=len(results))
+        df = columnar.rows_to_dataframe(results, cursor.description, categorize=categorize)
+        result_cache.store(pending, df)
         return df, None # DataFrame, no error
     except Error as e:
         print(f"Error executing query '{query}': {e}")
         return pd.DataFrame(), f"Error executing query: {e}"
     finally:
         if cursor:
-            cursor.close() 
\ No newline at end of file
+            cursor.close()
+
+def iter_query_chunks(connection, query, batch_size=DEFAULT_FETCH_BATCH_SIZE,
+                      max_rows=DEFAULT_MAX_RESULT_ROWS, max_bytes=DEFAULT_MAX_RESULT_BYTES, params=None,
+                      exact_decimals=False, connection_details=None):
+    """
+    Streams a query's result as DataFrame chunks of at most batch_size rows.
+    Rows stay on the server (unbuffered cursor) until fetched, and streaming stops
+    once max_rows or max_bytes has been delivered (None: no limit). With exact_decimals,
+    DECIMAL columns hold Decimal objects instead of float64. With connection_details (the
+    pool's details), a large unread remainder left by max_bytes or an early close is killed
+    instead of drained (see _drain_and_close). Raises mysql.connector.Error.
+    """
+    error_msg = _check_read_only(query)
+    if error_msg:
+        raise Error(msg=error_msg)
+
+    cursor = connection.cursor(buffered=False)
+    try:
+        cursor.execute(query if max_rows is None else _with_row_limit(query, max_rows), params)
+        rows_sent = 0
+        bytes_sent = 0
+        while (max_rows is None or rows_sent < max_rows) and (max_bytes is None or bytes_sent < max_bytes):
+            rows = cursor.fetchmany(batch_size if max_rows is None else min(batch_size, max_rows - rows_sent))
+            if not rows:
+                break
+            chunk = columnar.rows_to_dataframe(rows, cursor.description, exact_decimals=exact_decimals)
+            rows_sent += len(chunk)
+            if max_bytes is not None:
+                bytes_sent += int(chunk.memory_usage(deep=True).sum())
+            yield chunk
+    finally:
+        _drain_and_close(cursor, connection, connection_details)
+
+class LazyResult:
+    """
+    Paged, budgeted view over a query result; pages are fetched on demand with fetch_next_page().
+
+    Every page is its own statement on a freshly checked-out connection, so nothing is held open
+    between pages (a cursor left open while the user is idle would hit MAX_EXECUTION_TIME or
+    net_write_timeout, and would keep a pool slot). If the query ends in ORDER BY on a single
+    column, pages after the first are keyset queries (WHERE key >= boundary ... LIMIT n). Trailing
+    rows that tie on the boundary key are deferred to the next page, which keeps keyset paging
+    exact for non-unique keys. Keyset paging is only kept when the first page shows the key is a
+    NOT NULL column (NULL keys fail the boundary comparison) and the column names are unique (the
+    page query selects from the query as a derived table). Otherwise each page is the query with
+    LIMIT offset, n. SHOW statements cannot be paged and are read in one page.
+    """
+    def __init__(self, pool, query, page_size=DEFAULT_FETCH_BATCH_SIZE, max_rows=DEFAULT_MAX_RESULT_ROWS,
+                 max_bytes=DEFAULT_MAX_RESULT_BYTES, on_statement=None, max_execution_ms=None):
+        error_msg = _check_read_only(query)
+        if error_msg:
+            raise Error(msg=error_msg)
+        self.pool = pool
+        self.query = strip_trailing_comments(query).rstrip(";").strip()
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.on_statement = on_statement # Called with the MySQL connection id while a statement runs, then None
+        self.max_execution_ms = max_execution_ms # Server-side time limit applied to every statement issued
+        self.pageable = self.query.upper().startswith("SELECT")
+
+        # The query's own LIMIT becomes a starting offset and a cap on the row budget
+        self.row_limit = None
+        self._start_offset = 0
+        limit_match = _TRAILING_LIMIT_PARTS_RE.search(self.query) if self.pageable else None
+        if limit_match:
+            first, second, offset = limit_match.groups()
+            if second is not None:
+                self._start_offset, self.row_limit = int(first), int(second)
+            else:
+                self._start_offset, self.row_limit = int(offset or 0), int(first)
+            self.max_rows = min(self.max_rows, self.row_limit)
+            self.query = self.query[:limit_match.start()].rstrip()
+
+        self.columns = None
+        self.description = None # cursor.description, used to build typed page columns
+        self.pages = []
+        self.rows_fetched = 0
+        self.bytes_fetched = 0
+        self.exhausted = False
+        self.truncated = False # True when the row/byte budget stopped fetching early
+
+        self._lock = threading.Lock()
+        self._keyset = None
+        self._boundary = None
+        order_match = _TRAILING_ORDER_BY_RE.search(self.query)
+        if order_match and self.pageable:
+            self._keyset = {
+                "base": self.query[:order_match.start()].rstrip(),
+                "order_by": order_match.group(1),
+                "column": order_match.group(2),
+                "descending": (order_match.group(3) or "").upper() == "DESC",
+            }
+
+    @classmethod
+    def from_dataframe(cls, query, df):
+        """A fully fetched result, e.g. one served from result_cache."""
+        result = cls(None, query)
+        result.columns = list(df.columns)
+        result.pages = [df]
+        result.rows_fetched = len(df)
+        result.bytes_fetched = int(df.memory_usage(deep=True).sum())
+        result.exhausted = True
+        return result
+
+    @property
+    def has_more(self):
+        return not self.exhausted and not self.truncated
+
+    def to_dataframe(self):
+        """All rows fetched so far as one DataFrame."""
+        if not self.pages:
+            return pd.DataFrame(columns=self.columns or [])
+        return pd.concat(self.pages, ignore_index=True)
+
+    def fetch_next_page(self):
+        """Fetches and returns the next page as a DataFrame (empty when done). Raises mysql.connector.Error."""
+        with self._lock, tracer.span("db.fetch_page", page=len(self.pages)) as span:
+            if not self.has_more:
+                return pd.DataFrame(columns=self.columns or [])
+            if self.rows_fetched >= self.max_rows or self.bytes_fetched >= self.max_bytes:
+                self.truncated = True
+                return pd.DataFrame(columns=self.columns or [])
+
+            limit = min(self.page_size, self.max_rows - self.rows_fetched)
+            if not self.pageable:
+                rows = self._fetch_whole()
+            elif self._keyset:
+                rows = self._fetch_keyset_page(limit)
+            else:
+                rows = self._fetch_offset_page(limit)
+
+            if rows:
+                page = columnar.rows_to_dataframe(rows, self.description)
+            else:
+                page = pd.DataFrame(columns=self.columns)
+            page_bytes = int(page.memory_usage(deep=True).sum())
+            self.pages.append(page)
+            self.rows_fetched += len(page)
+            self.bytes_fetched += page_bytes
+            span.set(rows=len(page), bytes=page_bytes)
+            if self.row_limit is not None and self.rows_fetched >= self.row_limit:
+                self.exhausted = True # The query's own LIMIT was reached
+            return page
+
+    def close(self):
+        with self._lock:
+            self.exhausted = True
+
+    def _run(self, query, params=None, max_rows=None):
+        """
+        Runs one statement on a pooled connection and reads its rows (at most max_rows). The
+        connection id is reported through on_statement until the rows have been read, since an
+        unbuffered execute() returns as soon as the column metadata arrives.
+        """
+        if self.max_execution_ms:
+            query = add_max_execution_time(query, self.max_execution_ms)
+        with self.pool.connection() as connection:
+            if self.on_statement:
+                self.on_statement(connection.connection_id)
+            cursor = connection.cursor()
+            try:
+                with tracer.span("db.execute", keyset=self._keyset is not None):
+                    cursor.execute(query, params)
+                description = cursor.description
+                rows = cursor.fetchall() if max_rows is None else cursor.fetchmany(max_rows)
+            finally:
+                _drain_and_close(cursor, connection, self.pool.details)
+                if self.on_statement:
+                    self.on_statement(None)
+        if self.columns is None:
+            self.columns = [i[0] for i in description]
+            self.description = description
+        return rows
+
+    def _fetch_whole(self):
+        rows = self._run(self.query, max_rows=self.max_rows)
+        if len(rows) >= self.max_rows:
+            self.truncated = True
+        else:
+            self.exhausted = True
+        return rows
+
+    def _fetch_offset_page(self, limit):
+        offset = self._start_offset + self.rows_fetched
+        rows = self._run(f"{self.query} LIMIT {int(offset)}, {int(limit)}")
+        if len(rows) < limit:
+            self.exhausted = True
+        return rows
+
+    def _fetch_keyset_page(self, limit):
+        ks = self._keyset
+        if self._boundary is None:
+            page_query = f"{self.query} LIMIT {int(self._start_offset)}, {int(limit)}"
+            params = None
+        else:
+            op = "<=" if ks["descending"] else ">="
+            direction = "DESC" if ks["descending"] else "ASC"
+            column = f"`{ks['column']}`"
+            page_query = (f"SELECT * FROM ({ks['base']}) AS _page WHERE {column} {op} %s "
+                          f"ORDER BY {column} {direction} LIMIT {int(limit)}")
+            params = (self._boundary,)
+
+        rows = self._run(page_query, params)
+        columns = self.columns
+        if len(rows) < limit:
+            self.exhausted = True
+            return rows
+        if ks["column"] not in columns or len(set(columns)) < len(columns):
+            # The order key is not in the select list, so it cannot be used as a boundary; or
+            # duplicate names (e.g. a.id, b.id) would make the derived table invalid
+            return self._switch_to_offset(rows)
+
+        key_index = columns.index(ks["column"])
+        null_ok = self.description[key_index][6] if len(self.description[key_index]) > 6 else None
+        if null_ok is None or null_ok:
+            # The key may be NULL (or nullability is unknown): those rows would never pass the boundary
+            return self._switch_to_offset(rows)
+        boundary = rows[-1][key_index]
+        keep = len(rows)
+        while keep > 0 and rows[keep - 1][key_index] == boundary:
+            keep -= 1
+        if boundary is None or keep == 0:
+            # NULL boundary or a tie group larger than a page: continue by offset instead
+            return self._switch_to_offset(rows)
+        self._boundary = boundary
+        return rows[:keep]
+
+    def _switch_to_offset(self, rows):
+        """Continues the ordered result with LIMIT offset, n pages after these rows."""
+        self._keyset = None
+        if self.rows_fetched + len(rows) >= self.max_rows:
+            if self.row_limit is not None and self.rows_fetched + len(rows) >= self.row_limit:
+                self.exhausted = True # The query's own LIMIT was reached, not the budget
+            else:
+                self.truncated = True
+        return rows
@@ -0,0 +1,158 @@
+import importlib.util
+import os
+import time
+from core.lazy import lazy_import
+from core.task_runner import CancelledError
+from core.tracing import tracer
+from services import db_service
+
+pa = lazy_import("pyarrow") # Only needed for Parquet
+pq = lazy_import("pyarrow.parquet")
+
+DEFAULT_EXPORT_BATCH_SIZE = 50_000 # Rows held in memory at a time; also the Parquet row group size
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._header = True
+
+    @property
+    def bytes_written(self):
+        return self._file.tell()
+
+    def write(self, chunk):
+        chunk.to_csv(self._file, header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", encoding="utf-8")
+
+    @property
+    def bytes_written(self):
+        return self._file.tell()
+
+    def write(self, chunk):
+        text = chunk.to_json(orient="records", lines=True, date_format="iso", default_handler=str)
+        self._file.write(text if text.endswith("\n") else text + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """
+    Appends each chunk as a row group; the schema is taken from the first chunk. DECIMAL columns
+    (Decimal objects) are stored as Parquet decimals. Needs pyarrow.
+    """
+    def __init__(self, path):
+        self._path = path
+        self._writer = None
+
+    @property
+    def bytes_written(self):
+        return os.path.getsize(self._path) if self._writer is not None else 0
+
+    def write(self, chunk):
+        if self._writer is None:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            schema = table.schema
+            for i, field in enumerate(schema):
+                if pa.types.is_null(field.type):
+                    # All NULL in the first chunk: only text columns are left untyped by columnar
+                    schema = schema.set(i, field.with_type(pa.string()))
+                elif pa.types.is_decimal(field.type):
+                    # pyarrow infers the precision from this chunk's values; widen it so larger values in
+                    # later chunks fit. The scale is the column's own, as MySQL sends every value with it.
+                    scale = field.type.scale
+                    wide = pa.decimal128(38, scale) if field.type.precision <= 38 else pa.decimal256(76, scale)
+                    schema = schema.set(i, field.with_type(wide))
+            self._writer = pq.ParquetWriter(self._path, schema)
+            table = table.cast(schema)
+        else:
+            table = pa.Table.from_pandas(chunk, schema=self._writer.schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "parquet": ParquetWriter}
+
+
+def available_formats():
+    """EXPORT_FORMATS whose optional dependencies are installed: Parquet needs pyarrow."""
+    return tuple(output_format for output_format in EXPORT_FORMATS
+                 if output_format != "parquet" or importlib.util.find_spec("pyarrow") is not None)
+
+
+def format_for_path(path, default="csv"):
+    """Export format from a file name's extension (.csv, .jsonl, .parquet)."""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    return extension if extension in WRITERS else default
+
+
+def export_query(pool, sql, path, output_format, batch_size=DEFAULT_EXPORT_BATCH_SIZE, max_rows=None,
+                 max_bytes=None, on_progress=None, on_statement=None, cancel_event=None):
+    """
+    Streams the result of sql into a CSV, JSONL or Parquet file with constant memory: rows come
+    from an unbuffered (server-side) cursor batch_size at a time, and each batch is written before
+    the next is fetched. The file is written as path + ".part" and renamed once complete, so a
+    failed or cancelled export leaves nothing behind (and no file is created for an empty result).
+
+    on_progress(rows, bytes_written, elapsed_s) is called after every batch. on_statement(
+    connection_id) is called before the query runs, e.g. so a cancel can KILL it, and
+    on_statement(None) once it has finished, before the connection goes back to the pool.
+    cancel_event is checked between batches. Returns the number of rows written. Raises mysql.connector.Error, OSError
+    or CancelledError.
+    """
+    part_path = f"{path}.part"
+    writer = None
+    rows = 0
+    start = time.perf_counter()
+    try:
+        with pool.connection() as connection, tracer.span("export.query", format=output_format) as span:
+            if on_statement:
+                on_statement(connection.connection_id)
+            # Exact decimals: a money column must not come out rounded through float64
+            chunks = db_service.iter_query_chunks(connection, sql, batch_size=batch_size, max_rows=max_rows,
+                                                  max_bytes=max_bytes, exact_decimals=True,
+                                                  connection_details=pool.details)
+            try:
+                for chunk in chunks:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise CancelledError("Export cancelled.")
+                    if writer is None:
+                        writer = WRITERS[output_format](part_path)
+                    writer.write(chunk)
+                    rows += len(chunk)
+                    if on_progress:
+                        on_progress(rows, writer.bytes_written, time.perf_counter() - start)
+            except db_service.Error:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise CancelledError("Export cancelled.") # The query was killed on purpose
+                raise
+            finally:
+                chunks.close() # Drains the cursor now, not whenever the generator is collected
+                if on_statement:
+                    on_statement(None) # A late cancel must not KILL whatever the connection runs next
+            span.set(rows=rows, bytes=writer.bytes_written if writer else 0)
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.replace(part_path, path)
+    finally:
+        if writer is not None:
+            writer.close()
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
+    return rows
@@ -1,19 +1,49 @@
-import google.generativeai as genai
-from core.config import GOOGLE_API_KEY
-
-if GOOGLE_API_KEY:
-    genai.configure(api_key=GOOGLE_API_KEY)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-else:
-    model = None
+import hashlib
+import os
+import threading
+import time
+from core.config import (GOOGLE_API_KEY, CACHE_DIR, TRANSLATION_CACHE_ENABLED, TRANSLATION_CACHE_TTL_S,
+                         TRANSLATION_CACHE_MAX_ENTRIES, TRANSLATION_CACHE_FUZZY_THRESHOLD)
+from services.sql_extractor import SqlStreamExtractor, extract_sql
+from services.translation_cache import TranslationCache
+from services.schema_retrieval import estimate_tokens
+from core.tracing import tracer
+from core.lazy import lazy_import
+
+genai = lazy_import("google.generativeai") # Slow to import; only loaded when the model is first needed
+query_guard = lazy_import("services.query_guard")
+
+MODEL_NAME = 'gemini-1.5-flash'
+
+_model = None
+_model_lock = threading.Lock()
+
+if not GOOGLE_API_KEY:
     print("NLP Service: Gemini API key not configured. NLP functionalities will be disabled.")
 
-def generate_text_with_gemini(prompt_text):
-    """Generates text using Gemini based on a prompt."""
-    if not model:
+def get_model():
+    """Returns the configured Gemini model, creating it on first use; None without an API key."""
+    global _model
+    if _model is None and GOOGLE_API_KEY:
+        with _model_lock:
+            if _model is None:
+                genai.configure(api_key=GOOGLE_API_KEY)
+                _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
+
+def set_model(gemini_model):
+    """Replaces the shared model, e.g. with a fake client for offline benchmarks. None resets it."""
+    global _model
+    with _model_lock:
+        _model = gemini_model
+
+def generate_text_with_gemini(prompt_text, gemini_model=None):
+    """Generates text using Gemini based on a prompt. gemini_model overrides the configured model."""
+    active_model = gemini_model or get_model()
+    if not active_model:
         return "Error: Gemini model not initialized (API key missing or invalid)."
     try:
-        response = model.generate_content(prompt_text)
+        response = active_model.generate_content(prompt_text)
         # Basic error handling for response structure (may need refinement based on Gemini SDK)
         if response and response.candidates and response.candidates[0].content.parts:
             return response.text
@@ -24,15 +54,44 @@ def generate_text_with_gemini(prompt_text):
         print(f"Error during Gemini API call: {e}")
         return f"Error generating text: {e}"
 
-def nl_to_sql_basic(natural_language_query, db_schema_str=""):
+def generate_text_stream(prompt_text, gemini_model=None):
     """
-    Basic NL to SQL conversion.
-    For MVP, db_schema_str might be simple like table names.
+    Yields text chunks as Gemini produces them (generate_content(stream=True)).
+    Any object with a compatible generate_content() can be passed as gemini_model,
+    e.g. a fake client for offline runs. Raises on API errors.
     """
-    if not model:
-        return "Error: Gemini model not initialized."
+    active_model = gemini_model or get_model()
+    if not active_model:
+        raise RuntimeError("Gemini model not initialized (API key missing or invalid).")
+    response = active_model.generate_content(prompt_text, stream=True)
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError: # Chunk without text parts (e.g. safety metadata only)
+            continue
+        if text:
+            yield text
+
+_translation_cache = None
+_translation_cache_lock = threading.Lock()
 
-    prompt = f"""You are an expert SQL generator. Given the database schema (if provided) and a natural language question, generate a valid MySQL SQL query.
+def get_translation_cache():
+    """Returns the shared TranslationCache (created on first use), or None if disabled."""
+    global _translation_cache
+    if not TRANSLATION_CACHE_ENABLED:
+        return None
+    with _translation_cache_lock:
+        if _translation_cache is None:
+            _translation_cache = TranslationCache(
+                os.path.join(CACHE_DIR, "translations.sqlite3"),
+                max_disk_entries=TRANSLATION_CACHE_MAX_ENTRIES,
+                ttl_s=TRANSLATION_CACHE_TTL_S,
+                fuzzy_threshold=TRANSLATION_CACHE_FUZZY_THRESHOLD or None
+            )
+        return _translation_cache
+
+def build_nl_to_sql_prompt(natural_language_query, db_schema_str=""):
+    return f"""You are an expert SQL generator. Given the database schema (if provided) and a natural language question, generate a valid MySQL SQL query.
 
 Only output the SQL query. Do not include any explanations or markdown formatting.
 
@@ -44,4 +103,100 @@ Natural Language Question:
 
 SQL Query:
 """
-    return generate_text_with_gemini(prompt) 
\ No newline at end of file
+
+def _cache_scope(db_schema_str, schema_fingerprint):
+    if schema_fingerprint is None:
+        schema_fingerprint = hashlib.sha1(db_schema_str.encode("utf-8")).hexdigest()[:16]
+    return get_translation_cache(), schema_fingerprint
+
+def _is_valid_sql(sql):
+    return query_guard.validate_sql(sql) is None
+
+def nl_to_sql_basic(natural_language_query, db_schema_str="", schema_fingerprint=None, gemini_model=None):
+    """
+    Basic NL to SQL conversion.
+    For MVP, db_schema_str might be simple like table names.
+    Translations are cached per (question, schema_fingerprint, model); without a fingerprint
+    the schema string itself is hashed, so a schema change never serves stale SQL.
+    """
+    cache, schema_fingerprint = _cache_scope(db_schema_str, schema_fingerprint)
+    if cache:
+        cached_sql = cache.get(natural_language_query, schema_fingerprint, MODEL_NAME)
+        if cached_sql is not None:
+            return cached_sql
+
+    if not (gemini_model or get_model()):
+        return "Error: Gemini model not initialized."
+
+    prompt = build_nl_to_sql_prompt(natural_language_query, db_schema_str)
+    with tracer.span("nlp.generate", prompt_tokens=estimate_tokens(prompt), streamed=False) as span:
+        generated = generate_text_with_gemini(prompt, gemini_model)
+        span.set(response_chars=len(generated or ""))
+    if cache and generated and not generated.startswith("Error") and _is_valid_sql(extract_sql(generated)):
+        cache.put(natural_language_query, schema_fingerprint, MODEL_NAME, generated)
+    return generated
+
+def nl_to_sql_stream(natural_language_query, db_schema_str="", schema_fingerprint=None, gemini_model=None,
+                     on_partial=None, on_statement=None, cancel_event=None, use_cache=True):
+    """
+    Streaming NL to SQL. Returns the extracted SQL (or an "Error: ..." string).
+    on_partial(sql_so_far) is called as tokens arrive; on_statement(sql) fires as soon as the
+    first statement is complete, and the rest of the stream is then dropped. Setting
+    cancel_event stops consuming the stream (and so the Gemini request) between chunks.
+    use_cache=False always asks the model (e.g. when comparing prompt changes).
+    """
+    cache, schema_fingerprint = _cache_scope(db_schema_str, schema_fingerprint)
+    if not use_cache:
+        cache = None
+    if cache:
+        with tracer.span("nlp.cache_lookup") as span:
+            cached_sql = cache.get(natural_language_query, schema_fingerprint, MODEL_NAME)
+            span.set(hit=cached_sql is not None)
+        sql = extract_sql(cached_sql) if cached_sql is not None else None
+        if sql and _is_valid_sql(sql): # Entries from before validation may hold prose; ask again
+            if on_statement:
+                on_statement(sql)
+            return sql
+
+    if not (gemini_model or get_model()):
+        return "Error: Gemini model not initialized."
+
+    extractor = SqlStreamExtractor()
+    with tracer.span("nlp.prompt") as span:
+        prompt = build_nl_to_sql_prompt(natural_language_query, db_schema_str)
+        prompt_tokens = estimate_tokens(prompt)
+        span.set(prompt_tokens=prompt_tokens, schema_tokens=estimate_tokens(db_schema_str or " "))
+    stream = generate_text_stream(prompt, gemini_model)
+    try:
+        with tracer.span("nlp.generate", prompt_tokens=prompt_tokens, streamed=True) as span:
+            started = time.perf_counter()
+            response_chars = 0
+            for chunk in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    return "Error: Cancelled."
+                if not response_chars:
+                    span.set(first_token_ms=(time.perf_counter() - started) * 1000)
+                response_chars += len(chunk)
+                statement = extractor.feed(chunk)
+                if on_partial:
+                    on_partial(extractor.partial_sql)
+                if statement is not None:
+                    break # Don't wait for trailing tokens (closing fence, explanations)
+            span.set(response_chars=response_chars)
+    except Exception as e:
+        print(f"Error during Gemini API call: {e}")
+        return f"Error generating text: {e}"
+    finally:
+        stream.close()
+
+    sql = extractor.finish()
+    if not sql:
+        response = extractor.buffer.strip()
+        if response:
+            return f"Error: Gemini did not return SQL: {response[:200]}"
+        return "Error: Received an empty response from Gemini."
+    if on_statement:
+        on_statement(sql)
+    if cache and _is_valid_sql(sql): # Never replay SQL that could not run
+        cache.put(natural_language_query, schema_fingerprint, MODEL_NAME, sql)
+    return sql
@@ -0,0 +1,148 @@
+import json
+import sqlglot
+from sqlglot import exp
+from mysql.connector import Error
+from services import db_service
+from core.tracing import tracer
+
+DEFAULT_MAX_ROWS_EXAMINED = 50_000_000 # Reject above this estimate
+DEFAULT_WARN_ROWS_EXAMINED = 1_000_000 # Warn above this estimate
+DEFAULT_LIMIT = 10_000 # Injected into SELECTs that have no LIMIT
+DEFAULT_MAX_EXECUTION_MS = 30_000
+
+# Statement types that only read data
+_READ_ONLY_TYPES = (exp.Select, exp.Union, exp.Show)
+
+
+def validate_sql(sql):
+    """
+    Local (no database) validation of generated SQL. Returns an error message, or None if the
+    SQL is a single read-only statement that parses as MySQL.
+    """
+    if not sql or not sql.strip():
+        return "Error: No SQL was generated."
+    try:
+        # A comment after the final ";" parses as an extra Semicolon node
+        statements = [s for s in sqlglot.parse(sql, read="mysql") if s is not None and not isinstance(s, exp.Semicolon)]
+    except sqlglot.errors.ParseError as e:
+        detail = e.errors[0].get("description") if e.errors else str(e)
+        return f"Error: Generated SQL does not parse: {detail}"
+    if len(statements) != 1:
+        return "Error: Only a single SQL statement is allowed."
+    tree = statements[0]
+    if not isinstance(tree, _READ_ONLY_TYPES):
+        return "Error: Only SELECT or SHOW queries are allowed for MVP."
+    if tree.find(exp.Into): # INTO OUTFILE / DUMPFILE don't parse at all
+        return "Error: SELECT ... INTO is not allowed."
+    return None
+
+
+def explain_query(connection, sql):
+    """Runs EXPLAIN FORMAT=JSON and returns the parsed plan. Raises mysql.connector.Error."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN FORMAT=JSON {sql}")
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return json.loads(row[0])
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def estimate_rows_examined(plan):
+    """
+    Estimates total rows examined from an EXPLAIN FORMAT=JSON plan. In a nested loop each
+    table is scanned once per row produced by the tables before it, so its per-scan estimate
+    is multiplied by the running rows_produced_per_join. Subqueries and materialized derived
+    tables are walked recursively. MariaDB's "rows" is used when the MySQL fields are missing.
+    """
+    def walk(node, scans):
+        if isinstance(node, list):
+            return sum(walk(item, scans) for item in node)
+        if not isinstance(node, dict):
+            return 0.0
+        total = 0.0
+        for key, value in node.items():
+            if key == "nested_loop":
+                loop_scans = scans
+                for item in value:
+                    table = item.get("table", {})
+                    total += walk_table(table, loop_scans)
+                    produced = _number(table.get("rows_produced_per_join"))
+                    if produced:
+                        loop_scans = produced
+            elif key == "table" and isinstance(value, dict):
+                total += walk_table(value, scans)
+            else:
+                total += walk(value, scans)
+        return total
+
+    def walk_table(table, scans):
+        per_scan = _number(table.get("rows_examined_per_scan", table.get("rows")))
+        nested = sum(walk(value, 1) for value in table.values() if isinstance(value, (dict, list)))
+        return per_scan * scans + nested
+
+    return int(walk(plan, 1))
+
+def _needs_limit(tree):
+    if not isinstance(tree, (exp.Select, exp.Union)) or tree.args.get("limit"):
+        return False
+    if isinstance(tree, exp.Select) and not tree.args.get("group") and tree.expressions \
+            and all(e.find(exp.AggFunc) for e in tree.expressions):
+        return False # Aggregate without GROUP BY: always a single row
+    return True
+
+class GuardResult:
+    """Outcome of guard_query: the SQL to run (possibly rewritten), or an error."""
+    def __init__(self, sql, error=None, warnings=None, plan=None, estimated_rows_examined=None, limit_added=None):
+        self.sql = sql
+        self.error = error
+        self.warnings = warnings or []
+        self.plan = plan
+        self.estimated_rows_examined = estimated_rows_examined
+        self.limit_added = limit_added
+
+def guard_query(pool, sql, max_rows_examined=DEFAULT_MAX_ROWS_EXAMINED, warn_rows_examined=DEFAULT_WARN_ROWS_EXAMINED,
+                default_limit=DEFAULT_LIMIT, max_execution_ms=DEFAULT_MAX_EXECUTION_MS):
+    """
+    Pre-execution planner stage: validates the SQL locally, runs EXPLAIN FORMAT=JSON, rejects or
+    warns on the estimated rows examined, injects LIMIT into unbounded SELECTs and adds a
+    MAX_EXECUTION_TIME hint. Nothing is executed, so runaway queries are stopped before they run.
+    """
+    error_msg = validate_sql(sql)
+    if error_msg:
+        return GuardResult(sql, error=error_msg)
+    sql = db_service.strip_trailing_comments(sql).rstrip(";").strip()
+    if sql.upper().startswith("SHOW"):
+        return GuardResult(sql)
+
+    try:
+        with pool.connection() as connection, tracer.span("db.explain") as span:
+            plan = explain_query(connection, sql)
+            estimate = estimate_rows_examined(plan)
+            span.set(estimated_rows_examined=estimate)
+    except Error as e:
+        return GuardResult(sql, error=f"Error: {e}")
+
+    result = GuardResult(sql, plan=plan, estimated_rows_examined=estimate)
+    if max_rows_examined and estimate > max_rows_examined:
+        result.error = (f"Error: Query would examine about {estimate:,} rows "
+                        f"(limit {max_rows_examined:,}). Please narrow the question.")
+        return result
+    if warn_rows_examined and estimate > warn_rows_examined:
+        result.warnings.append(f"This query will examine about {estimate:,} rows and may be slow.")
+
+    tree = sqlglot.parse_one(sql, read="mysql") if default_limit else None
+    if tree is not None and _needs_limit(tree):
+        # Rebuilt from the AST: text appended after a -- comment would be commented out
+        result.sql = tree.limit(int(default_limit)).sql(dialect="mysql", comments=False)
+        result.limit_added = int(default_limit)
+        result.warnings.append(f"No LIMIT was given; at most {result.limit_added:,} rows will be returned.")
+    if max_execution_ms:
+        result.sql = db_service.add_max_execution_time(result.sql, max_execution_ms)
+    return result
@@ -0,0 +1,91 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from services import db_service, snapshot_service
+from core.tracing import tracer
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT_S = 10
+
+_ESTIMATES_QUERY = """
+SELECT TABLE_NAME, TABLE_ROWS
+FROM information_schema.TABLES
+WHERE TABLE_SCHEMA = %s AND TABLE_TYPE = 'BASE TABLE'
+ORDER BY TABLE_NAME
+"""
+
+
+def _quote_identifier(name):
+    return "`" + name.replace("`", "``") + "`"
+
+
+def get_estimated_row_counts(connection, database_name):
+    """
+    Returns {table: approximate row count} from information_schema in a single query.
+    For InnoDB these are optimizer statistics, so they can be off by a wide margin.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(_ESTIMATES_QUERY, (database_name,))
+        return {name: int(rows or 0) for name, rows in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def count_rows_exact(connection, table_name, timeout_s=DEFAULT_TIMEOUT_S, use_cache=True, cache_scope=None):
+    """
+    Runs COUNT(*) with a server-side execution time limit. Raises mysql.connector.Error on timeout.
+    With use_cache the count is reused from db_service.result_cache while the table is unchanged;
+    pass the pool's db_service.cache_scope() to save asking the connection for it.
+    """
+    query = f"SELECT COUNT(*) AS count FROM {_quote_identifier(table_name)}"
+    pending = None
+    if use_cache:
+        scope = cache_scope or db_service.connection_cache_scope(connection)
+        cached_df, pending = db_service.result_cache.lookup(connection, query, scope)
+        if cached_df is not None:
+            return int(cached_df["count"].iloc[0])
+
+    cursor = connection.cursor()
+    try:
+        with tracer.span("db.count_rows", table=table_name):
+            cursor.execute(query.replace("SELECT", f"SELECT /*+ MAX_EXECUTION_TIME({int(timeout_s * 1000)}) */", 1))
+            count = int(cursor.fetchone()[0])
+    finally:
+        cursor.close()
+    db_service.result_cache.store(pending, pd.DataFrame({"count": [count]}))
+    return count
+
+
+def refine_row_counts(pool, table_names, on_count, max_concurrency=DEFAULT_CONCURRENCY,
+                      timeout_s=DEFAULT_TIMEOUT_S, cancel_event=None):
+    """
+    Counts rows exactly for each table, several tables at a time on separate pooled connections.
+    on_count(table, count, error) is called from worker threads as each result arrives; count is
+    None when the table timed out or failed. Blocks until all tables are done or cancel_event is set.
+    """
+    # Leave at least one pooled connection free for the rest of the app
+    workers = max(1, min(max_concurrency, pool.pool_size - 1, len(table_names)))
+
+    def _count(table_name):
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        try:
+            # A fresh enough local snapshot answers without touching MySQL
+            snapshot_df, _ = snapshot_service.query_snapshot(pool, f"SELECT COUNT(*) FROM {_quote_identifier(table_name)}")
+            if snapshot_df is not None:
+                count = int(snapshot_df.iloc[0, 0])
+            else:
+                with pool.connection() as connection:
+                    count = count_rows_exact(connection, table_name, timeout_s, cache_scope=db_service.cache_scope(pool))
+        except Exception as e: # Not just Error: one bad table (decode error, closed pool, ...) must not stop the rest
+            print(f"Could not get exact row count for table {table_name}: {e}")
+            on_count(table_name, None, e)
+            return
+        on_count(table_name, count, None)
+
+    if not table_names:
+        return
+    context = contextvars.copy_context() # So the counts' trace spans join the caller's trace
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rowcount") as executor:
+        list(executor.map(lambda table_name: context.copy().run(_count, table_name), table_names))
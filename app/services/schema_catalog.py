@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from mysql.connector import Error
+from core.config import CACHE_DIR, SCHEMA_FINGERPRINT_TTL_S
+
+# One round trip; order-independent sums of CRC32s so no GROUP_CONCAT length limits apply.
+# Row counts and UPDATE_TIME are deliberately left out: they change with data, not schema.
+_FINGERPRINT_QUERY = """
+SELECT
+    (SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s),
+    (SELECT COALESCE(SUM(CRC32(CONCAT_WS('|', TABLE_NAME, TABLE_TYPE, CREATE_TIME, TABLE_COMMENT))), 0)
+       FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s),
+    (SELECT COUNT(*) FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s),
+    (SELECT COALESCE(SUM(CRC32(CONCAT_WS('|', TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION, COLUMN_TYPE,
+                                         IS_NULLABLE, COLUMN_KEY, COLUMN_COMMENT))), 0)
+       FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = %s),
+    (SELECT COALESCE(SUM(CRC32(CONCAT_WS('|', CONSTRAINT_NAME, TABLE_NAME, COLUMN_NAME,
+                                         REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME))), 0)
+       FROM information_schema.KEY_COLUMN_USAGE WHERE TABLE_SCHEMA = %s)
+"""
+
+_TABLES_QUERY = """
+SELECT TABLE_NAME, TABLE_TYPE, TABLE_ROWS, TABLE_COMMENT
+FROM information_schema.TABLES
+WHERE TABLE_SCHEMA = %s
+ORDER BY TABLE_NAME
+"""
+
+_COLUMNS_QUERY = """
+SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_COMMENT
+FROM information_schema.COLUMNS
+WHERE TABLE_SCHEMA = %s
+ORDER BY TABLE_NAME, ORDINAL_POSITION
+"""
+
+_KEYS_QUERY = """
+SELECT TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+FROM information_schema.KEY_COLUMN_USAGE
+WHERE TABLE_SCHEMA = %s AND (CONSTRAINT_NAME = 'PRIMARY' OR REFERENCED_TABLE_NAME IS NOT NULL)
+ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION
+"""
+
+_cache_lock = threading.Lock()
+_memory_cache = {} # (host, database) -> (SchemaCatalog, monotonic time of last fingerprint check)
+
+
+class SchemaCatalog:
+    """Tables, columns, keys and approximate row counts of one database."""
+    def __init__(self, database, fingerprint, tables):
+        self.database = database
+        self.fingerprint = fingerprint
+        # name -> {"type", "row_estimate", "comment", "columns": [...], "primary_key": [...], "foreign_keys": [...]}
+        self.tables = tables
+
+    @property
+    def table_names(self):
+        return list(self.tables)
+
+    def to_dict(self):
+        return {"database": self.database, "fingerprint": self.fingerprint, "tables": self.tables}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["database"], data["fingerprint"], data["tables"])
+
+    def table_prompt_line(self, name, column_names=None):
+        """One compact line per table, e.g. `orders (~1200 rows): id int PK, customer_id int FK->customers.id`."""
+        table = self.tables[name]
+        fk_targets = {}
+        for fk in table["foreign_keys"]:
+            for col, ref_col in zip(fk["columns"], fk["ref_columns"]):
+                fk_targets[col] = f"{fk['ref_table']}.{ref_col}"
+
+        parts = []
+        for column in table["columns"]:
+            if column_names is not None and column["name"] not in column_names:
+                continue
+            desc = f"{column['name']} {column['type']}"
+            if column["name"] in table["primary_key"]:
+                desc += " PK"
+            if column["name"] in fk_targets:
+                desc += f" FK->{fk_targets[column['name']]}"
+            if column["comment"]:
+                desc += f" /* {column['comment']} */"
+            parts.append(desc)
+
+        header = name
+        if table["row_estimate"] is not None:
+            header += f" (~{table['row_estimate']} rows)"
+        if table["comment"]:
+            header += f" /* {table['comment']} */"
+        return f"{header}: {', '.join(parts)}"
+
+    def to_prompt_string(self, table_names=None):
+        """Schema description for the LLM prompt, optionally restricted to some tables."""
+        names = self.table_names if table_names is None else [n for n in table_names if n in self.tables]
+        if not names:
+            return "No tables found or unable to fetch schema."
+        return "\n".join(self.table_prompt_line(name) for name in names)
+
+
+def compute_schema_fingerprint(connection, database_name):
+    """Cheap checksum over information_schema metadata; changes whenever the schema does."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(_FINGERPRINT_QUERY, (database_name,) * 5)
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return hashlib.sha1("|".join(str(v) for v in row).encode("utf-8")).hexdigest()[:16]
+
+
+def load_schema_catalog(connection, database_name, fingerprint=None):
+    """Introspects the whole database in three bulk information_schema queries."""
+    if fingerprint is None:
+        fingerprint = compute_schema_fingerprint(connection, database_name)
+
+    cursor = connection.cursor()
+    try:
+        tables = {}
+        cursor.execute(_TABLES_QUERY, (database_name,))
+        for name, table_type, row_estimate, comment in cursor.fetchall():
+            tables[name] = {
+                "type": table_type,
+                "row_estimate": int(row_estimate) if row_estimate is not None else None,
+                "comment": comment or "",
+                "columns": [],
+                "primary_key": [],
+                "foreign_keys": [],
+            }
+
+        cursor.execute(_COLUMNS_QUERY, (database_name,))
+        for table_name, name, column_type, nullable, key, comment in cursor.fetchall():
+            if table_name in tables:
+                tables[table_name]["columns"].append({
+                    "name": name,
+                    "type": column_type,
+                    "nullable": nullable == "YES",
+                    "key": key or "",
+                    "comment": comment or "",
+                })
+
+        cursor.execute(_KEYS_QUERY, (database_name,))
+        foreign_keys = {} # (table, constraint) -> fk dict, to group composite keys
+        for table_name, constraint, column, ref_table, ref_column in cursor.fetchall():
+            if table_name not in tables:
+                continue
+            if constraint == "PRIMARY":
+                tables[table_name]["primary_key"].append(column)
+                continue
+            fk = foreign_keys.get((table_name, constraint))
+            if fk is None:
+                fk = {"name": constraint, "columns": [], "ref_table": ref_table, "ref_columns": []}
+                foreign_keys[(table_name, constraint)] = fk
+                tables[table_name]["foreign_keys"].append(fk)
+            fk["columns"].append(column)
+            fk["ref_columns"].append(ref_column)
+    finally:
+        cursor.close()
+
+    return SchemaCatalog(database_name, fingerprint, tables)
+
+
+def _cache_path(host, database_name):
+    safe_name = re.sub(r"[^\w.-]", "_", f"{host}__{database_name}")
+    return os.path.join(CACHE_DIR, "schema", f"{safe_name}.json")
+
+
+def _load_from_disk(host, database_name):
+    path = _cache_path(host, database_name)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return SchemaCatalog.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ignoring unreadable schema cache {path}: {e}")
+        return None
+
+
+def _save_to_disk(host, catalog):
+    path = _cache_path(host, catalog.database)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(catalog.to_dict(), f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not write schema cache {path}: {e}")
+
+
+def get_schema_catalog(pool, max_age=SCHEMA_FINGERPRINT_TTL_S):
+    """
+    Returns the SchemaCatalog for the pool's database, from memory or disk when possible.
+    Within max_age seconds of the last check no query is issued at all; after that only the
+    fingerprint query runs, and a full reload happens only when the fingerprint has changed.
+    Returns None if the schema cannot be read.
+    """
+    host = pool.details["host"]
+    database_name = pool.details["database"]
+    key = (host, database_name)
+
+    with _cache_lock:
+        cached = _memory_cache.get(key)
+        if cached and time.monotonic() - cached[1] < max_age:
+            return cached[0]
+
+        try:
+            with pool.connection() as connection:
+                fingerprint = compute_schema_fingerprint(connection, database_name)
+                catalog = cached[0] if cached else _load_from_disk(host, database_name)
+                if not catalog or catalog.fingerprint != fingerprint:
+                    catalog = load_schema_catalog(connection, database_name, fingerprint)
+                    _save_to_disk(host, catalog)
+                    print(f"Schema catalog for {database_name} (re)loaded: {len(catalog.tables)} tables.")
+        except Error as e:
+            print(f"Error loading schema catalog: {e}")
+            return None
+
+        _memory_cache[key] = (catalog, time.monotonic())
+        return catalog
+
+
+def invalidate_schema_catalog(host, database_name):
+    """Forces the next get_schema_catalog call to re-check the server."""
+    with _cache_lock:
+        _memory_cache.pop((host, database_name), None)
@@ -0,0 +1,191 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+DEFAULT_TOKEN_BUDGET = 2000
+CHARS_PER_TOKEN = 4 # Rough estimate, good enough for budgeting prompts
+BM25_K1 = 1.2
+BM25_B = 0.75
+NAME_BOOST = 2.0 # Extra weight for question terms that appear in the table name itself
+NEIGHBOUR_DECAY = 0.5 # Share of a table's score passed on to its foreign-key neighbours
+
+_STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "by", "with", "and", "or", "is", "are", "was", "were",
+    "be", "been", "has", "have", "had", "do", "does", "did", "there", "any", "last", "this",
+    "what", "which", "who", "how", "many", "much", "show", "list", "give", "me", "all", "get", "find",
+    "each", "per", "from", "that", "than", "more", "less", "top", "most", "least", "their", "its",
+}
+
+# Name suffix parts that mark a copy of another table (orders_archive_2019, users_bak, ...)
+_COPY_SUFFIX_PART_RE = re.compile(r"^(archive[ds]?|backup|bak|old|copy|tmp|temp|hist|history|\d{4,8})$")
+
+_index_lock = threading.Lock()
+_index_cache = {} # (database, fingerprint) -> SchemaIndex
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _stem(token):
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Splits identifiers and prose into lowercase stemmed terms (snake_case, camelCase, digits)."""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text or "")
+    terms = []
+    for token in re.split(r"[^A-Za-z0-9]+", text.lower()):
+        if token and token not in _STOPWORDS:
+            terms.append(_stem(token))
+    return terms
+
+
+class SchemaIndex:
+    """BM25 index over a SchemaCatalog, one document per table."""
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.postings = defaultdict(dict) # term -> {table: term frequency}
+        self.column_terms = {} # table -> {column: set(terms)}
+        self.neighbours = defaultdict(set) # table -> tables linked by a foreign key either way
+        self.name_terms = {} # table -> set of terms in the table name
+        self.doc_lengths = {}
+
+        for name, table in catalog.tables.items():
+            self.name_terms[name] = set(tokenize(name))
+            terms = tokenize(name) + tokenize(table["comment"])
+            self.column_terms[name] = {}
+            for column in table["columns"]:
+                column_terms = tokenize(column["name"]) + tokenize(column["comment"])
+                self.column_terms[name][column["name"]] = set(column_terms)
+                terms += column_terms
+            for fk in table["foreign_keys"]:
+                if fk["ref_table"] in catalog.tables:
+                    self.neighbours[name].add(fk["ref_table"])
+                    self.neighbours[fk["ref_table"]].add(name)
+                    terms += tokenize(fk["ref_table"])
+            for term, tf in Counter(terms).items():
+                self.postings[term][name] = tf
+            self.doc_lengths[name] = len(terms)
+
+        self.avg_doc_length = (sum(self.doc_lengths.values()) / len(self.doc_lengths)) if self.doc_lengths else 0
+        n_docs = len(self.doc_lengths)
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def score_tables(self, question):
+        """
+        {table: score} for tables sharing at least one term with the question: BM25 over the
+        whole table document plus a boost for table-name terms, scaled by how much of the
+        name the question covers (so `orders` beats `orders_archive_2019`).
+        """
+        question_terms = set(tokenize(question))
+        scores = defaultdict(float)
+        for term in question_terms:
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf[term]
+            for table, tf in docs.items():
+                norm = 1 - BM25_B + BM25_B * self.doc_lengths[table] / self.avg_doc_length
+                scores[table] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+        for table in scores:
+            name_terms = self.name_terms[table]
+            matched = name_terms & question_terms
+            if matched:
+                coverage = len(matched) / len(name_terms)
+                scores[table] += NAME_BOOST * coverage * sum(self.idf[t] for t in matched)
+        return scores
+
+    def rank_tables(self, question):
+        """
+        Tables ordered by relevance; foreign-key neighbours of matches inherit part of their score.
+        Copies of a better-ranked table are moved to the end (see _is_copy_of).
+        """
+        scores = self.score_tables(question)
+        ranked = dict(scores)
+        for table, score in scores.items():
+            for neighbour in self.neighbours[table]:
+                ranked[neighbour] = max(ranked.get(neighbour, 0.0), score * NEIGHBOUR_DECAY)
+        ordered = sorted(ranked, key=lambda t: (-ranked[t], t))
+
+        primary, copies = [], []
+        for table in ordered:
+            if any(self._is_copy_of(table, kept) for kept in primary):
+                copies.append(table)
+            else:
+                primary.append(table)
+        return primary + copies
+
+    def _is_copy_of(self, table, original):
+        """
+        `<original>_<suffix>` where every suffix part is archive/backup/year-like, or where the
+        columns are the same; a child table such as order_items is not a copy of orders.
+        """
+        if not table.startswith(f"{original}_"):
+            return False
+        suffix_parts = table[len(original) + 1:].lower().split("_")
+        if all(_COPY_SUFFIX_PART_RE.match(part) for part in suffix_parts):
+            return True
+        return set(self.column_terms[table]) == set(self.column_terms[original])
+
+    def relevant_columns(self, table, question):
+        """Key columns plus columns whose names/comments share a term with the question."""
+        question_terms = set(tokenize(question))
+        info = self.catalog.tables[table]
+        keys = set(info["primary_key"])
+        for fk in info["foreign_keys"]:
+            keys.update(fk["columns"])
+        return {
+            column for column, terms in self.column_terms[table].items()
+            if column in keys or terms & question_terms
+        }
+
+
+def get_schema_index(catalog):
+    """Returns the (cached) SchemaIndex for this catalog version."""
+    key = (catalog.database, catalog.fingerprint)
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is None:
+            index = SchemaIndex(catalog)
+            _index_cache.clear() # Only the current schema version is worth keeping
+            _index_cache[key] = index
+        return index
+
+
+def select_relevant_schema(catalog, question, token_budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Returns the schema description to put in the prompt for this question, within token_budget.
+    Small schemas are returned whole. Otherwise tables are taken in BM25 order (with foreign-key
+    neighbours); each is described in full if it fits, else by its key and matching columns only.
+    """
+    full = catalog.to_prompt_string()
+    if estimate_tokens(full) <= token_budget:
+        return full
+
+    index = get_schema_index(catalog)
+    ranked = index.rank_tables(question)
+    if not ranked:
+        ranked = sorted(catalog.tables) # Nothing matched: fill the budget in name order
+
+    lines = []
+    used = 0
+    for table in ranked:
+        line = catalog.table_prompt_line(table)
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget:
+            line = catalog.table_prompt_line(table, column_names=index.relevant_columns(table, question))
+            cost = estimate_tokens(line) + 1
+            if used + cost > token_budget:
+                continue # Try smaller tables further down the ranking
+        lines.append(line)
+        used += cost
+    return "\n".join(lines) if lines else full[:token_budget * CHARS_PER_TOKEN]
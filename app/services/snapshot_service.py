@@ -0,0 +1,503 @@
+import datetime
+import os
+import re
+import sqlite3
+import threading
+import time
+import pandas as pd
+import sqlglot
+from sqlglot import exp
+from mysql.connector import Error
+from services import db_service, schema_catalog
+from core.config import (
+    CACHE_DIR, SNAPSHOT_ENABLED, SNAPSHOT_ENGINE, SNAPSHOT_TABLES, SNAPSHOT_WATERMARK_COLUMNS,
+    SNAPSHOT_MAX_STALENESS_S, SNAPSHOT_FULL_REFRESH_S
+)
+from core.task_runner import CancelledError
+from core.tracing import tracer
+
+SYNC_BATCH_SIZE = 10_000 # Rows fetched from MySQL and written locally per batch
+# Incremental syncs re-read this much before the watermark, for rows committed late with older timestamps
+WATERMARK_OVERLAP_S = 60
+
+_WATERMARK_NAMES = {"updated_at", "updated_on", "modified_at", "modified_on", "last_modified", "last_updated"}
+_INTEGER_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint", "year"}
+_FLOAT_TYPES = {"decimal", "numeric", "float", "double", "real"}
+_TEMPORAL_TYPES = {"date", "datetime", "timestamp"}
+_BINARY_TYPES = {"binary", "varbinary", "tinyblob", "blob", "mediumblob", "longblob", "bit"}
+_STATE_TABLE = "_snapshot_tables"
+_LOADING_SUFFIX = "__snapshot_loading"
+
+_snapshots_lock = threading.Lock()
+_snapshots = {} # (host, database) -> Snapshot, or None if it could not be opened
+_sync_thread_lock = threading.Lock()
+_sync_thread = None # Thread of the last start_sync_thread call
+
+
+def _quote(name):
+    """Identifier quoting for the local engines (both use standard double quotes)."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _mysql_quote(name):
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def _base_type(column_type):
+    """'int(10) unsigned' -> 'int'."""
+    return re.split(r"[\s(]", column_type.strip().lower(), maxsplit=1)[0]
+
+
+class _DuckDBStore:
+    """Snapshot storage in DuckDB: columnar, vectorized GROUP BYs; batches are inserted as DataFrames."""
+    dialect = "duckdb"
+    extension = ".duckdb"
+
+    def __init__(self, path):
+        import duckdb # Optional dependency; only imported when a snapshot is opened
+        self.errors = (duckdb.Error,)
+        self.connection = duckdb.connect(path)
+        # MySQL's default collations compare case-insensitively; match them so results agree
+        self.connection.execute("SET default_collation = 'nocase'")
+        # Generated SQL runs here too; it must not be able to read or write local files
+        self.connection.execute("SET enable_external_access = false")
+
+    def column_type(self, column_type):
+        base = _base_type(column_type)
+        if base == "bigint" and "unsigned" in column_type.lower():
+            return "UBIGINT"
+        if base in _INTEGER_TYPES:
+            return "BIGINT"
+        if base in _FLOAT_TYPES:
+            return "DOUBLE" # Like columnar's default DataFrames: decimals become doubles
+        if base == "date":
+            return "DATE"
+        if base in _TEMPORAL_TYPES:
+            return "TIMESTAMP"
+        if base == "time":
+            return "INTERVAL"
+        if base in _BINARY_TYPES:
+            return "BLOB"
+        return "VARCHAR"
+
+    def execute(self, sql, params=None):
+        self.connection.execute(sql, params or [])
+
+    def query(self, sql):
+        return self.connection.execute(sql).df()
+
+    def append(self, table, df):
+        self.connection.register("_snapshot_batch", df)
+        try:
+            self.connection.execute(f"INSERT INTO {_quote(table)} SELECT * FROM _snapshot_batch")
+        finally:
+            self.connection.unregister("_snapshot_batch")
+
+    def delete_keys(self, table, key, values):
+        self.connection.register("_snapshot_keys", pd.DataFrame({"key": values}))
+        try:
+            self.connection.execute(f"DELETE FROM {_quote(table)} WHERE {_quote(key)} IN (SELECT key FROM _snapshot_keys)")
+        finally:
+            self.connection.unregister("_snapshot_keys")
+
+    def index_key(self, table, key):
+        pass # Deletes by key are a hash join; an index would only slow down bulk inserts
+
+
+class _SQLiteStore:
+    """Snapshot storage in SQLite (standard library), used when duckdb is not installed."""
+    dialect = "sqlite"
+    extension = ".sqlite3"
+    errors = (sqlite3.Error,)
+
+    def __init__(self, path):
+        # Access is serialized by Snapshot's lock, so the connection can move between worker threads
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+
+    def column_type(self, column_type):
+        base = _base_type(column_type)
+        if base in _INTEGER_TYPES:
+            return "INTEGER"
+        if base in _FLOAT_TYPES:
+            return "REAL"
+        if base in _BINARY_TYPES:
+            return "BLOB"
+        if base in _TEMPORAL_TYPES or base == "time":
+            return "TEXT" # ISO strings, which sort and compare like the MySQL values
+        return "TEXT COLLATE NOCASE" # Case-insensitive like MySQL's default collations
+
+    def execute(self, sql, params=None):
+        self.connection.execute(sql, params or ())
+        self.connection.commit()
+
+    def query(self, sql):
+        cursor = self.connection.execute(sql) # Not pd.read_sql_query, which wraps sqlite3 errors in its own type
+        try:
+            return pd.DataFrame(cursor.fetchall(), columns=[column[0] for column in cursor.description])
+        finally:
+            cursor.close()
+
+    def append(self, table, df):
+        for column in df.columns[[pd.api.types.is_timedelta64_dtype(dtype) for dtype in df.dtypes]]:
+            df[column] = df[column].astype(str)
+        df.to_sql(table, self.connection, if_exists="append", index=False)
+        self.connection.commit()
+
+    def delete_keys(self, table, key, values):
+        self.connection.executemany(f"DELETE FROM {_quote(table)} WHERE {_quote(key)} = ?",
+                                    [(value,) for value in pd.Series(values).tolist()])
+        self.connection.commit()
+
+    def index_key(self, table, key):
+        self.execute(f"CREATE INDEX IF NOT EXISTS {_quote(table + '__key')} ON {_quote(table)} ({_quote(key)})")
+
+
+def _open_store(path, engine):
+    """Opens path + the engine's file extension. engine is "auto", "duckdb" or "sqlite"."""
+    if engine in ("auto", "duckdb"):
+        try:
+            return _DuckDBStore(path + _DuckDBStore.extension)
+        except ImportError:
+            if engine == "duckdb":
+                print("Snapshot: duckdb is not installed; using SQLite instead.")
+    return _SQLiteStore(path + _SQLiteStore.extension)
+
+
+def _sync_strategy(table, watermark_column=None):
+    """
+    (strategy, key column, watermark column) for a SchemaCatalog table entry:
+    "watermark" needs a single-column primary key and a watermark column (configured, or a
+    date/time column with a name like updated_at), "key_range" an integer single-column primary
+    key (append-only tables); anything else is copied in "full" every time.
+    """
+    types = {column["name"]: _base_type(column["type"]) for column in table["columns"]}
+    key = table["primary_key"][0] if len(table["primary_key"]) == 1 else None
+    if watermark_column is None:
+        watermark_column = next((name for name, base in types.items()
+                                 if name.lower() in _WATERMARK_NAMES and base in _TEMPORAL_TYPES), None)
+    if key and watermark_column in types:
+        return "watermark", key, watermark_column
+    if key and types.get(key) in _INTEGER_TYPES:
+        return "key_range", key, None
+    return "full", None, None
+
+
+def _analyze(sql, database):
+    """
+    (tree, table names) for a single read-only analytical query (aggregates, GROUP BY, DISTINCT or
+    window functions) over tables of database; None for anything else. Row listings and point
+    lookups stay on MySQL, where indexes make them cheap and paging keeps them live.
+    Database qualifiers are removed from the returned tree, as the snapshot has no databases.
+    """
+    try:
+        statements = [s for s in sqlglot.parse(sql, read="mysql") if s is not None]
+    except sqlglot.errors.ParseError:
+        return None
+    if len(statements) != 1 or not isinstance(statements[0], (exp.Select, exp.Union)):
+        return None
+    tree = statements[0]
+    if tree.find(exp.Into):
+        return None
+    if not any(tree.find(node_type) for node_type in (exp.AggFunc, exp.Group, exp.Distinct, exp.Window)):
+        return None
+
+    cte_names = {cte.alias for cte in tree.find_all(exp.CTE)}
+    tables = set()
+    for table in tree.find_all(exp.Table):
+        if not table.name or (table.db and table.db != database):
+            return None
+        if not table.db and table.name in cte_names:
+            continue
+        table.set("db", None)
+        table.set("catalog", None)
+        tables.add(table.name)
+    if not tables:
+        return None
+    _keep_column_names(tree)
+    return tree, tables
+
+
+def _keep_column_names(tree):
+    """Aliases computed result columns with their MySQL text; local engines name e.g. COUNT(*) differently."""
+    select = tree
+    while isinstance(select, exp.Union):
+        select = select.left
+    for projection in list(select.expressions):
+        if not isinstance(projection, (exp.Alias, exp.Column, exp.Star)):
+            projection.replace(exp.alias_(projection.copy(), projection.sql(dialect="mysql"), quoted=True))
+
+
+class Snapshot:
+    """
+    Local copy of some tables of one MySQL database, in DuckDB when installed, else SQLite.
+
+    sync() copies new and changed rows per table (see _sync_strategy): rows at or after the
+    local watermark maximum replace their local versions by primary key, and key-range tables
+    only append rows above the local key maximum. Incremental syncs cannot see deleted rows
+    (or updates in key-range tables), so each table is re-copied in full every full_refresh_s,
+    into a side table that replaces the old one when complete. query() answers analytical SQL
+    locally when every table it reads was synced within the caller's freshness bound.
+    """
+    def __init__(self, path, database, engine="auto", full_refresh_s=SNAPSHOT_FULL_REFRESH_S):
+        self.database = database
+        self.full_refresh_s = full_refresh_s
+        self._store = _open_store(path, engine)
+        self._lock = threading.Lock() # The local connection is used by one thread at a time
+        self._sync_lock = threading.Lock() # One sync at a time
+        self._connection_details = None # Of the running sync, for killing an abandoned SELECT
+        self._store.execute(
+            f"CREATE TABLE IF NOT EXISTS {_STATE_TABLE} (name VARCHAR PRIMARY KEY, strategy VARCHAR, "
+            f"key_column VARCHAR, watermark_column VARCHAR, signature VARCHAR, synced_at DOUBLE, "
+            f"full_synced_at DOUBLE, row_count BIGINT)"
+        )
+        # table -> {"strategy", "key_column", "watermark_column", "signature", "synced_at", "full_synced_at", "row_count"}
+        self._state = {row["name"]: row for row in self._store.query(f"SELECT * FROM {_STATE_TABLE}").to_dict("records")}
+
+    @property
+    def engine(self):
+        return self._store.dialect
+
+    def table_ages(self):
+        """{table: seconds since its last completed sync}."""
+        now = time.time()
+        return {name: now - state["synced_at"] for name, state in self._state.items()}
+
+    def sync(self, connection, catalog, tables=None, watermark_columns=None, cancel_event=None,
+             connection_details=None):
+        """
+        Brings tables (default: every base table in the SchemaCatalog) up to date over a MySQL
+        connection. Returns {table: rows copied}, or None if another sync is still running.
+        Tables that fail are reported and skipped; cancel_event stops between batches. With
+        connection_details, a copy stopped early kills the rest of its SELECT instead of reading it.
+        """
+        if not self._sync_lock.acquire(blocking=False):
+            return None
+        self._connection_details = connection_details
+        try:
+            names = tables or [name for name, table in catalog.tables.items() if table["type"] == "BASE TABLE"]
+            copied = {}
+            for name in names:
+                if name not in catalog.tables:
+                    print(f"Snapshot: table {name} not found in {catalog.database}.")
+                    continue
+                try:
+                    with tracer.span("snapshot.sync_table", table=name) as span:
+                        copied[name] = self._sync_table(connection, name, catalog.tables[name],
+                                                        (watermark_columns or {}).get(name), cancel_event)
+                        span.set(rows=copied[name])
+                except (Error, *self._store.errors) as e:
+                    print(f"Snapshot: could not sync table {name}: {e}")
+            return copied
+        finally:
+            self._sync_lock.release()
+
+    def _sync_table(self, connection, name, table, watermark_column, cancel_event):
+        columns = [(column["name"], column["type"]) for column in table["columns"]]
+        signature = "|".join(f"{column_name} {column_type}" for column_name, column_type in columns)
+        strategy, key, watermark_column = _sync_strategy(table, watermark_column)
+        state = self._state.get(name)
+        started_at = time.time() # Rows committed after this may be missing, so freshness counts from here
+        full = (state is None or strategy == "full"
+                or (state["strategy"], state["key_column"], state["watermark_column"], state["signature"])
+                != (strategy, key, watermark_column, signature)
+                or started_at - state["full_synced_at"] > self.full_refresh_s)
+
+        select = f"SELECT {', '.join(_mysql_quote(column_name) for column_name, _ in columns)} FROM {_mysql_quote(name)}"
+        if full:
+            copied = self._full_copy(connection, name, columns, key, select, cancel_event)
+            full_synced_at = started_at
+        else:
+            copied = self._incremental_copy(connection, name, table, strategy, key, watermark_column, select, cancel_event)
+            full_synced_at = state["full_synced_at"]
+
+        with self._lock:
+            row_count = int(self._store.query(f"SELECT COUNT(*) FROM {_quote(name)}").iloc[0, 0])
+            state = {"name": name, "strategy": strategy, "key_column": key, "watermark_column": watermark_column,
+                     "signature": signature, "synced_at": started_at, "full_synced_at": full_synced_at,
+                     "row_count": row_count}
+            self._store.execute(f"DELETE FROM {_STATE_TABLE} WHERE name = ?", [name])
+            self._store.execute(f"INSERT INTO {_STATE_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?)", list(state.values()))
+            self._state[name] = state
+        return copied
+
+    def _batches(self, connection, sql, params, cancel_event):
+        for batch in db_service.iter_query_chunks(connection, sql, batch_size=SYNC_BATCH_SIZE,
+                                                  max_rows=None, max_bytes=None, params=params,
+                                                  connection_details=self._connection_details):
+            if cancel_event is not None and cancel_event.is_set():
+                raise CancelledError("Snapshot sync cancelled.")
+            yield batch
+
+    def _full_copy(self, connection, name, columns, key, select, cancel_event):
+        loading = name + _LOADING_SUFFIX
+        column_sql = ", ".join(f"{_quote(column_name)} {self._store.column_type(column_type)}"
+                               for column_name, column_type in columns)
+        with self._lock:
+            self._store.execute(f"DROP TABLE IF EXISTS {_quote(loading)}")
+            self._store.execute(f"CREATE TABLE {_quote(loading)} ({column_sql})")
+        copied = 0
+        try:
+            for batch in self._batches(connection, select, None, cancel_event):
+                with self._lock:
+                    self._store.append(loading, batch)
+                copied += len(batch)
+        except BaseException:
+            with self._lock:
+                self._store.execute(f"DROP TABLE IF EXISTS {_quote(loading)}")
+            raise
+        # Queries see either the old copy or the complete new one
+        with self._lock:
+            self._store.execute(f"DROP TABLE IF EXISTS {_quote(name)}")
+            self._store.execute(f"ALTER TABLE {_quote(loading)} RENAME TO {_quote(name)}")
+            if key:
+                self._store.index_key(name, key)
+        return copied
+
+    def _incremental_copy(self, connection, name, table, strategy, key, watermark_column, select, cancel_event):
+        column = watermark_column if strategy == "watermark" else key
+        with self._lock:
+            last = self._store.query(f"SELECT MAX({_quote(column)}) FROM {_quote(name)}").iloc[0, 0]
+        if pd.isna(last):
+            sql, params = select, None # Nothing copied yet
+        elif strategy == "watermark":
+            watermark_type = next(c["type"] for c in table["columns"] if c["name"] == watermark_column)
+            if _base_type(watermark_type) in _TEMPORAL_TYPES:
+                last = pd.Timestamp(last).to_pydatetime() - datetime.timedelta(seconds=WATERMARK_OVERLAP_S)
+            sql, params = f"{select} WHERE {_mysql_quote(watermark_column)} >= %s", (_python_value(last),)
+        else:
+            sql, params = f"{select} WHERE {_mysql_quote(key)} > %s", (_python_value(last),)
+
+        copied = 0
+        for batch in self._batches(connection, sql, params, cancel_event):
+            with self._lock:
+                if strategy == "watermark":
+                    self._store.delete_keys(name, key, batch[key])
+                self._store.append(name, batch)
+            copied += len(batch)
+        return copied
+
+    def query(self, sql, max_staleness_s=SNAPSHOT_MAX_STALENESS_S, max_rows=None):
+        """
+        Runs read-only analytical SQL (MySQL dialect, transpiled with sqlglot) locally if every
+        table it reads was synced within max_staleness_s. Returns (df, age_s of the oldest table),
+        or (None, None) when the query has to go to MySQL instead: not analytical, a table missing
+        or too old, more than max_rows rows, or SQL the local engine cannot run.
+        """
+        if not self._state:
+            return None, None
+        analyzed = _analyze(sql, self.database)
+        if analyzed is None:
+            return None, None
+        tree, tables = analyzed
+        ages = self.table_ages()
+        if any(ages.get(table, max_staleness_s + 1) > max_staleness_s for table in tables):
+            return None, None
+        if max_rows is not None and not tree.args.get("limit"):
+            tree = tree.limit(max_rows + 1)
+
+        try:
+            local_sql = tree.sql(dialect=self._store.dialect)
+            with self._lock, tracer.span("snapshot.query", engine=self._store.dialect) as span:
+                df = self._store.query(local_sql)
+                span.set(rows=len(df))
+        except (sqlglot.errors.SqlglotError, *self._store.errors) as e:
+            print(f"Snapshot: running in MySQL instead, the local engine could not run the query: {e}")
+            return None, None
+        if max_rows is not None and len(df) > max_rows:
+            return None, None
+        return df, max(ages[table] for table in tables)
+
+
+def _python_value(value):
+    """numpy scalars -> Python values the MySQL connector can bind."""
+    return value.item() if hasattr(value, "item") else value
+
+
+def _snapshot_path(host, database_name):
+    safe_name = re.sub(r"[^\w.-]", "_", f"{host}__{database_name}")
+    return os.path.join(CACHE_DIR, "snapshots", safe_name)
+
+
+def get_snapshot(pool):
+    """
+    The Snapshot for the pool's database, opened on first use. None when snapshots are disabled
+    (SNAPSHOT_ENABLED) or the local file cannot be opened, e.g. while another process has it open.
+    """
+    if not SNAPSHOT_ENABLED:
+        return None
+    host = pool.details["host"]
+    database_name = pool.details["database"]
+    with _snapshots_lock:
+        if (host, database_name) not in _snapshots:
+            path = _snapshot_path(host, database_name)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                _snapshots[(host, database_name)] = Snapshot(path, database_name, SNAPSHOT_ENGINE)
+            except Exception as e:
+                print(f"Snapshot for {database_name} unavailable: {e}")
+                _snapshots[(host, database_name)] = None
+        return _snapshots[(host, database_name)]
+
+
+def sync_snapshot(pool, tables=None, cancel_event=None):
+    """
+    Syncs the pool's snapshot: SNAPSHOT_TABLES (default: all tables), incrementally where possible.
+    The copy runs over a connection of its own, not one of the pool's, so a long full copy never
+    holds a slot that interactive work is waiting for. Returns {table: rows copied}, or None if
+    snapshots are off, the connection fails or a sync is already running.
+    """
+    snapshot = get_snapshot(pool)
+    if snapshot is None:
+        return None
+    catalog = schema_catalog.get_schema_catalog(pool)
+    if catalog is None:
+        return None
+    details = pool.details
+    connection = db_service.connect_to_db(details["host"], details["user"], details["password"], details["database"])
+    if connection is None:
+        return None
+    start = time.perf_counter()
+    try:
+        with tracer.trace("snapshot.sync") as span:
+            copied = snapshot.sync(connection, catalog, tables or SNAPSHOT_TABLES or None,
+                                   SNAPSHOT_WATERMARK_COLUMNS, cancel_event, connection_details=details)
+            span.set(rows=sum(copied.values()) if copied else 0, tables=len(copied or {}))
+    finally:
+        db_service.disconnect_from_db(connection)
+    if copied is not None:
+        print(f"Snapshot of {catalog.database} ({snapshot.engine}) synced: {sum(copied.values()):,} rows copied "
+              f"for {len(copied)} tables in {time.perf_counter() - start:.1f} s.")
+    return copied
+
+
+def start_sync_thread(pool, cancel_event=None):
+    """
+    Runs sync_snapshot on a thread of its own, so a long copy never occupies the UI's worker pool
+    (and delays the work, or the KILL QUERY, queued there). Returns False without starting
+    anything while the previous sync is still running.
+    """
+    global _sync_thread
+
+    def _run():
+        try:
+            sync_snapshot(pool, cancel_event=cancel_event)
+        except Exception as e:
+            print(f"Snapshot sync failed: {e}")
+
+    with _sync_thread_lock:
+        if _sync_thread is not None and _sync_thread.is_alive():
+            return False
+        _sync_thread = threading.Thread(target=_run, name="dbconverse-snapshot", daemon=True)
+        _sync_thread.start()
+        return True
+
+
+def query_snapshot(pool, sql, max_staleness_s=SNAPSHOT_MAX_STALENESS_S, max_rows=None):
+    """
+    Routes a query to the pool's snapshot. Returns (df, age_s) if it was answered locally,
+    else (None, None) and the caller runs it in MySQL as usual. See Snapshot.query.
+    """
+    snapshot = get_snapshot(pool)
+    if snapshot is None:
+        return None, None
+    return snapshot.query(sql, max_staleness_s, max_rows)
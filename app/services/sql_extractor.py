@@ -0,0 +1,190 @@
+import re
+
+# A line that starts the SQL itself (as opposed to prose like "Here is the query:")
+_SQL_START_RE = re.compile(
+    r"^\s*`?\s*(SELECT|WITH|SHOW|DESCRIBE|DESC|EXPLAIN|\(|INSERT|UPDATE|DELETE|REPLACE|CREATE|ALTER|DROP|TRUNCATE)\b",
+    re.IGNORECASE
+)
+_FENCE = "```"
+# After a blank line, bare SQL only continues with an indented line, punctuation or a clause keyword;
+# a line starting with any other word ("This query ...") is prose
+_BLANK_LINES_RE = re.compile(r"\n[ \t]*\r?\n(?:[ \t]*\r?\n)*")
+_PROSE_LINE_RE = re.compile(
+    r"^(?!(?:SELECT|WITH|FROM|WHERE|JOIN|INNER|LEFT|RIGHT|CROSS|FULL|NATURAL|STRAIGHT_JOIN|ON|USING|AND|OR|NOT"
+    r"|GROUP|HAVING|ORDER|LIMIT|OFFSET|UNION|INTERSECT|EXCEPT|WINDOW|CASE|WHEN|THEN|ELSE|END|AS)\b)[A-Za-z]",
+    re.IGNORECASE
+)
+
+
+class SqlStreamExtractor:
+    """
+    Incrementally extracts the first SQL statement from LLM output as it streams in.
+
+    Handles ```sql fenced blocks, inline `backticked` SQL and bare SQL, optionally preceded by
+    prose lines. A statement is complete at the first top-level ';', the closing fence, the
+    closing backtick of inline SQL, or (bare SQL) a blank line followed by prose. Quotes,
+    backticked identifiers and comments are tracked so semicolons inside them do not count.
+    Output with no line that starts like SQL (e.g. a refusal) yields "".
+    """
+    def __init__(self):
+        self.buffer = ""
+        self.mode = None # None until resolved, then "fenced", "inline" or "bare"
+        self.statement = None # Set once the first statement is complete
+        self._start = 0 # Offset of the SQL body in buffer
+        self._pos = 0 # Scan position in buffer
+        self._state = "normal" # normal | single | double | backtick | line_comment | block_comment
+        self._line_start = 0 # Offset of the first unresolved line while mode is None
+
+    @property
+    def complete(self):
+        return self.statement is not None
+
+    @property
+    def partial_sql(self):
+        """SQL seen so far (for live display); the full statement once complete."""
+        if self.statement is not None:
+            return self.statement
+        if self.mode is None:
+            return ""
+        return self._clean_tail(self.buffer[self._start:])
+
+    def feed(self, text):
+        """Adds streamed text. Returns the statement when it completes with this chunk, else None."""
+        if self.statement is not None:
+            return None
+        self.buffer += text
+        if self.mode is None and not self._resolve_mode(final=False):
+            return None
+        if self._scan():
+            return self.statement
+        return None
+
+    def finish(self):
+        """Call when the stream ends. Returns the (possibly unterminated) statement, or "" if there is no SQL."""
+        if self.statement is not None:
+            return self.statement
+        if self.mode is None and not self._resolve_mode(final=True):
+            self.statement = ""
+            return self.statement
+        self._scan(final=True)
+        if self.statement is None:
+            self.statement = self._clean_tail(self.buffer[self._start:])
+        return self.statement
+
+    def _resolve_mode(self, final):
+        while True:
+            newline = self.buffer.find("\n", self._line_start)
+            line = self.buffer[self._line_start:] if newline == -1 else self.buffer[self._line_start:newline]
+            stripped = line.lstrip()
+            if stripped.startswith(_FENCE):
+                if newline == -1 and not final:
+                    return False # Wait for the language tag to end
+                self.mode = "fenced"
+                self._start = len(self.buffer) if newline == -1 else newline + 1
+            elif _SQL_START_RE.match(line):
+                offset = self._line_start + (len(line) - len(stripped))
+                if stripped.startswith("`"):
+                    self.mode = "inline"
+                    offset += 1
+                else:
+                    self.mode = "bare"
+                self._start = offset
+            elif newline != -1:
+                self._line_start = newline + 1 # Prose line; skip it
+                continue
+            else:
+                return False
+            self._pos = self._start
+            return True
+
+    def _scan(self, final=False):
+        buf = self.buffer
+        pos = self._pos
+        state = self._state
+        while pos < len(buf):
+            ch = buf[pos]
+            if state == "normal":
+                if not final and buf[pos:] in ("-", "--", "/"):
+                    break # Possibly the start of a comment; wait for the next chunk
+                if ch == ";" or (ch == "`" and self.mode == "inline"):
+                    # Inline code cannot contain a backtick, so the next one closes it
+                    self._complete(pos)
+                    return True
+                if ch == "\n" and self.mode == "bare":
+                    prose_follows = self._prose_follows(pos, final)
+                    if prose_follows is None:
+                        break # Not enough of the next lines streamed to tell
+                    if prose_follows:
+                        self._complete(pos)
+                        return True
+                if self.mode == "fenced" and buf.startswith(_FENCE, pos) and (pos == 0 or buf[pos - 1] == "\n"):
+                    self._complete(pos)
+                    return True
+                if ch == "'":
+                    state = "single"
+                elif ch == '"':
+                    state = "double"
+                elif ch == "`":
+                    if self.mode == "fenced" and buf.startswith(_FENCE, pos):
+                        pos += len(_FENCE) - 1 # Mid-line closing fence; stripped by _clean_tail
+                    elif not final and self.mode == "fenced" and _FENCE.startswith(buf[pos:]):
+                        break # Could be the start of the closing fence; wait
+                    else:
+                        state = "backtick"
+                elif ch == "#" or buf.startswith("-- ", pos):
+                    state = "line_comment"
+                elif buf.startswith("/*", pos):
+                    state = "block_comment"
+                    pos += 1
+            elif state in ("single", "double"):
+                if ch == "\\":
+                    if pos + 1 >= len(buf):
+                        break # Escaped char not streamed yet
+                    pos += 1
+                elif (ch == "'" and state == "single") or (ch == '"' and state == "double"):
+                    state = "normal"
+            elif state == "backtick":
+                if ch == "`":
+                    state = "normal"
+            elif state == "line_comment":
+                if ch == "\n":
+                    state = "normal"
+            elif state == "block_comment":
+                if ch == "*" and pos + 1 >= len(buf) and not final:
+                    break
+                if buf.startswith("*/", pos):
+                    state = "normal"
+                    pos += 1
+            pos += 1
+        self._pos = pos
+        self._state = state
+        return False
+
+    def _prose_follows(self, pos, final):
+        """For the newline at pos: True if a blank line and then prose follow, None if it can't tell yet."""
+        rest = self.buffer[pos:]
+        blank = _BLANK_LINES_RE.match(rest)
+        if not blank:
+            return None if not final and not rest.strip() else False
+        next_line = rest[blank.end():]
+        if not final and re.fullmatch(r"[ \t]*\w*", next_line):
+            return None # The next line's first word may be incomplete
+        return bool(_PROSE_LINE_RE.match(next_line))
+
+    def _complete(self, end):
+        self.statement = self._clean_tail(self.buffer[self._start:end])
+
+    def _clean_tail(self, sql):
+        sql = sql.strip()
+        if sql.endswith(_FENCE):
+            sql = sql[:-len(_FENCE)].rstrip()
+        if self.mode == "inline" and sql.endswith("`") and sql.count("`") % 2 == 1:
+            sql = sql[:-1].rstrip()
+        return sql.rstrip(";").strip()
+
+
+def extract_sql(text):
+    """Extracts the first SQL statement from complete LLM output (fenced, inline or bare)."""
+    extractor = SqlStreamExtractor()
+    extractor.feed(text)
+    return extractor.finish()
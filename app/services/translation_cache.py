@@ -0,0 +1,201 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_DISK_ENTRIES = 5000
+DEFAULT_TTL_S = 7 * 24 * 3600
+FUZZY_CANDIDATES = 500 # Most recently used entries considered by the fuzzy tier
+_KEY_VERSION = 2 # Bump when normalize_question changes, so keys made the old way stop matching
+
+_NUMBER_RE = re.compile(r"^-?\d+(\.\d+)?$")
+_COMPARISON_RE = re.compile(r"(<=|>=|<>|!=|=|<|>)")
+_COMPARISONS = {"<=", ">=", "<>", "!=", "=", "<", ">"}
+
+
+def normalize_question(text):
+    """
+    Lowercases, drops sentence punctuation and collapses whitespace so trivial rephrasings share a
+    key. Comparison operators, minus signs and decimal points change the meaning and are kept.
+    """
+    text = _COMPARISON_RE.sub(r" \1 ", text.lower()) # "amount>100" and "amount > 100" tokenize alike
+    text = re.sub(r"[^\w\s.<>=!-]", " ", text)
+    text = re.sub(r"!(?!=)", " ", text) # Exclamation marks, but not !=
+    text = re.sub(r"(?<=\w)-|-(?!\d)", " ", text) # Hyphens and dashes, but not the sign of a number
+    text = re.sub(r"(?<!\d)\.|\.(?!\d)", " ", text) # Keep decimal points, drop sentence dots
+    return " ".join(text.split())
+
+
+def token_set_similarity(a, b):
+    """Jaccard similarity of the two questions' token sets (0..1)."""
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+
+def _literals(text):
+    """Numbers and comparison operators: questions that differ in these never share SQL."""
+    return {token for token in text.split() if _NUMBER_RE.match(token) or token in _COMPARISONS}
+
+
+class TranslationCache:
+    """
+    Two-tier cache of NL-to-SQL translations keyed by (normalized question, schema fingerprint, model).
+    An in-memory LRU sits in front of a persistent SQLite table; both honour a TTL and a size cap.
+    With fuzzy_threshold set, a miss falls back to the closest cached phrasing by token-set similarity,
+    but only if both questions mention exactly the same numbers and comparisons ("top 5" never
+    matches "top 10", nor "amount > 100" "amount < 100").
+    """
+    def __init__(self, db_path, max_memory_entries=DEFAULT_MEMORY_ENTRIES, max_disk_entries=DEFAULT_DISK_ENTRIES,
+                 ttl_s=DEFAULT_TTL_S, fuzzy_threshold=None):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_s = ttl_s
+        self.fuzzy_threshold = fuzzy_threshold
+        self._memory = OrderedDict() # key -> (sql, created_at)
+        self._memory_uses = {} # key -> last memory hit not yet written to the disk tier's last_used
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "fuzzy_hits": 0, "misses": 0, "evictions": 0}
+
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                question TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_translations_scope ON translations (model, fingerprint, last_used)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(normalized_question, schema_fingerprint, model_name):
+        raw = f"{_KEY_VERSION}\0{model_name}\0{schema_fingerprint}\0{normalized_question}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, question, schema_fingerprint, model_name):
+        """Returns the cached SQL for the question, or None on a miss."""
+        normalized = normalize_question(question)
+        key = self.make_key(normalized, schema_fingerprint, model_name)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[1] < self.ttl_s:
+                self._memory.move_to_end(key)
+                self._memory_uses[key] = now # Written with the next put, so a hot entry isn't evicted from disk
+                self._stats["memory_hits"] += 1
+                return entry[0]
+            if entry:
+                del self._memory[key]
+                self._memory_uses.pop(key, None)
+
+            row = self._db.execute("SELECT sql, created_at FROM translations WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] < self.ttl_s:
+                self._touch(key, now)
+                self._remember(key, row[0], row[1])
+                self._stats["disk_hits"] += 1
+                return row[0]
+            if row:
+                self._db.execute("DELETE FROM translations WHERE key = ?", (key,))
+                self._db.commit()
+
+            if self.fuzzy_threshold:
+                sql = self._get_fuzzy(normalized, schema_fingerprint, model_name, now)
+                if sql is not None:
+                    self._stats["fuzzy_hits"] += 1
+                    return sql
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, question, schema_fingerprint, model_name, sql):
+        normalized = normalize_question(question)
+        key = self.make_key(normalized, schema_fingerprint, model_name)
+        now = time.time()
+        with self._lock:
+            self._remember(key, sql, now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations (key, model, fingerprint, question, sql, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model_name, schema_fingerprint, normalized, sql, now, now)
+            )
+            self._memory_uses.pop(key, None)
+            self._flush_memory_uses()
+            self._evict_disk(now)
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["fuzzy_hits"] + stats["misses"]
+        stats["hit_rate"] = (lookups - stats["misses"]) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_uses.clear()
+            self._db.execute("DELETE FROM translations")
+            self._db.commit()
+
+    def _get_fuzzy(self, normalized, schema_fingerprint, model_name, now):
+        self._flush_memory_uses() # Candidates are the most recently used
+        rows = self._db.execute(
+            "SELECT key, question, sql FROM translations WHERE model = ? AND fingerprint = ? AND created_at > ? "
+            "ORDER BY last_used DESC LIMIT ?",
+            (model_name, schema_fingerprint, now - self.ttl_s, FUZZY_CANDIDATES)
+        ).fetchall()
+        literals = _literals(normalized)
+        best_key, best_sql, best_score = None, None, 0.0
+        for key, question, sql in rows:
+            if _literals(question) != literals:
+                continue
+            score = token_set_similarity(normalized, question)
+            if score > best_score:
+                best_key, best_sql, best_score = key, sql, score
+        if best_score >= self.fuzzy_threshold:
+            self._touch(best_key, now)
+            return best_sql
+        return None
+
+    def _remember(self, key, sql, created_at):
+        self._memory[key] = (sql, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _touch(self, key, now):
+        self._db.execute("UPDATE translations SET last_used = ? WHERE key = ?", (now, key))
+        self._db.commit()
+
+    def _flush_memory_uses(self):
+        if self._memory_uses:
+            self._db.executemany("UPDATE translations SET last_used = ? WHERE key = ?",
+                                 [(used, key) for key, used in self._memory_uses.items()])
+            self._memory_uses.clear()
+            self._db.commit()
+
+    def _evict_disk(self, now):
+        cursor = self._db.execute("DELETE FROM translations WHERE created_at <= ?", (now - self.ttl_s,))
+        self._stats["evictions"] += cursor.rowcount
+        count = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        if count > self.max_disk_entries:
+            cursor = self._db.execute(
+                "DELETE FROM translations WHERE key IN (SELECT key FROM translations ORDER BY last_used LIMIT ?)",
+                (count - self.max_disk_entries,)
+            )
+            self._stats["evictions"] += cursor.rowcount
@@ -1,10 +1,38 @@
+import os
+import time
+from tkinter import filedialog
 import customtkinter as ctk
-from services import nlp_service, db_service
 from core.app_state import current_app_state
+from core.config import (
+    RESULT_PAGE_SIZE, MAX_RESULT_ROWS, MAX_RESULT_BYTES, SCHEMA_PROMPT_TOKEN_BUDGET,
+    GUARD_MAX_ROWS_EXAMINED, GUARD_WARN_ROWS_EXAMINED, GUARD_DEFAULT_LIMIT, GUARD_MAX_EXECUTION_MS,
+    EXPORT_BATCH_SIZE
+)
+from core.lazy import lazy_import
+from core.task_runner import Job
+from core.tracing import tracer
+from ui.widgets.result_grid import ResultGrid
+from ui.widgets.chart_widget import ChartWidget
+
+# Loaded on first use (or by the start-up warm-up) so they don't delay the first frame
+nlp_service = lazy_import("services.nlp_service")
+db_service = lazy_import("services.db_service")
+query_guard = lazy_import("services.query_guard")
+schema_catalog = lazy_import("services.schema_catalog")
+schema_retrieval = lazy_import("services.schema_retrieval")
+chart_service = lazy_import("services.chart_service")
+snapshot_service = lazy_import("services.snapshot_service")
+export_service = lazy_import("services.export_service")
 
 class ConverseFrame(ctk.CTkFrame):
-    def __init__(self, master):
+    def __init__(self, master, task_runner):
         super().__init__(master)
+        self.task_runner = task_runner
+        self.current_job = None
+        self.current_result = None # db_service.LazyResult for the last executed query
+        self.result_warnings = [] # Query guard warnings shown above current_result
+        self.current_sql = None # SQL behind current_result as generated (before guard rewrites), for charting
+        self.export_job = None # Running export, independent of the current question
 
         self.nl_input_label = ctk.CTkLabel(self, text="Ask your database:")
         self.nl_input_label.pack(pady=(10,0), padx=10, anchor="w")
@@ -14,8 +42,14 @@ class ConverseFrame(ctk.CTkFrame):
         self.nl_input_entry.bind("<Return>", self._on_submit_query)
 
 
-        self.submit_button = ctk.CTkButton(self, text="Submit Query", command=self._on_submit_query)
-        self.submit_button.pack(pady=5, padx=10)
+        self.button_row = ctk.CTkFrame(self, fg_color="transparent")
+        self.button_row.pack(pady=5, padx=10)
+
+        self.submit_button = ctk.CTkButton(self.button_row, text="Submit Query", command=self._on_submit_query)
+        self.submit_button.pack(side="left", padx=5)
+
+        self.cancel_button = ctk.CTkButton(self.button_row, text="Cancel", command=self._on_cancel_query, state="disabled")
+        self.cancel_button.pack(side="left", padx=5)
 
         self.sql_output_label = ctk.CTkLabel(self, text="Generated SQL:")
         self.sql_output_label.pack(pady=(10,0), padx=10, anchor="w")
@@ -23,11 +57,26 @@ class ConverseFrame(ctk.CTkFrame):
         self.sql_output_text.pack(fill="x", padx=10, pady=5)
         self.sql_output_text.configure(state="disabled")
 
-        self.results_output_label = ctk.CTkLabel(self, text="Results:")
-        self.results_output_label.pack(pady=(10,0), padx=10, anchor="w")
-        self.results_output_text = ctk.CTkTextbox(self, height=150, wrap="none") # Use wrap="none" for tabular data
-        self.results_output_text.pack(fill="both", expand=True, padx=10, pady=(5,10))
+        self.results_header = ctk.CTkFrame(self, fg_color="transparent")
+        self.results_header.pack(fill="x", pady=(10,0), padx=10)
+        self.results_output_label = ctk.CTkLabel(self.results_header, text="Results:")
+        self.results_output_label.pack(side="left")
+        self.chart_button = ctk.CTkButton(self.results_header, text="Chart Result", width=110,
+                                          command=self._on_chart_result, state="disabled")
+        self.chart_button.pack(side="right", padx=(10,0))
+        self.export_button = ctk.CTkButton(self.results_header, text="Export...", width=90,
+                                           command=self._on_export_result, state="disabled")
+        self.export_button.pack(side="right", padx=(10,0))
+        self.results_status_label = ctk.CTkLabel(self.results_header, text="", anchor="e")
+        self.results_status_label.pack(side="right", fill="x", expand=True)
+
+        # Messages go to the textbox; result rows to the virtualized grid. Only one is shown at a time.
+        self.results_area = ctk.CTkFrame(self, fg_color="transparent")
+        self.results_area.pack(fill="both", expand=True, padx=10, pady=(5,10))
+        self.results_output_text = ctk.CTkTextbox(self.results_area, height=150, wrap="word")
         self.results_output_text.configure(state="disabled")
+        self.results_grid = ResultGrid(self.results_area, on_need_more=self._on_grid_needs_rows)
+        self.results_output_text.pack(fill="both", expand=True)
 
     def _on_submit_query(self, event=None):
         nl_query = self.nl_input_entry.get()
@@ -35,45 +84,367 @@ class ConverseFrame(ctk.CTkFrame):
             self._update_results_text("Please enter a query.")
             return
 
-        if not current_app_state.db_connection:
+        if not current_app_state.db_pool:
             self._update_results_text("Error: Not connected to a database.")
             return
 
+        # A new question supersedes whatever is still in flight
+        self.cancel_current_job(show_message=False)
+        self._close_current_result()
+
+        job = Job()
+        job.on_cancel = self._kill_running_query
+        self.current_job = job
+        self.cancel_button.configure(state="normal")
+
         self._update_sql_text("Generating SQL...")
         self._update_results_text("Fetching results...")
+        self.task_runner.submit(self._run_query_pipeline, job, nl_query,
+                                on_error=lambda error: self._on_pipeline_error(job, error))
+
+    def _run_query_pipeline(self, job, nl_query):
+        """Runs on a worker thread. Never touches widgets directly; uses self._post instead."""
+        # One trace per question; the spans of every stage below (and in the services) share its id
+        with tracer.trace("converse.query", question=nl_query, status="cancelled") as trace_span:
+            self._answer_question(job, nl_query, trace_span)
+
+    def _answer_question(self, job, nl_query, trace_span):
+        pool = current_app_state.db_pool
+
+        with tracer.span("schema.fetch") as span:
+            # Cached per host/database; only re-read when the schema fingerprint changes
+            catalog = schema_catalog.get_schema_catalog(pool)
+            span.set(tables=len(catalog.tables) if catalog else None)
+        schema_fingerprint = None # nlp_service falls back to hashing the schema string
+        if catalog:
+            with tracer.span("schema.select") as span:
+                # Only the tables/columns relevant to this question, within the prompt budget
+                schema_str = schema_retrieval.select_relevant_schema(catalog, nl_query, SCHEMA_PROMPT_TOKEN_BUDGET)
+                span.set(schema_tokens=schema_retrieval.estimate_tokens(schema_str))
+            schema_fingerprint = catalog.fingerprint
+        else:
+            with pool.connection() as connection:
+                schema_str = db_service.get_basic_schema_string(connection)
+
+        job.check()
+        guard_future = {}
+
+        def _guard(sql):
+            with tracer.span("query.guard") as span:
+                guard = query_guard.guard_query(
+                    pool, sql,
+                    max_rows_examined=GUARD_MAX_ROWS_EXAMINED, warn_rows_examined=GUARD_WARN_ROWS_EXAMINED,
+                    default_limit=GUARD_DEFAULT_LIMIT, max_execution_ms=GUARD_MAX_EXECUTION_MS
+                )
+                span.set(rejected=guard.error is not None, limit_added=guard.limit_added)
+            return guard
+
+        def _on_statement(sql):
+            # Validate and EXPLAIN as soon as the statement is complete, in parallel with the rest.
+            # Not on the worker pool this pipeline runs on: waiting for it there could deadlock.
+            guard_future["future"] = self.task_runner.start_abandonable(_guard, sql)
+
+        generated_sql = self.task_runner.run_cancellable(
+            job, nlp_service.nl_to_sql_stream, nl_query, schema_str, schema_fingerprint,
+            on_partial=lambda partial_sql: self._post(job, self._update_sql_text, partial_sql),
+            on_statement=_on_statement,
+            cancel_event=job.cancel_event
+        )
+
+        self._post(job, self._update_sql_text, generated_sql if generated_sql else "Failed to generate SQL.")
+        trace_span.set(sql=generated_sql)
+
+        if not generated_sql or generated_sql.startswith("Error:"):
+            trace_span.set(status="translation_failed")
+            self._post(job, self._update_results_text, "Cannot execute query due to SQL generation failure.")
+            self._post(job, self._finish_job)
+            return
+
+        self._post(job, self._update_results_text, "Executing query...")
+        # Analytical questions are answered from the local snapshot while it is fresh enough
+        snapshot_df, snapshot_age = snapshot_service.query_snapshot(pool, generated_sql, max_rows=MAX_RESULT_ROWS)
+        job.check()
+        if snapshot_df is not None:
+            trace_span.set(status="ok", snapshot=True, rows=len(snapshot_df))
+            note = f"From local snapshot, data up to {snapshot_age:,.0f} s old"
+            self._post(job, self._show_result, db_service.LazyResult.from_dataframe(generated_sql, snapshot_df),
+                       [note], generated_sql)
+            self._post(job, self._finish_job)
+            return
+
+        # Cost check before anything runs; the guarded SQL may carry an injected LIMIT and time limit
+        if "future" in guard_future:
+            guard = self.task_runner.wait_cancellable(job, guard_future["future"])
+        else:
+            guard = self.task_runner.run_cancellable(job, _guard, generated_sql)
+        job.check()
+        if guard.error:
+            trace_span.set(status="rejected")
+            self._post(job, self._update_results_text, f"Query rejected before execution: {guard.error}")
+            self._post(job, self._finish_job)
+            return
+        if guard.sql != generated_sql:
+            self._post(job, self._update_sql_text, guard.sql)
+        for warning in guard.warnings:
+            print(f"Query guard warning: {warning}")
+
+        job.db_kill_details = pool.details
+        try:
+            # Keyed by the SQL that runs: the cached page came from guard.sql, LIMIT and all
+            with pool.connection() as connection, tracer.span("db.cache_lookup") as span:
+                cached_df, cache_pending = db_service.result_cache.lookup(connection, guard.sql, db_service.cache_scope(pool))
+                span.set(hit=cached_df is not None)
+        except db_service.Error as e:
+            print(f"Result cache lookup failed: {e}")
+            cached_df, cache_pending = None, None
+        job.check()
+        if cached_df is not None:
+            trace_span.set(status="ok", cached=True, rows=len(cached_df))
+            self._post(job, self._show_result, db_service.LazyResult.from_dataframe(guard.sql, cached_df),
+                       guard.warnings, generated_sql)
+            self._post(job, self._finish_job)
+            return
 
-        schema_str = db_service.get_basic_schema_string(current_app_state.db_connection)
-        generated_sql_raw = nlp_service.nl_to_sql_basic(nl_query, schema_str)
-
-        # Clean the generated SQL to remove markdown
-        generated_sql = generated_sql_raw.strip()
-        if generated_sql.startswith("```sql"):
-            generated_sql = generated_sql[len("```sql"):].strip()
-            if generated_sql.endswith("```"):
-                generated_sql = generated_sql[:-len("```")].strip()
-        elif generated_sql.startswith("```"): # Handle case where "sql" is missing
-            generated_sql = generated_sql[len("```"):].strip()
-            if generated_sql.endswith("```"):
-                generated_sql = generated_sql[:-len("```")].strip()
-        
-        # Further cleanup: remove any remaining backticks if the SQL is simple and on one line
-        # and was enclosed in single backticks by the LLM.
-        if generated_sql.startswith("`") and generated_sql.endswith("`"):
-            generated_sql = generated_sql[1:-1]
-
-
-        self._update_sql_text(generated_sql if generated_sql else "Failed to generate SQL.")
-
-        if generated_sql and not generated_sql.startswith("Error:"):
-            df_results, error_msg = db_service.execute_query(current_app_state.db_connection, generated_sql)
-            if error_msg:
-                self._update_results_text(f"Error executing SQL: {error_msg}")
-            elif df_results.empty:
-                self._update_results_text("Query executed, no results returned or table is empty.")
-            else:
-                self._update_results_text(df_results.to_string())
+        try:
+            result = db_service.LazyResult(
+                pool, guard.sql,
+                page_size=RESULT_PAGE_SIZE, max_rows=MAX_RESULT_ROWS, max_bytes=MAX_RESULT_BYTES,
+                max_execution_ms=GUARD_MAX_EXECUTION_MS,
+                on_statement=lambda connection_id: setattr(job, "db_connection_id", connection_id)
+            )
+            first_page = result.fetch_next_page() # Only the first page; the rest is fetched on demand
+        except db_service.Error as e:
+            job.check() # A killed query surfaces as an error; don't report it
+            trace_span.set(status="error")
+            print(f"Error executing query '{guard.sql}': {e}")
+            self._post(job, self._update_results_text, f"Error executing SQL: Error executing query: {e}")
+            self._post(job, self._finish_job)
+            return
+        if job.cancelled:
+            result.close()
+            job.check()
+
+        if result.exhausted:
+            db_service.result_cache.store(cache_pending, first_page) # Only whole results are reusable
+        trace_span.set(status="ok", rows=result.rows_fetched, bytes=result.bytes_fetched)
+
+        if first_page.empty:
+            result.close()
+            self._post(job, self._update_results_text, "Query executed, no results returned or table is empty.")
         else:
-            self._update_results_text("Cannot execute query due to SQL generation failure.")
+            self._post(job, self._show_result, result, guard.warnings, generated_sql)
+        self._post(job, self._finish_job)
+
+    def _show_result(self, result, warnings=None, sql=None):
+        self.current_result = result
+        self.result_warnings = warnings or []
+        self.current_sql = sql or result.query
+        self.chart_button.configure(state="normal")
+        if not self.export_job:
+            self.export_button.configure(state="normal")
+        with tracer.span("ui.show_result", rows=result.rows_fetched):
+            self.results_grid.set_data(result.to_dataframe(), has_more=result.has_more)
+        self._show_results_widget(self.results_grid)
+        self._update_results_status()
+
+    def _update_results_status(self):
+        result = self.current_result
+        if result is None:
+            self.results_status_label.configure(text="")
+            return
+        status = f"{result.rows_fetched:,} rows"
+        if result.has_more:
+            status += " loaded - scroll for more"
+        elif result.truncated:
+            status += " - truncated by the row/size budget"
+        self.results_status_label.configure(text="  |  ".join(self.result_warnings + [status]))
+
+    def _on_grid_needs_rows(self):
+        """The grid scrolled near its last loaded row; fetch the next page off the UI thread."""
+        result = self.current_result
+        if not result or not result.has_more:
+            self.results_grid.append_rows(None, has_more=False)
+            return
+
+        def _on_page(page):
+            if result is self.current_result:
+                self.results_grid.append_rows(page, has_more=result.has_more)
+                self._update_results_status()
+
+        def _on_error(error):
+            if result is self.current_result:
+                self.results_grid.more_rows_failed()
+                self.results_status_label.configure(text=f"Error fetching more rows: {error}")
+
+        self.task_runner.submit(result.fetch_next_page, on_success=_on_page, on_error=_on_error)
+
+    def _close_current_result(self):
+        if self.current_result:
+            self.task_runner.submit(self.current_result.close) # May drain rows; keep it off the UI thread
+            self.current_result = None
+        self.current_sql = None
+        self.chart_button.configure(state="disabled")
+        if not self.export_job:
+            self.export_button.configure(state="disabled")
+        self.results_grid.clear()
+        self.results_status_label.configure(text="")
+
+    def _on_chart_result(self):
+        """Charts the whole result with aggregation done in MySQL; only the aggregates come back."""
+        result, sql, pool = self.current_result, self.current_sql, current_app_state.db_pool
+        if not result or not sql or not pool:
+            return
+        self.chart_button.configure(state="disabled")
+        self.results_status_label.configure(text="Aggregating result for chart...")
+        sample = self.results_grid.head(1000) # Column types are all plan_chart needs
+
+        def _on_chart(data):
+            if result is not self.current_result:
+                return
+            self.chart_button.configure(state="normal")
+            self._update_results_status()
+            if data is None:
+                self.results_status_label.configure(text="Nothing to chart: the result has no time, text or numeric column.")
+                return
+            self._open_chart_window(data)
+
+        def _on_error(error):
+            if result is self.current_result:
+                self.chart_button.configure(state="normal")
+                self.results_status_label.configure(text=f"Error charting result: {error}")
+
+        self.task_runner.submit(chart_service.chart_query_result, pool, sql, sample,
+                                max_execution_ms=GUARD_MAX_EXECUTION_MS, max_rows_examined=GUARD_MAX_ROWS_EXAMINED,
+                                on_success=_on_chart, on_error=_on_error)
+
+    def _on_export_result(self):
+        """Streams the whole result (not just the loaded pages) to a file; clicked again, cancels."""
+        if self.export_job:
+            self.cancel_export()
+            return
+        sql, pool = self.current_sql, current_app_state.db_pool
+        if not sql or not pool:
+            return
+        file_types = {"csv": ("CSV", "*.csv"), "jsonl": ("JSON Lines", "*.jsonl"), "parquet": ("Parquet", "*.parquet")}
+        path = filedialog.asksaveasfilename(
+            parent=self, title="Export result", defaultextension=".csv",
+            initialfile=time.strftime("dbconverse-result-%Y%m%d-%H%M%S.csv"),
+            filetypes=[file_types[output_format] for output_format in export_service.available_formats()]
+        )
+        if not path:
+            return
+
+        job = Job()
+        job.db_kill_details = pool.details
+        job.on_cancel = self._kill_running_query # Stops the server streaming rows nobody will read
+        self.export_job = job
+        self.export_button.configure(text="Cancel Export")
+        self.results_status_label.configure(text="Exporting...")
+        name = os.path.basename(path)
+
+        def _show_progress(text):
+            if job is self.export_job:
+                self.results_status_label.configure(text=text)
+
+        def _on_progress(rows, bytes_written, elapsed_s):
+            self.task_runner.post(_show_progress, f"Exporting to {name}: {rows:,} rows, {bytes_written / 1e6:,.1f} MB, "
+                                                  f"{rows / max(elapsed_s, 1e-6):,.0f} rows/s")
+
+        def _export():
+            start = time.perf_counter()
+            # Same checks as a question, but no LIMIT or time limit: the export is meant to be complete
+            guard = query_guard.guard_query(
+                pool, sql, max_rows_examined=GUARD_MAX_ROWS_EXAMINED, warn_rows_examined=0,
+                default_limit=0, max_execution_ms=0
+            )
+            if guard.error:
+                raise RuntimeError(guard.error)
+            job.check()
+            rows = export_service.export_query(
+                pool, guard.sql, path, export_service.format_for_path(path), batch_size=EXPORT_BATCH_SIZE,
+                on_progress=_on_progress, cancel_event=job.cancel_event,
+                on_statement=lambda connection_id: setattr(job, "db_connection_id", connection_id)
+            )
+            return rows, time.perf_counter() - start
+
+        def _on_done(outcome):
+            rows, elapsed_s = outcome
+            self._finish_export(job, f"Exported {rows:,} rows to {path} in {elapsed_s:,.1f} s" if rows
+                                else "Nothing to export: the query returned no rows.")
+
+        self.task_runner.submit(_export, on_success=_on_done,
+                                on_error=lambda error: self._finish_export(job, f"Export failed: {error}"))
+
+    def _finish_export(self, job, message):
+        if job is not self.export_job:
+            return
+        self.export_job = None
+        self.export_button.configure(text="Export...", state="normal" if self.current_result else "disabled")
+        self.results_status_label.configure(text=message)
+
+    def cancel_export(self):
+        job = self.export_job
+        if not job:
+            return
+        job.cancel() # The worker stops at its next batch; the partial file is removed
+        self._finish_export(job, "Export cancelled.")
+
+    def _open_chart_window(self, data):
+        window = ctk.CTkToplevel(self)
+        window.title(f"Chart: {data.title}")
+        window.geometry("820x540")
+        chart_w = ChartWidget(window, chart_service.ResultChart(), self.task_runner, height=480)
+        chart_w.pack(fill="both", expand=True, padx=5, pady=5)
+        note_label = ctk.CTkLabel(window, text=data.note)
+        note_label.pack(pady=(0,5))
+        chart_w.set_data(data) # Rendered on a worker
+
+    def _show_results_widget(self, widget):
+        other = self.results_output_text if widget is self.results_grid else self.results_grid
+        if other.winfo_manager():
+            other.pack_forget()
+        if not widget.winfo_manager():
+            widget.pack(fill="both", expand=True)
+
+    def _post(self, job, callback, *args):
+        """Marshals callback onto the Tk thread, dropping it if the job is no longer current."""
+        def _guarded():
+            if job is self.current_job and not job.cancelled:
+                callback(*args)
+        self.task_runner.post(_guarded)
+
+    def _on_pipeline_error(self, job, error):
+        if job is not self.current_job:
+            return # Superseded or cancelled; the newer question owns the results area
+        self._update_results_text(f"Unexpected error: {error}")
+        self._finish_job()
+
+    def _finish_job(self):
+        self.current_job = None
+        self.cancel_button.configure(state="disabled")
+
+    def _on_cancel_query(self):
+        self.cancel_current_job()
+
+    def cancel_current_job(self, show_message=True):
+        job = self.current_job
+        if not job:
+            return
+        job.cancel()
+        self._finish_job()
+        if show_message:
+            self._update_results_text("Query cancelled.")
+
+    def _kill_running_query(self, job):
+        details = job.db_kill_details
+        if job.db_connection_id is None or not details:
+            return # Nothing running on the server; the worker will stop at its next check
+        # Not on the worker pool: with every worker busy, the KILL would queue behind the statement it aborts
+        self.task_runner.run_detached(
+            db_service.kill_query,
+            details["host"], details["user"], details["password"], details["database"],
+            job.db_connection_id
+        )
 
     def _update_sql_text(self, text):
         self.sql_output_text.configure(state="normal")
@@ -82,6 +453,7 @@ class ConverseFrame(ctk.CTkFrame):
         self.sql_output_text.configure(state="disabled")
 
     def _update_results_text(self, text):
+        self._show_results_widget(self.results_output_text)
         self.results_output_text.configure(state="normal")
         self.results_output_text.delete("1.0", "end")
         self.results_output_text.insert("1.0", text)
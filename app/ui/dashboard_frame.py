@@ -1,20 +1,29 @@
 import customtkinter as ctk
 from ui.widgets.chart_widget import ChartWidget
-from services import chart_service, db_service
 from core.app_state import current_app_state
-import seaborn as sns # For styling
-# import matplotlib.pyplot as plt # Not strictly needed here unless modifying plt state directly
+from core.config import ROW_COUNT_CONCURRENCY, ROW_COUNT_TIMEOUT_S
+from core.lazy import lazy_import
+from core.task_runner import Job
+from core.tracing import tracer
+
+# matplotlib/seaborn are only loaded once the first chart is needed
+chart_service = lazy_import("services.chart_service")
+row_count_service = lazy_import("services.row_count_service")
+
+REDRAW_INTERVAL_MS = 300 # Exact counts arriving within this window are drawn together
 
 class DashboardFrame(ctk.CTkFrame):
-    def __init__(self, master):
+    def __init__(self, master, task_runner):
         super().__init__(master)
+        self.task_runner = task_runner
+        self.current_job = None
         self.chart_widgets = [] # To keep track of chart widgets
-
-        # Apply a modern, minimal theme once for charts
-        # You can choose different styles: "whitegrid", "darkgrid", "white", "ticks"
-        # Palettes: "muted", "pastel", "viridis", "rocket", etc.
-        sns.set_theme(style="whitegrid", palette="muted")
-        # plt.style.use('seaborn-v0_8-whitegrid') # Example for older matplotlib/seaborn
+        self.row_count_widget = None # ChartWidget reused across refreshes
+        self.message_labels = []
+        self.row_counts = {} # table -> latest known row count (estimate or exact)
+        self.exact_tables = set() # tables whose count in row_counts is exact
+        self._redraw_pending = False
+        # The chart theme (seaborn "whitegrid") is applied by chart_service when it is first loaded
 
         self.label = ctk.CTkLabel(self, text="Dashboard Summary", font=ctk.CTkFont(size=16, weight="bold"))
         self.label.pack(pady=10)
@@ -22,59 +31,137 @@ class DashboardFrame(ctk.CTkFrame):
         self.refresh_button = ctk.CTkButton(self, text="Refresh Dashboard", command=self.load_dashboard_data)
         self.refresh_button.pack(pady=5)
 
+        self.status_label = ctk.CTkLabel(self, text="")
+        self.status_label.pack()
+
         self.charts_container = ctk.CTkFrame(self) # A frame to hold charts
         self.charts_container.pack(fill="both", expand=True, padx=5, pady=5)
 
+    def cancel_loading(self):
+        if self.current_job:
+            self.current_job.cancel() # Stop counting for the previous refresh
+            self.current_job = None
+
     def load_dashboard_data(self):
-        # Clear existing charts
-        for widget in self.charts_container.winfo_children():
-            widget.destroy()
-        self.chart_widgets.clear()
-
-        if not current_app_state.db_connection:
-            no_conn_label = ctk.CTkLabel(self.charts_container, text="Connect to a database to view dashboard.")
-            no_conn_label.pack(pady=20)
+        self.cancel_loading()
+        self._clear_messages() # The previous chart stays up until the new estimates replace it
+        self.status_label.configure(text="")
+
+        pool = current_app_state.db_pool
+        if not pool:
+            self._show_message("Connect to a database to view dashboard.")
             return
 
         # MVP: Chart of table row counts (example)
-        try:
-            table_names = db_service.get_table_names(current_app_state.db_connection)
-            if not table_names:
-                no_tables_label = ctk.CTkLabel(self.charts_container, text="No tables found in the database.")
-                no_tables_label.pack(pady=20)
-                return
-
-            row_counts = []
-            valid_table_names = []
-            for table in table_names:
-                # Important: Sanitize table name if it comes from user input. Here it's from SHOW TABLES.
-                # For schema generated names, this is safer.
-                df_count, err = db_service.execute_query(current_app_state.db_connection, f"SELECT COUNT(*) as count FROM `{table}`")
-                if not err and not df_count.empty:
-                    row_counts.append(df_count['count'].iloc[0])
-                    valid_table_names.append(table)
-                else:
-                    print(f"Could not get row count for table {table}: {err}")
-
-            if valid_table_names and row_counts:
-                fig = chart_service.generate_bar_chart_figure(
-                    labels=valid_table_names,
-                    values=row_counts,
-                    title="Row Counts per Table",
-                    xlabel="Table Name",
-                    ylabel="Number of Rows"
-                )
-                chart_frame = ctk.CTkFrame(self.charts_container) # Frame for each chart
-                chart_frame.pack(pady=5, padx=5, fill="x") # Or use grid
-
-                chart_w = ChartWidget(chart_frame, fig)
-                chart_w.pack(fill="both", expand=True)
-                self.chart_widgets.append(chart_w)
-            else:
-                no_data_label = ctk.CTkLabel(self.charts_container, text="No data to display for row counts.")
-                no_data_label.pack(pady=20)
-
-        except Exception as e:
-            print(f"Error loading dashboard data: {e}")
-            error_label = ctk.CTkLabel(self.charts_container, text=f"Error loading dashboard: {e}")
-            error_label.pack(pady=20) 
\ No newline at end of file
+        job = Job()
+        self.current_job = job
+        self.status_label.configure(text="Loading row counts...")
+        self.task_runner.submit(self._load_row_counts, job, pool, on_error=self._on_load_error)
+
+    def _load_row_counts(self, job, pool):
+        """Runs on a worker: instant estimates first, then exact counts in parallel."""
+        with tracer.trace("dashboard.load") as trace_span:
+            self._count_rows(job, pool, trace_span)
+
+    def _count_rows(self, job, pool, trace_span):
+        with pool.connection() as connection, tracer.span("db.estimate_rows"):
+            estimates = row_count_service.get_estimated_row_counts(connection, pool.details["database"])
+        trace_span.set(tables=len(estimates))
+        job.check()
+        self._post(job, self._show_estimates, estimates)
+
+        row_count_service.refine_row_counts(
+            pool, list(estimates),
+            on_count=lambda table, count, error: self._post(job, self._on_exact_count, table, count),
+            max_concurrency=ROW_COUNT_CONCURRENCY,
+            timeout_s=ROW_COUNT_TIMEOUT_S,
+            cancel_event=job.cancel_event
+        )
+        self._post(job, self._on_counts_done)
+
+    def _post(self, job, callback, *args):
+        """Marshals callback onto the Tk thread, dropping it if a newer refresh started."""
+        def _guarded():
+            if job is self.current_job and not job.cancelled:
+                callback(*args)
+        self.task_runner.post(_guarded)
+
+    def _show_estimates(self, estimates):
+        if not estimates:
+            self._show_message("No tables found in the database.")
+            self.status_label.configure(text="")
+            return
+        self.row_counts = dict(estimates)
+        self.exact_tables = set()
+        self._draw_chart()
+
+    def _on_exact_count(self, table, count):
+        if count is None or table not in self.row_counts:
+            return # Timed out or failed: keep showing the estimate
+        self.row_counts[table] = count
+        self.exact_tables.add(table)
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after(REDRAW_INTERVAL_MS, self._redraw)
+
+    def _redraw(self):
+        self._redraw_pending = False
+        if self.row_counts:
+            self._draw_chart()
+
+    def _on_counts_done(self):
+        self.current_job = None
+        self._update_status(done=True)
+
+    def _on_load_error(self, error):
+        self.current_job = None
+        self._show_message(f"Error loading dashboard: {error}")
+        self.status_label.configure(text="")
+
+    def _update_status(self, done=False):
+        total = len(self.row_counts)
+        exact = len(self.exact_tables)
+        if done and exact < total:
+            self.status_label.configure(text=f"Exact counts for {exact}/{total} tables; the rest are estimates (timed out or failed).")
+        elif done:
+            self.status_label.configure(text=f"Exact counts for all {total} tables.")
+        else:
+            self.status_label.configure(text=f"Refining row counts... {exact}/{total} exact")
+
+    def _draw_chart(self):
+        labels = list(self.row_counts)
+        if self.row_count_widget is None:
+            chart = chart_service.BarChart(title="Row Counts per Table", xlabel="Table Name", ylabel="Number of Rows")
+            chart_frame = ctk.CTkFrame(self.charts_container) # Frame for each chart
+            self.row_count_widget = ChartWidget(chart_frame, chart, self.task_runner)
+            self.row_count_widget.pack(fill="both", expand=True)
+            self.chart_widgets.append(self.row_count_widget)
+        self._clear_messages()
+        for chart_w in self.chart_widgets:
+            if not chart_w.master.winfo_manager():
+                chart_w.master.pack(pady=5, padx=5, fill="x") # Or use grid
+        # Rendered on a worker; the figure and canvas are updated in place, not rebuilt
+        self.row_count_widget.set_data(
+            labels,
+            [self.row_counts[t] for t in labels],
+            estimated=[t not in self.exact_tables for t in labels]
+        )
+        if self.current_job:
+            self._update_status()
+
+    def _show_message(self, text):
+        self._clear_charts()
+        label = ctk.CTkLabel(self.charts_container, text=text)
+        label.pack(pady=20)
+        self.message_labels.append(label)
+
+    def _clear_messages(self):
+        for label in self.message_labels:
+            label.destroy()
+        self.message_labels.clear()
+
+    def _clear_charts(self):
+        # Hide charts rather than destroying them, so the next refresh reuses their figures
+        self._clear_messages()
+        for chart_w in self.chart_widgets:
+            chart_w.master.pack_forget()
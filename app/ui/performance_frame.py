@@ -0,0 +1,119 @@
+import time
+from tkinter import filedialog
+import customtkinter as ctk
+from core.tracing import tracer
+
+REFRESH_INTERVAL_MS = 2000 # Only while the tab is visible
+SLOWEST_QUERIES = 10
+
+class PerformanceFrame(ctk.CTkFrame):
+    """Live view of core.tracing: p50/p95 per stage and the slowest recent questions with their stages."""
+    def __init__(self, master, task_runner):
+        super().__init__(master)
+        self.task_runner = task_runner
+
+        self.button_row = ctk.CTkFrame(self, fg_color="transparent")
+        self.button_row.pack(fill="x", padx=10, pady=(10,0))
+        self.refresh_button = ctk.CTkButton(self.button_row, text="Refresh", width=90, command=self.refresh)
+        self.refresh_button.pack(side="left", padx=(0,5))
+        self.export_button = ctk.CTkButton(self.button_row, text="Export JSONL", width=110, command=self._on_export)
+        self.export_button.pack(side="left", padx=5)
+        self.clear_button = ctk.CTkButton(self.button_row, text="Clear", width=90, command=self._on_clear)
+        self.clear_button.pack(side="left", padx=5)
+        self.status_label = ctk.CTkLabel(self.button_row, text="", anchor="e")
+        self.status_label.pack(side="right", fill="x", expand=True)
+
+        mono = ctk.CTkFont(family="Courier", size=12)
+        self.stages_label = ctk.CTkLabel(self, text="Latency per stage (recent spans):")
+        self.stages_label.pack(padx=10, pady=(10,0), anchor="w")
+        self.stages_text = ctk.CTkTextbox(self, height=180, wrap="none", font=mono)
+        self.stages_text.pack(fill="both", expand=True, padx=10, pady=5)
+        self.stages_text.configure(state="disabled")
+
+        self.slowest_label = ctk.CTkLabel(self, text="Slowest recent questions:")
+        self.slowest_label.pack(padx=10, pady=(10,0), anchor="w")
+        self.slowest_text = ctk.CTkTextbox(self, height=180, wrap="none", font=mono)
+        self.slowest_text.pack(fill="both", expand=True, padx=10, pady=(5,10))
+        self.slowest_text.configure(state="disabled")
+
+        self.after(REFRESH_INTERVAL_MS, self._auto_refresh)
+
+    def refresh(self):
+        self._set_text(self.stages_text, self._format_stages())
+        self._set_text(self.slowest_text, self._format_slowest())
+
+    def _auto_refresh(self):
+        if self.winfo_ismapped():
+            self.refresh()
+        self.after(REFRESH_INTERVAL_MS, self._auto_refresh)
+
+    def _format_stages(self):
+        stats = tracer.stage_stats()
+        if not stats:
+            return "No spans recorded yet." if tracer.enabled else "Tracing is disabled (TRACE_ENABLED=0)."
+        lines = [f"{'stage':<20} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'errors':>6}  avg payload"]
+        for name in sorted(stats, key=lambda n: stats[n]["p95_ms"], reverse=True):
+            s = stats[name]
+            payload = []
+            if "rows" in s:
+                payload.append(f"{s['rows']:,.0f} rows")
+            if "bytes" in s:
+                payload.append(f"{s['bytes'] / 1e6:,.2f} MB")
+            if "prompt_tokens" in s:
+                payload.append(f"{s['prompt_tokens']:,.0f} tokens")
+            lines.append(f"{name:<20} {s['count']:>6} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['max_ms']:>9.1f} "
+                         f"{s['errors']:>6}  {', '.join(payload)}")
+        return "\n".join(lines)
+
+    def _format_slowest(self):
+        slowest = tracer.slowest("converse.query", SLOWEST_QUERIES)
+        if not slowest:
+            return "No questions asked yet."
+        trace_ids = {span.trace_id for span in slowest}
+        stages = {} # trace id -> {stage: total ms}
+        for span in tracer.spans():
+            if span.trace_id in trace_ids and span.name != "converse.query":
+                per_trace = stages.setdefault(span.trace_id, {})
+                per_trace[span.name] = per_trace.get(span.name, 0) + span.duration_ms
+
+        lines = []
+        for span in slowest:
+            attrs = span.attrs
+            when = time.strftime("%H:%M:%S", time.localtime(span.start))
+            rows = f"{attrs['rows']:,} rows" if attrs.get("rows") is not None else ""
+            lines.append(f"{when} {span.duration_ms:>9.1f} ms  {attrs.get('status', ''):<18} {rows:>12}  "
+                         f"{attrs.get('question', '')}")
+            if attrs.get("sql"):
+                lines.append(f"{'':>24}SQL: {attrs['sql']}")
+            per_trace = stages.get(span.trace_id)
+            if per_trace:
+                breakdown = ", ".join(f"{name} {ms:.0f}" for name, ms in
+                                      sorted(per_trace.items(), key=lambda item: item[1], reverse=True))
+                lines.append(f"{'':>24}ms: {breakdown}")
+        return "\n".join(lines)
+
+    def _on_export(self):
+        path = filedialog.asksaveasfilename(
+            parent=self, title="Export trace spans", defaultextension=".jsonl",
+            initialfile=time.strftime("dbconverse-trace-%Y%m%d-%H%M%S.jsonl"),
+            filetypes=[("JSON Lines", "*.jsonl"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        self.status_label.configure(text="Exporting...")
+        self.task_runner.submit(
+            tracer.export_jsonl, path,
+            on_success=lambda count: self.status_label.configure(text=f"Exported {count:,} spans to {path}"),
+            on_error=lambda error: self.status_label.configure(text=f"Export failed: {error}")
+        )
+
+    def _on_clear(self):
+        tracer.clear()
+        self.status_label.configure(text="")
+        self.refresh()
+
+    def _set_text(self, textbox, text):
+        textbox.configure(state="normal")
+        textbox.delete("1.0", "end")
+        textbox.insert("1.0", text)
+        textbox.configure(state="disabled")
@@ -1,22 +1,80 @@
+import tkinter as tk
 import customtkinter as ctk
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from core.tracing import tracer
+
+RESIZE_DEBOUNCE_MS = 150 # Re-render once the window has stopped resizing
 
 class ChartWidget(ctk.CTkFrame):
-    def __init__(self, master, figure):
-        super().__init__(master)
-        self.figure = figure
-        self.canvas = None
-        self._draw_chart()
-
-    def _draw_chart(self):
-        if self.canvas:
-            self.canvas.get_tk_widget().destroy() # Clear previous chart if any
-
-        self.canvas = FigureCanvasTkAgg(self.figure, master=self)
-        self.canvas.draw()
-        widget = self.canvas.get_tk_widget()
-        widget.pack(side=ctk.TOP, fill=ctk.BOTH, expand=True)
-
-    def update_chart(self, new_figure):
-        self.figure = new_figure
-        self._draw_chart() 
\ No newline at end of file
+    """
+    Displays a chart_service chart (e.g. BarChart) that is rasterized on a task_runner worker.
+
+    The chart, its figure and the Tk PhotoImage live as long as the widget; set_data() updates
+    the chart in place and the new pixels are swapped into the same image. At most one render
+    is in flight; updates arriving meanwhile are coalesced into a single follow-up render.
+    """
+    def __init__(self, master, chart, task_runner, height=400):
+        super().__init__(master, height=height)
+        self.pack_propagate(False) # Size comes from the layout, not from the image
+        self.chart = chart
+        self.task_runner = task_runner
+        self._photo = tk.PhotoImage(master=self, width=1, height=1)
+        self.image_label = tk.Label(self, image=self._photo, borderwidth=0, highlightthickness=0)
+        self.image_label.pack(fill=ctk.BOTH, expand=True)
+        self._size = None
+        self._pending_data = None
+        self._rendering = False
+        self._render_again = False
+        self._resize_after_id = None
+        self.bind("<Configure>", self._on_configure)
+
+    def set_data(self, *args, **kwargs):
+        """Passes the data on to chart.update() on the next render."""
+        self._pending_data = (args, kwargs)
+        self._schedule_render()
+
+    def _on_configure(self, event):
+        if self._resize_after_id:
+            self.after_cancel(self._resize_after_id)
+        self._resize_after_id = self.after(RESIZE_DEBOUNCE_MS, self._on_resized, event.width, event.height)
+
+    def _on_resized(self, width, height):
+        self._resize_after_id = None
+        if (width, height) != self._size and width > 1 and height > 1:
+            self._size = (width, height)
+            self._schedule_render()
+
+    def _schedule_render(self):
+        if self._size is None:
+            return # Not laid out yet; the first <Configure> triggers the render
+        if self._rendering:
+            self._render_again = True
+            return
+        self._rendering = True
+        data, self._pending_data = self._pending_data, None
+        self.task_runner.submit(self._render, data, self._size,
+                                on_success=self._show_frame, on_error=self._on_render_error)
+
+    def _render(self, data, size):
+        """Runs on a worker: update the chart and rasterize it with Agg."""
+        if data is not None:
+            args, kwargs = data
+            self.chart.update(*args, **kwargs)
+        return self.chart.render(*size)
+
+    def _show_frame(self, frame):
+        self._rendering = False
+        if not self.winfo_exists():
+            return
+        ppm, width, height = frame
+        with tracer.span("ui.chart.show", bytes=len(ppm)):
+            self._photo.configure(data=ppm, width=width, height=height)
+        self._render_next()
+
+    def _on_render_error(self, error):
+        self._rendering = False
+        self._render_next()
+
+    def _render_next(self):
+        if self._render_again or self._pending_data is not None:
+            self._render_again = False
+            self._schedule_render()
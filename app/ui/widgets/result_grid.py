@@ -0,0 +1,371 @@
+import sys
+import tkinter as tk
+import customtkinter as ctk
+from core.lazy import lazy_import
+from core.tracing import tracer
+
+# Only needed once there is a result to show; keeps them off the start-up path
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+ROW_HEIGHT = 22
+CELL_PADDING = 6
+MIN_COLUMN_WIDTH = 50
+MAX_COLUMN_WIDTH = 320
+WIDTH_SAMPLE_ROWS = 200 # Rows measured when sizing columns
+WHEEL_ROWS = 3 # Rows scrolled per mouse wheel notch
+PREFETCH_SCREENS = 2 # Ask for more rows when fewer than this many screens are left below the view
+NULL_TEXT = "NULL"
+
+
+class ResultGrid(ctk.CTkFrame):
+    """
+    Virtualized table for query results.
+
+    Only the cells in view are formatted and drawn, on canvas items that are reused from one
+    redraw to the next, so scrolling costs the same for 100 rows as for 100,000. When the view
+    nears the end of the loaded rows and more are available, on_need_more() is called; the owner
+    fetches the next page and hands it over with append_rows(). Pages are kept as they arrive
+    rather than concatenated, so loading N rows page by page copies each row once. Clicking a
+    column header sorts the rows loaded so far (click again to reverse), which only reorders an
+    index array.
+    """
+    def __init__(self, master, on_need_more=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_need_more = on_need_more
+        self._pages = [] # DataFrames of the loaded rows, in load order
+        self._page_starts = [0] # Row position of each page's first row; one extra entry for the total
+        self.has_more = False
+        self._loading_more = False
+        self._order = None # Row positions in display order while sorted, else None
+        self._sort_column = None
+        self._sort_ascending = True
+        self._top_row = 0
+        self._x_offset = 0
+        self._column_widths = []
+        self._column_starts = [] # x of each column's left edge; one extra entry for the total width
+        self._cell_items = [] # Reused canvas text items
+        self._stripe_items = [] # Reused row background rectangles
+        self._redraw_pending = False
+
+        self.font = ctk.CTkFont(size=12)
+        self.header_font = ctk.CTkFont(size=12, weight="bold")
+        self._char_width = max(1, self.font.measure("0"))
+        self._wide_char_width = max(1, self.font.measure("W"))
+
+        self.canvas = tk.Canvas(self, highlightthickness=0, borderwidth=0, takefocus=1)
+        self.v_scrollbar = ctk.CTkScrollbar(self, orientation="vertical", command=self._on_yscroll)
+        self.h_scrollbar = ctk.CTkScrollbar(self, orientation="horizontal", command=self._on_xscroll)
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        self.v_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.h_scrollbar.grid(row=1, column=0, sticky="ew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        self._apply_colors()
+
+        self.canvas.bind("<Configure>", lambda event: self._schedule_redraw())
+        self.canvas.bind("<Button-1>", self._on_click)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind(sequence, self._on_wheel)
+        for sequence in ("<Shift-MouseWheel>", "<Shift-Button-4>", "<Shift-Button-5>"):
+            self.canvas.bind(sequence, self._on_shift_wheel)
+        self.canvas.bind("<Prior>", lambda event: self._scroll_rows(-self._visible_row_count()))
+        self.canvas.bind("<Next>", lambda event: self._scroll_rows(self._visible_row_count()))
+        self.canvas.bind("<Up>", lambda event: self._scroll_rows(-1))
+        self.canvas.bind("<Down>", lambda event: self._scroll_rows(1))
+        self.canvas.bind("<Home>", lambda event: self._scroll_rows(-self.row_count))
+        self.canvas.bind("<End>", lambda event: self._scroll_rows(self.row_count))
+
+    @property
+    def row_count(self):
+        return self._page_starts[-1]
+
+    def head(self, rows):
+        """The first loaded rows (at most rows), without concatenating the rest; None when empty."""
+        if not self._pages:
+            return None
+        parts, needed = [], rows
+        for page in self._pages:
+            parts.append(page.head(needed))
+            needed -= len(parts[-1])
+            if needed <= 0:
+                break
+        return parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+
+    def set_data(self, df, has_more=False):
+        """Replaces the grid contents (None clears it); columns are sized from the first rows."""
+        self._pages = [df.reset_index(drop=True)] if df is not None else []
+        self._page_starts = [0, len(df)] if df is not None else [0]
+        self.has_more = has_more
+        self._loading_more = False
+        self._order = None
+        self._sort_column = None
+        self._sort_ascending = True
+        self._top_row = 0
+        self._x_offset = 0
+        self._size_columns()
+        self._schedule_redraw()
+
+    def append_rows(self, page, has_more):
+        """Adds a page delivered in answer to on_need_more(); keeps the current sort."""
+        if page is not None and not page.empty:
+            with tracer.span("ui.grid.append", rows=len(page)):
+                self._pages.append(page.reset_index(drop=True))
+                self._page_starts.append(self._page_starts[-1] + len(page))
+                self._apply_sort()
+        self.has_more = has_more
+        self._loading_more = False
+        self._schedule_redraw()
+
+    def more_rows_failed(self):
+        """Lets the next scroll retry after on_need_more() could not deliver."""
+        self._loading_more = False
+
+    def clear(self):
+        self.set_data(None)
+
+    def sort_by(self, column_index, ascending=None):
+        """Sorts the loaded rows by one column. With ascending=None a repeated call flips the order."""
+        if ascending is None:
+            ascending = not self._sort_ascending if self._sort_column == column_index else True
+        self._sort_column = column_index
+        self._sort_ascending = ascending
+        with tracer.span("ui.grid.sort", rows=self.row_count):
+            self._apply_sort()
+        self._top_row = 0
+        self._schedule_redraw()
+
+    def _apply_sort(self):
+        if self._sort_column is None or not self.row_count:
+            self._order = None
+            return
+        column = self._sort_column
+        if len(self._pages) == 1:
+            series = self._pages[0].iloc[:, column]
+        else: # Only the sorted column is gathered, not the whole frame
+            series = pd.concat([page.iloc[:, column] for page in self._pages], ignore_index=True)
+        try:
+            ordered = series.sort_values(ascending=self._sort_ascending, kind="stable", na_position="last")
+        except TypeError: # Mixed types in an object column; fall back to text order
+            ordered = series.astype(str).sort_values(ascending=self._sort_ascending, kind="stable")
+        self._order = ordered.index.to_numpy()
+
+    def _take(self, positions, first_col, last_col):
+        """Object array of the rows at positions (load order), columns first_col..last_col, from their pages."""
+        if len(self._pages) == 1:
+            return self._pages[0].iloc[positions, first_col:last_col].to_numpy(dtype=object)
+        positions = np.asarray(positions)
+        starts = np.asarray(self._page_starts)
+        page_of = np.searchsorted(starts, positions, side="right") - 1
+        block = np.empty((len(positions), last_col - first_col), dtype=object)
+        for page_index in np.unique(page_of):
+            rows = page_of == page_index
+            page = self._pages[page_index]
+            block[rows] = page.iloc[positions[rows] - starts[page_index], first_col:last_col].to_numpy(dtype=object)
+        return block
+
+    def _size_columns(self):
+        self._column_widths = []
+        self._column_starts = [0]
+        if not self._pages:
+            return
+        sample = self.head(WIDTH_SAMPLE_ROWS)
+        for i, name in enumerate(sample.columns):
+            # Longest sampled text is measured once instead of measuring every cell
+            texts = [_format_cell(v) for v in sample.iloc[:, i].tolist()]
+            longest = max(texts, key=len, default="")
+            width = max(self.header_font.measure(f"{name} ▲"), self.font.measure(longest)) + 2 * CELL_PADDING
+            self._column_widths.append(min(MAX_COLUMN_WIDTH, max(MIN_COLUMN_WIDTH, width)))
+        for width in self._column_widths:
+            self._column_starts.append(self._column_starts[-1] + width)
+
+    def _visible_row_count(self):
+        return max(1, (self.canvas.winfo_height() - ROW_HEIGHT) // ROW_HEIGHT)
+
+    def _max_top_row(self):
+        return max(0, self.row_count - self._visible_row_count())
+
+    def _max_x_offset(self):
+        return max(0, self._column_starts[-1] - self.canvas.winfo_width()) if self._column_starts else 0
+
+    def _schedule_redraw(self):
+        # Scroll events arrive in bursts; draw once per idle cycle
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self._redraw)
+
+    def _redraw(self):
+        self._redraw_pending = False
+        canvas = self.canvas
+        width = canvas.winfo_width()
+        visible_rows = self._visible_row_count()
+        self._top_row = max(0, min(self._top_row, self._max_top_row()))
+        self._x_offset = max(0, min(self._x_offset, self._max_x_offset()))
+
+        canvas.delete("header")
+        first_col, last_col = self._visible_columns(width)
+        start = self._top_row
+        stop = min(self.row_count, start + visible_rows + 1)
+        block = []
+        if stop > start:
+            positions = self._order[start:stop] if self._order is not None else np.arange(start, stop)
+            block = self._take(positions, first_col, last_col)
+
+        item_index = 0
+        for row_offset in range(len(block)):
+            y = ROW_HEIGHT * (row_offset + 1)
+            self._place_stripe(row_offset, y, width, (start + row_offset) % 2 == 1)
+            for col_offset, value in enumerate(block[row_offset]):
+                column = first_col + col_offset
+                x = self._column_starts[column] - self._x_offset + CELL_PADDING
+                text = self._fit_text(_format_cell(value), self._column_widths[column], self.font)
+                self._place_cell(item_index, x, y + ROW_HEIGHT // 2, text)
+                item_index += 1
+        for item in self._cell_items[item_index:]:
+            canvas.itemconfigure(item, state="hidden")
+        for offset, item in enumerate(self._stripe_items):
+            if offset >= len(block):
+                canvas.itemconfigure(item, state="hidden")
+
+        self._draw_header(first_col, last_col, width)
+        self._update_scrollbars(visible_rows, width)
+        self._maybe_request_more(visible_rows)
+
+    def _visible_columns(self, width):
+        starts = self._column_starts
+        if len(starts) < 2:
+            return 0, 0
+        first = max(0, int(np.searchsorted(starts, self._x_offset, side="right")) - 1)
+        last = int(np.searchsorted(starts, self._x_offset + width, side="left"))
+        return min(first, len(starts) - 2), min(len(starts) - 1, max(last, first + 1))
+
+    def _place_cell(self, index, x, y, text):
+        if index < len(self._cell_items):
+            item = self._cell_items[index]
+            self.canvas.coords(item, x, y)
+            self.canvas.itemconfigure(item, text=text, state="normal")
+        else:
+            item = self.canvas.create_text(x, y, text=text, anchor="w", font=self.font, fill=self._text_color, tags="cell")
+            self._cell_items.append(item)
+
+    def _place_stripe(self, index, y, width, shaded):
+        fill = self._stripe_color if shaded else self._background
+        if index < len(self._stripe_items):
+            item = self._stripe_items[index]
+            self.canvas.coords(item, 0, y, width, y + ROW_HEIGHT)
+            self.canvas.itemconfigure(item, fill=fill, state="normal")
+        else:
+            item = self.canvas.create_rectangle(0, y, width, y + ROW_HEIGHT, fill=fill, width=0, tags="stripe")
+            self._stripe_items.append(item)
+            self.canvas.tag_lower(item)
+
+    def _draw_header(self, first_col, last_col, width):
+        canvas = self.canvas
+        canvas.create_rectangle(0, 0, width, ROW_HEIGHT, fill=self._header_color, width=0, tags="header")
+        for column in range(first_col, last_col):
+            x = self._column_starts[column] - self._x_offset
+            name = str(self._pages[0].columns[column])
+            if column == self._sort_column:
+                name += " ▲" if self._sort_ascending else " ▼"
+            text = self._fit_text(name, self._column_widths[column], self.header_font)
+            canvas.create_text(x + CELL_PADDING, ROW_HEIGHT // 2, text=text, anchor="w",
+                               font=self.header_font, fill=self._text_color, tags="header")
+            canvas.create_line(x + self._column_widths[column], 0, x + self._column_widths[column], ROW_HEIGHT,
+                               fill=self._background, tags="header")
+
+    def _fit_text(self, text, column_width, font):
+        available = column_width - 2 * CELL_PADDING
+        if len(text) * self._wide_char_width <= available:
+            return text # Fits even in the widest glyphs; no need to ask Tk
+        text = text[:max(1, available // self._char_width)]
+        while len(text) > 1 and font.measure(text + "…") > available:
+            text = text[:-1]
+        return text + "…"
+
+    def _update_scrollbars(self, visible_rows, width):
+        if self.row_count:
+            self.v_scrollbar.set(self._top_row / self.row_count,
+                                 min(1.0, (self._top_row + visible_rows) / self.row_count))
+        else:
+            self.v_scrollbar.set(0, 1)
+        total_width = self._column_starts[-1] if self._column_starts else 0
+        if total_width > width:
+            self.h_scrollbar.set(self._x_offset / total_width, (self._x_offset + width) / total_width)
+        else:
+            self.h_scrollbar.set(0, 1)
+
+    def _maybe_request_more(self, visible_rows):
+        if not self.has_more or self._loading_more or not self.on_need_more:
+            return
+        if self.row_count - (self._top_row + visible_rows) <= PREFETCH_SCREENS * visible_rows:
+            self._loading_more = True
+            self.on_need_more()
+
+    def _scroll_rows(self, delta):
+        self._top_row = max(0, min(self._top_row + delta, self._max_top_row()))
+        self._schedule_redraw()
+
+    def _on_yscroll(self, action, value, unit=None):
+        if action == "moveto":
+            self._top_row = int(float(value) * self.row_count)
+            self._schedule_redraw()
+        elif unit == "pages":
+            self._scroll_rows(int(value) * self._visible_row_count())
+        else:
+            self._scroll_rows(int(value) * WHEEL_ROWS)
+
+    def _on_xscroll(self, action, value, unit=None):
+        total_width = self._column_starts[-1] if self._column_starts else 0
+        if action == "moveto":
+            self._x_offset = int(float(value) * total_width)
+        else:
+            self._x_offset += int(value) * self._char_width * 4
+        self._schedule_redraw()
+
+    def _wheel_steps(self, event):
+        if event.num == 4:
+            return -1
+        if event.num == 5:
+            return 1
+        if sys.platform == "darwin":
+            return -event.delta
+        return -int(event.delta / 120) or (-1 if event.delta > 0 else 1)
+
+    def _on_wheel(self, event):
+        self._scroll_rows(self._wheel_steps(event) * WHEEL_ROWS)
+
+    def _on_shift_wheel(self, event):
+        self._x_offset += self._wheel_steps(event) * self._char_width * 4
+        self._schedule_redraw()
+
+    def _on_click(self, event):
+        self.canvas.focus_set()
+        if event.y > ROW_HEIGHT or not self._column_starts:
+            return
+        x = event.x + self._x_offset
+        column = int(np.searchsorted(self._column_starts, x, side="right")) - 1
+        if 0 <= column < len(self._column_widths):
+            self.sort_by(column)
+
+    def _apply_colors(self):
+        theme = ctk.ThemeManager.theme
+        self._background = self._apply_appearance_mode(theme["CTkTextbox"]["fg_color"])
+        self._text_color = self._apply_appearance_mode(theme["CTkTextbox"]["text_color"])
+        self._header_color = self._apply_appearance_mode(theme["CTkFrame"]["top_fg_color"])
+        self._stripe_color = self._apply_appearance_mode(theme["CTkFrame"]["fg_color"])
+        self.canvas.configure(bg=self._background)
+
+    def _set_appearance_mode(self, mode_string):
+        super()._set_appearance_mode(mode_string)
+        self._apply_colors()
+        self.canvas.itemconfigure("cell", fill=self._text_color)
+        self._schedule_redraw()
+
+
+def _format_cell(value):
+    if value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value):
+        return NULL_TEXT
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return str(value).replace("\n", " ")
+
@@ -0,0 +1,122 @@
+"""
+Benchmark: columnar result ingestion vs. the old dictionary-cursor path.
+
+Generates rows shaped like mysql.connector returns them (int, Decimal, datetime, date, str and
+NULLs) together with a matching cursor.description, then compares:
+  dict      - dictionary=True rows (one dict per row) fed to pd.DataFrame, as execute_query used to
+  columnar  - plain tuples converted column by column with services.columnar.rows_to_dataframe
+Reports conversion time, peak Python memory during conversion and the resulting frame size.
+
+Run from the project root:
+    python benchmarks/bench_columnar.py [--rows 1000000] [--categorize]
+"""
+import argparse
+import datetime
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import pandas as pd
+from mysql.connector import FieldType
+from services import columnar
+
+# (name, type code, flags) as they appear in cursor.description
+COLUMNS = [
+    ("id", FieldType.LONGLONG, 0),
+    ("customer_id", FieldType.LONG, 0),
+    ("status", FieldType.VAR_STRING, 0),
+    ("country", FieldType.VAR_STRING, 0),
+    ("amount", FieldType.NEWDECIMAL, 0),
+    ("discount", FieldType.NEWDECIMAL, 0),
+    ("created_at", FieldType.DATETIME, 0),
+    ("ship_date", FieldType.DATE, 0),
+    ("notes", FieldType.VAR_STRING, 0),
+]
+STATUSES = ["new", "paid", "shipped", "delivered", "returned", "cancelled"]
+COUNTRIES = ["US", "DE", "FR", "GB", "IN", "BR", "JP", "CA", "AU", "NL"]
+
+
+def make_rows(n_rows, seed=11):
+    rng = random.Random(seed)
+    start = datetime.datetime(2022, 1, 1)
+    rows = []
+    for i in range(n_rows):
+        created = start + datetime.timedelta(seconds=rng.randint(0, 86400 * 700))
+        rows.append((
+            i + 1,
+            rng.randint(1, 50_000),
+            rng.choice(STATUSES),
+            rng.choice(COUNTRIES),
+            Decimal(rng.randint(100, 1_000_000)) / 100,
+            None if rng.random() < 0.7 else Decimal(rng.randint(1, 5000)) / 100, # Mostly NULL
+            created,
+            None if rng.random() < 0.1 else (created + datetime.timedelta(days=rng.randint(1, 10))).date(),
+            f"note {rng.randint(0, 10**9)}",
+        ))
+    description = [(name, type_code, None, None, None, None, True, flags) for name, type_code, flags in COLUMNS]
+    return rows, description
+
+
+def dict_path(rows, description):
+    names = [d[0] for d in description]
+    results = [dict(zip(names, row)) for row in rows] # What a dictionary cursor hands back
+    return pd.DataFrame(results, columns=names)
+
+
+def columnar_path(rows, description, categorize):
+    return columnar.rows_to_dataframe(rows, description, categorize=categorize)
+
+
+def measure(fn, repeat):
+    """Best wall time over repeat runs, then one extra run under tracemalloc for peak memory."""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        df = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        del df
+    gc.collect()
+    tracemalloc.start() # Slows allocation down, so it is kept out of the timed runs
+    df = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return df, best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--categorize", action="store_true", help="Category-encode low-cardinality strings")
+    args = parser.parse_args()
+
+    rows, description = make_rows(args.rows)
+    print(f"{args.rows:,} rows x {len(description)} columns\n")
+    print(f"{'path':<10} {'seconds':>8} {'peak MB':>9} {'frame MB':>9}")
+
+    results = {}
+    for name, fn in (("dict", lambda: dict_path(rows, description)),
+                     ("columnar", lambda: columnar_path(rows, description, args.categorize))):
+        df, seconds, peak = measure(fn, args.repeat)
+        frame_mb = df.memory_usage(deep=True).sum() / 1e6
+        results[name] = (df, seconds, peak)
+        print(f"{name:<10} {seconds:>8.2f} {peak / 1e6:>9.1f} {frame_mb:>9.1f}")
+
+    dict_df, dict_s, dict_peak = results["dict"]
+    col_df, col_s, col_peak = results["columnar"]
+    print(f"\nSpeed-up: {dict_s / col_s:.1f}x, peak memory: {col_peak / dict_peak:.0%} of the dict path")
+    print("\nColumn dtypes (dict -> columnar):")
+    for column in col_df.columns:
+        print(f"  {column:<12} {str(dict_df[column].dtype):<10} -> {col_df[column].dtype}")
+
+
+if __name__ == "__main__":
+    main()
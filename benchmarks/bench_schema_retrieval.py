@@ -0,0 +1,128 @@
+"""
+Benchmark: relevant-schema retrieval vs. sending the full schema to Gemini.
+
+Builds a synthetic warehouse catalog (400 tables by default), then for a set of questions
+compares the full-schema prompt with the retrieved one: prompt size, assembly latency and
+whether the tables the question needs were kept.
+
+Run from the project root:
+    python benchmarks/bench_schema_retrieval.py [--tables 400] [--budget 2000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.schema_catalog import SchemaCatalog
+from services import schema_retrieval
+
+DOMAINS = {
+    "sales": ["order", "order_item", "invoice", "payment", "refund", "discount", "quote"],
+    "crm": ["customer", "contact", "lead", "opportunity", "account_manager", "segment"],
+    "inventory": ["product", "warehouse", "stock_level", "supplier", "shipment", "category"],
+    "hr": ["employee", "department", "salary", "timesheet", "leave_request", "review"],
+    "marketing": ["campaign", "ad_click", "email_send", "landing_page", "conversion"],
+    "finance": ["ledger_entry", "budget", "expense", "tax_rate", "currency_rate"],
+}
+FILLER_COLUMNS = ["status", "notes", "created_at", "updated_at", "created_by", "source", "region_code",
+                  "external_ref", "is_active", "priority", "score", "amount", "quantity", "description"]
+
+# (question, tables it needs)
+QUESTIONS = [
+    ("top 10 customers by total payment amount", {"crm_customer", "sales_payment"}),
+    ("how many orders were shipped from each warehouse", {"sales_order", "inventory_shipment", "inventory_warehouse"}),
+    ("average salary per department", {"hr_salary", "hr_department"}),
+    ("which campaigns had the most conversions last month", {"marketing_campaign", "marketing_conversion"}),
+    ("products with stock level below 5", {"inventory_product", "inventory_stock_level"}),
+    ("total expenses by budget", {"finance_expense", "finance_budget"}),
+]
+
+
+def build_catalog(n_tables, seed=7):
+    rng = random.Random(seed)
+    tables = {}
+    base_names = [f"{domain}_{entity}" for domain, entities in DOMAINS.items() for entity in entities]
+    names = list(base_names)
+    while len(names) < n_tables: # Pad with plausible but unrelated staging/archive tables
+        names.append(f"{rng.choice(base_names)}_{rng.choice(['archive', 'staging', 'snapshot', 'audit'])}_{len(names)}")
+
+    for name in names[:n_tables]:
+        entity = name.split("_", 1)[1]
+        columns = [{"name": "id", "type": "bigint", "nullable": False, "key": "PRI", "comment": ""},
+                   {"name": f"{entity}_name", "type": "varchar(255)", "nullable": True, "key": "", "comment": ""}]
+        for column in rng.sample(FILLER_COLUMNS, rng.randint(6, len(FILLER_COLUMNS))):
+            columns.append({"name": column, "type": rng.choice(["int", "varchar(64)", "datetime", "decimal(12,2)"]),
+                            "nullable": True, "key": "", "comment": ""})
+        tables[name] = {"type": "BASE TABLE", "row_estimate": rng.randint(10, 50_000_000), "comment": "",
+                        "columns": columns, "primary_key": ["id"], "foreign_keys": []}
+
+    # Foreign keys from the base tables to a few others in the same domain
+    for name in base_names:
+        if name not in tables:
+            continue
+        domain = name.split("_", 1)[0]
+        for target in rng.sample([t for t in base_names if t.startswith(domain) and t != name], 2):
+            column = f"{target.split('_', 1)[1]}_id"
+            tables[name]["columns"].append({"name": column, "type": "bigint", "nullable": True, "key": "MUL", "comment": ""})
+            tables[name]["foreign_keys"].append({"name": f"fk_{name}_{column}", "columns": [column],
+                                                 "ref_table": target, "ref_columns": ["id"]})
+    for question_tables in (tables_needed for _, tables_needed in QUESTIONS):
+        # Make sure questions spanning domains are joinable, as they would be in a real warehouse
+        ordered = sorted(question_tables)
+        for source, target in zip(ordered, ordered[1:]):
+            column = f"{target.split('_', 1)[1]}_id"
+            if not any(fk["ref_table"] == target for fk in tables[source]["foreign_keys"]):
+                tables[source]["columns"].append({"name": column, "type": "bigint", "nullable": True, "key": "MUL", "comment": ""})
+                tables[source]["foreign_keys"].append({"name": f"fk_{source}_{column}", "columns": [column],
+                                                       "ref_table": target, "ref_columns": ["id"]})
+    return SchemaCatalog("bench_warehouse", f"bench-{n_tables}-{seed}", tables)
+
+
+def timed_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tables", type=int, default=400)
+    parser.add_argument("--budget", type=int, default=schema_retrieval.DEFAULT_TOKEN_BUDGET)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.tables)
+    full_prompt, full_ms = timed_ms(catalog.to_prompt_string, args.repeat)
+    full_tokens = schema_retrieval.estimate_tokens(full_prompt)
+
+    start = time.perf_counter()
+    schema_retrieval.get_schema_index(catalog)
+    index_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Catalog: {args.tables} tables, full schema ~{full_tokens} tokens, assembled in {full_ms:.2f} ms")
+    print(f"Index build (once per schema version): {index_ms:.1f} ms\n")
+    print(f"{'question':<55} {'tokens':>7} {'reduction':>9} {'ms':>7} {'recall':>7}")
+
+    reductions = []
+    for question, needed in QUESTIONS:
+        prompt, ms = timed_ms(lambda: schema_retrieval.select_relevant_schema(catalog, question, args.budget), args.repeat)
+        tokens = schema_retrieval.estimate_tokens(prompt)
+        kept = {line.split(" ", 1)[0] for line in prompt.splitlines()}
+        recall = len(needed & kept) / len(needed)
+        reduction = 1 - tokens / full_tokens
+        reductions.append(reduction)
+        print(f"{question[:55]:<55} {tokens:>7} {reduction:>8.1%} {ms:>7.2f} {recall:>7.0%}")
+
+    print(f"\nMedian prompt-size reduction: {statistics.median(reductions):.1%} "
+          f"(Gemini latency and cost scale with prompt tokens)")
+
+
+if __name__ == "__main__":
+    main()
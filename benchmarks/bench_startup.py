@@ -0,0 +1,166 @@
+"""
+Benchmark: cold start of the desktop app, with a regression guard.
+
+Each measurement runs in a fresh interpreter:
+  import  - `python -X importtime -c "import main"`: total import time and the heaviest modules
+  eager   - heavy modules (pandas, matplotlib, mysql.connector, ...) imported before the window exists;
+            these must stay lazy (see core.lazy), so any hit fails the run
+  frame   - wall time from spawning the interpreter to the first drawn frame of App
+            (needs a display; skipped when Tk cannot open one)
+
+Medians are compared with a saved baseline and the script exits with status 1 when a metric
+is more than --tolerance slower. Baselines are machine-specific, so save one locally first.
+
+Run from the project root:
+    python benchmarks/bench_startup.py --save-baseline     # once, on a known-good revision
+    python benchmarks/bench_startup.py [--runs 5] [--tolerance 0.25]
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, "..", "app")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "startup_baseline.json")
+
+# Must not be imported before the first frame
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib", "seaborn", "mysql.connector", "sqlglot", "google.generativeai"]
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+_EAGER_SNIPPET = f"""
+import json, sys
+import main
+print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))
+"""
+
+_FRAME_SNIPPET = """
+import tkinter
+try:
+    import main
+    app = main.App()
+    app.update_idletasks()
+    app.update() # Processes map/expose events: the first frame is on screen
+except tkinter.TclError as e:
+    print("NO_DISPLAY", e, flush=True)
+    raise SystemExit(0)
+print("FIRST_FRAME", flush=True)
+app.task_runner.shutdown()
+app.destroy()
+"""
+
+
+def _run(args):
+    return subprocess.run([sys.executable, *args], cwd=APP_DIR, capture_output=True, text=True)
+
+
+def measure_imports():
+    """Returns (total ms, {top-level module: cumulative ms}) for `import main`."""
+    proc = _run(["-X", "importtime", "-c", "import main"])
+    if proc.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{proc.stderr}")
+    total_us = 0
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        cumulative_us, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent == 1: # Top level: imported directly by the -c command
+            total_us += cumulative_us
+        modules[name] = cumulative_us / 1000
+    return total_us / 1000, modules
+
+
+def eager_heavy_modules():
+    proc = _run(["-c", _EAGER_SNIPPET])
+    if proc.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure_first_frame():
+    """Wall ms from spawning Python to App's first frame, or None without a display."""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", _FRAME_SNIPPET], cwd=APP_DIR,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    elapsed = None
+    for line in proc.stdout:
+        if line.startswith("FIRST_FRAME"):
+            elapsed = (time.perf_counter() - start) * 1000
+        elif line.startswith("NO_DISPLAY"):
+            break
+    proc.wait()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs. baseline (0.25 = 25%%)")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest modules to list")
+    args = parser.parse_args()
+
+    import_runs, frame_runs, module_runs = [], [], []
+    for _ in range(args.runs):
+        total_ms, modules = measure_imports()
+        import_runs.append(total_ms)
+        module_runs.append(modules)
+        frame_ms = measure_first_frame()
+        if frame_ms is not None:
+            frame_runs.append(frame_ms)
+
+    results = {
+        "import_ms": statistics.median(import_runs),
+        "frame_ms": statistics.median(frame_runs) if frame_runs else None,
+        "python": platform.python_version(),
+    }
+    eager = eager_heavy_modules()
+
+    print(f"import main (median of {args.runs}): {results['import_ms']:.1f} ms")
+    last = module_runs[-1]
+    for name in sorted(last, key=last.get, reverse=True)[:args.top]:
+        print(f"  {last[name]:>8.1f} ms  {name}")
+    if results["frame_ms"] is None:
+        print("first frame: skipped (no display)")
+    else:
+        print(f"first frame (median of {len(frame_runs)}): {results['frame_ms']:.1f} ms")
+
+    failures = []
+    if eager:
+        failures.append(f"heavy modules imported before the first frame: {', '.join(eager)}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nBaseline ({args.baseline}):")
+        for metric in ("import_ms", "frame_ms"):
+            before, now = baseline.get(metric), results[metric]
+            if before is None or now is None:
+                continue
+            change = now / before - 1
+            print(f"  {metric:<10} {before:>8.1f} -> {now:>8.1f} ms ({change:+.0%})")
+            if change > args.tolerance:
+                failures.append(f"{metric} regressed by {change:.0%} (tolerance {args.tolerance:.0%})")
+    else:
+        print("\nNo baseline yet; run with --save-baseline to create one.")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
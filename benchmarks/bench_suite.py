@@ -0,0 +1,358 @@
+"""
+Benchmark suite: the app's main paths against a synthetic database, with no MySQL server or Gemini key.
+
+For each scale factor (1 = 1,000 customers, 10,000 orders, 30,000 order items) a shop database is
+seeded into a SQLite stand-in (standins.SQLitePool) or, with --backend mysql, into a local
+MySQL/MariaDB. Gemini is replaced by standins.FakeGemini, which streams canned SQL with optional
+fixed delays. Measured, as median / p95 / min over --repeat runs after one warm-up:
+  get_table_names        db_service.get_table_names
+  execute_query.<name>   db_service.execute_query for a point lookup, a scan, a join and an aggregate
+  dashboard.load         DashboardFrame's worker-side refresh: estimates, then exact counts in parallel
+  dashboard.render       the row-count BarChart updated and rasterized off-screen
+  converse.e2e           ConverseFrame's pipeline for a set of questions, up to the first page of rows
+  export.<format>        export_service.export_query streaming the order_items table to a file
+  snapshot.<name>        snapshot_service: the first (full) sync, a sync with nothing new and the
+                         aggregate query answered from the local snapshot (--snapshot-engine)
+The per-stage p50/p95 of the converse runs (from core.tracing) are stored alongside.
+
+Results go to benchmarks/results/<git revision>.json (suffixed -dirty with uncommitted changes)
+so revisions can be compared; --compare exits with status 1 if a metric got slower than --threshold.
+
+Run from the project root:
+    python benchmarks/bench_suite.py [--scales 1,10] [--repeat 5] [--backend sqlite|mysql]
+    python benchmarks/bench_suite.py --compare <rev>            # run now, compare with a stored revision
+    python benchmarks/bench_suite.py --compare <rev-a> <rev-b>  # compare two stored results only
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(BENCH_DIR, "..")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+sys.path.insert(0, os.path.join(ROOT_DIR, "app"))
+
+# Must be set before core.config is imported: a throwaway cache dir and no translation cache,
+# so every converse run goes through the (fake) model and nothing leaks between runs
+WORK_DIR = tempfile.mkdtemp(prefix="dbconverse-bench-")
+os.environ["DB_CONVERSE_CACHE_DIR"] = os.path.join(WORK_DIR, "cache")
+os.environ["TRANSLATION_CACHE_ENABLED"] = "0"
+
+from concurrent.futures import ThreadPoolExecutor
+from core.app_state import current_app_state
+from core.task_runner import Job, TaskRunner
+from core.tracing import tracer, percentile
+from services import chart_service, db_service, export_service, nlp_service, schema_catalog, snapshot_service
+from ui.converse_frame import ConverseFrame
+from ui.dashboard_frame import DashboardFrame
+import standins
+
+EXECUTE_QUERIES = {
+    "point": "SELECT * FROM orders WHERE id = 4242",
+    "scan": "SELECT * FROM orders",
+    "join": ("SELECT o.id, o.created_at, c.name, c.country, o.total FROM orders o "
+             "JOIN customers c ON c.id = o.customer_id WHERE o.status = 'paid'"),
+    "aggregate": ("SELECT p.category, COUNT(*) AS items, SUM(oi.quantity * oi.unit_price) AS revenue "
+                  "FROM order_items oi JOIN products p ON p.id = oi.product_id GROUP BY p.category"),
+}
+
+# Question -> SQL the fake model answers with; covers keyset paging, cursor paging and aggregates
+QUESTIONS = {
+    "how many orders are there per status": "SELECT status, COUNT(*) AS orders FROM orders GROUP BY status ORDER BY orders DESC",
+    "revenue by customer country": ("SELECT c.country, SUM(o.total) AS revenue FROM orders o "
+                                    "JOIN customers c ON c.id = o.customer_id GROUP BY c.country ORDER BY revenue DESC"),
+    "show the latest orders": "SELECT * FROM orders ORDER BY created_at DESC",
+    "list all customers": "SELECT * FROM customers",
+    "top 10 products by units sold": ("SELECT p.name, SUM(oi.quantity) AS units FROM order_items oi "
+                                      "JOIN products p ON p.id = oi.product_id GROUP BY p.name ORDER BY units DESC LIMIT 10"),
+}
+
+
+class HeadlessTaskRunner:
+    """The parts of TaskRunner that ConverseFrame's worker code uses, without a Tk root."""
+    run_cancellable = TaskRunner.run_cancellable
+    start_abandonable = TaskRunner.start_abandonable
+    wait_cancellable = TaskRunner.wait_cancellable
+
+    def __init__(self, max_workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._abandonable = ThreadPoolExecutor(max_workers=max_workers)
+
+    def shutdown(self):
+        self.executor.shutdown()
+        self._abandonable.shutdown()
+
+
+class HeadlessConverse:
+    """Runs ConverseFrame's own pipeline code; UI callbacks run inline and only record what they get."""
+    _run_query_pipeline = ConverseFrame._run_query_pipeline
+    _answer_question = ConverseFrame._answer_question
+
+    def __init__(self, task_runner):
+        self.task_runner = task_runner
+        self.result = None
+        self.messages = []
+
+    def ask(self, question):
+        """Returns the rows in the first page, like the grid receives them. Raises if nothing came back."""
+        self.result, self.messages = None, []
+        self._run_query_pipeline(Job(), question)
+        if self.result is None:
+            raise RuntimeError(f"{question!r}: {self.messages[-1] if self.messages else 'no result'}")
+        rows = len(self.result.to_dataframe()) # What _show_result hands to the grid
+        self.result.close()
+        return rows
+
+    def _post(self, job, callback, *args):
+        callback(*args)
+
+    def _show_result(self, result, warnings=None, sql=None):
+        self.result = result
+
+    def _update_results_text(self, text):
+        self.messages.append(text)
+
+    def _update_sql_text(self, text):
+        pass
+
+    def _finish_job(self):
+        pass
+
+
+class HeadlessDashboard:
+    """Runs DashboardFrame's refresh worker code; the counts end up in row_counts instead of a chart."""
+    _load_row_counts = DashboardFrame._load_row_counts
+    _count_rows = DashboardFrame._count_rows
+
+    def __init__(self):
+        self.row_counts = {}
+
+    def load(self, pool):
+        self.row_counts = {}
+        self._load_row_counts(Job(), pool)
+        return self.row_counts
+
+    def _post(self, job, callback, *args):
+        callback(*args)
+
+    def _show_estimates(self, estimates):
+        self.row_counts = dict(estimates)
+
+    def _on_exact_count(self, table, count):
+        if count is not None:
+            self.row_counts[table] = count
+
+    def _on_counts_done(self):
+        pass
+
+
+def measure(fn, repeat):
+    fn() # Warm-up: imports, schema catalog, prepared state
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(times), "p95_ms": percentile(times, 95), "min_ms": min(times),
+            "runs": repeat}
+
+
+def open_pool(args, scale):
+    database = f"dbconverse_bench_sf{scale}".replace(".", "_")
+    if args.backend == "mysql":
+        standins.create_mysql_database(args.mysql_host, args.mysql_user, args.mysql_password, database, scale)
+        return db_service.create_connection_pool(args.mysql_host, args.mysql_user, args.mysql_password, database)
+    path, info_path = standins.create_sqlite_database(WORK_DIR, database, scale)
+    return standins.SQLitePool(path, info_path, database)
+
+
+def run_scale(args, scale, task_runner):
+    pool = open_pool(args, scale)
+    if pool is None:
+        raise RuntimeError("Could not connect to the benchmark database.")
+    current_app_state.db_pool = pool # ConverseFrame's pipeline reads the pool from here
+    results = {}
+    try:
+        def _table_names():
+            with pool.connection() as connection:
+                db_service.get_table_names(connection)
+        results["get_table_names"] = measure(_table_names, args.repeat)
+
+        for name, sql in EXECUTE_QUERIES.items():
+            def _execute(sql=sql):
+                with pool.connection() as connection:
+                    df, error = db_service.execute_query(connection, sql)
+                if error:
+                    raise RuntimeError(error)
+            results[f"execute_query.{name}"] = measure(_execute, args.repeat)
+
+        for output_format in export_service.EXPORT_FORMATS:
+            path = os.path.join(WORK_DIR, f"export_sf{scale}.{output_format}")
+            results[f"export.{output_format}"] = measure(
+                lambda path=path, output_format=output_format: export_service.export_query(
+                    pool, "SELECT * FROM order_items", path, output_format), args.repeat)
+
+        dashboard = HeadlessDashboard()
+        results["dashboard.load"] = measure(lambda: dashboard.load(pool), args.repeat)
+        chart = chart_service.BarChart(title="Row Counts per Table", xlabel="Table Name", ylabel="Number of Rows")
+        labels = sorted(dashboard.row_counts)
+        def _render():
+            chart.update(labels, [dashboard.row_counts[t] for t in labels], estimated=[False] * len(labels))
+            chart.render(800, 400)
+        results["dashboard.render"] = measure(_render, args.repeat)
+
+        converse = HeadlessConverse(task_runner)
+        def _converse():
+            for question in QUESTIONS:
+                converse.ask(question)
+        _converse() # Warm-up outside the traced window
+        tracer.clear()
+        results["converse.e2e"] = measure(_converse, args.repeat)
+        results["converse.stages"] = {
+            name: {"p50_ms": s["p50_ms"], "p95_ms": s["p95_ms"], "count": s["count"]}
+            for name, s in tracer.stage_stats().items()
+        }
+
+        snapshot = snapshot_service.Snapshot(os.path.join(WORK_DIR, f"snapshot_sf{scale}"), pool.details["database"],
+                                             args.snapshot_engine)
+        catalog = schema_catalog.get_schema_catalog(pool)
+        def _sync():
+            with pool.connection() as connection:
+                snapshot.sync(connection, catalog)
+        start = time.perf_counter()
+        _sync()
+        full_ms = (time.perf_counter() - start) * 1000
+        results["snapshot.sync_full"] = {"median_ms": full_ms, "p95_ms": full_ms, "min_ms": full_ms, "runs": 1}
+        results["snapshot.sync_unchanged"] = measure(_sync, args.repeat)
+        def _snapshot_aggregate():
+            df, _ = snapshot.query(EXECUTE_QUERIES["aggregate"], max_staleness_s=float("inf"))
+            if df is None:
+                raise RuntimeError("The snapshot did not answer the aggregate query.")
+        results["snapshot.aggregate"] = measure(_snapshot_aggregate, args.repeat)
+    finally:
+        current_app_state.db_pool = None
+        pool.close()
+    return results
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--", "app", "benchmarks"], cwd=ROOT_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{revision}-dirty" if dirty else revision
+
+
+def load_results(name):
+    path = name if os.path.exists(name) else os.path.join(RESULTS_DIR, f"{name}.json")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(before, after, threshold, min_delta_ms):
+    """
+    Prints median (and per-stage p50) changes. Returns the metrics that got slower by more than
+    threshold and by more than min_delta_ms, so jitter on sub-millisecond metrics is not flagged.
+    """
+    print(f"\n{before['label']} -> {after['label']}")
+    print(f"{'metric':<40} {'before ms':>10} {'after ms':>10} {'change':>8}")
+    regressions = []
+    for scale, metrics in after["scales"].items():
+        old_metrics = before["scales"].get(scale, {})
+        rows = [(name, old_metrics.get(name, {}).get("median_ms"), m["median_ms"])
+                for name, m in metrics.items() if name != "converse.stages"]
+        old_stages = old_metrics.get("converse.stages", {})
+        rows += [(f"stage {name}", old_stages.get(name, {}).get("p50_ms"), s["p50_ms"])
+                 for name, s in metrics.get("converse.stages", {}).items()]
+        for name, old, new in rows:
+            label = f"sf{scale} {name}"
+            if old is None:
+                print(f"{label:<40} {'-':>10} {new:>10.2f}")
+                continue
+            change = new / old - 1 if old else 0.0
+            regressed = change > threshold and new - old > min_delta_ms and not name.startswith("stage")
+            flag = " <-" if regressed else ""
+            print(f"{label:<40} {old:>10.2f} {new:>10.2f} {change:>+8.0%}{flag}")
+            if flag:
+                regressions.append(label)
+    return regressions
+
+
+def print_results(results):
+    for scale, metrics in results["scales"].items():
+        print(f"\nScale factor {scale}")
+        print(f"{'metric':<28} {'median ms':>10} {'p95 ms':>10} {'min ms':>10}")
+        for name, m in metrics.items():
+            if name != "converse.stages":
+                print(f"{name:<28} {m['median_ms']:>10.2f} {m['p95_ms']:>10.2f} {m['min_ms']:>10.2f}")
+        print(f"  converse stages: " + ", ".join(
+            f"{name} {s['p50_ms']:.1f}/{s['p95_ms']:.1f}" for name, s in metrics["converse.stages"].items()
+        ) + " (p50/p95 ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="1,10", help="Comma-separated scale factors")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--mysql-host", default=os.getenv("MYSQL_HOST", "localhost"))
+    parser.add_argument("--mysql-user", default=os.getenv("MYSQL_USER", "root"))
+    parser.add_argument("--mysql-password", default=os.getenv("MYSQL_PWD", ""))
+    parser.add_argument("--llm-first-token-ms", type=float, default=0.0, help="Fake Gemini delay before the first chunk")
+    parser.add_argument("--llm-chunk-ms", type=float, default=0.0, help="Fake Gemini delay between chunks")
+    parser.add_argument("--snapshot-engine", choices=("auto", "duckdb", "sqlite"), default="auto")
+    parser.add_argument("--label", help="Name of the stored result (default: the git revision)")
+    parser.add_argument("--compare", nargs="+", metavar="REV", help="Stored result(s) to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown counted as a regression (0.10 = 10%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Smaller slowdowns are never regressions")
+    args = parser.parse_args()
+
+    try:
+        if args.compare and len(args.compare) == 2:
+            regressions = compare(load_results(args.compare[0]), load_results(args.compare[1]), args.threshold, args.min_delta_ms)
+            sys.exit(1 if regressions else 0)
+
+        nlp_service.set_model(standins.FakeGemini(QUESTIONS, args.llm_first_token_ms, args.llm_chunk_ms))
+        task_runner = HeadlessTaskRunner()
+        results = {
+            "label": args.label or git_revision(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "repeat": args.repeat,
+            "llm_delays_ms": [args.llm_first_token_ms, args.llm_chunk_ms],
+            "scales": {},
+        }
+        try:
+            for scale in args.scales.split(","):
+                results["scales"][scale.strip()] = run_scale(args, float(scale) if "." in scale else int(scale), task_runner)
+        finally:
+            task_runner.shutdown()
+        print_results(results)
+
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{results['label']}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {path}")
+
+        if args.compare:
+            regressions = compare(load_results(args.compare[0]), results, args.threshold, args.min_delta_ms)
+            sys.exit(1 if regressions else 0)
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+"""
+Offline stand-ins for the benchmark suite (see bench_suite.py): a synthetic shop database, a
+SQLite-backed pool that behaves like db_service.ConnectionPool, and a deterministic fake Gemini.
+
+SQLitePool hands out connections whose cursors speak enough of mysql.connector's API for the
+app's code paths: %s parameters, MySQL-style cursor.description type codes and null_ok flags (so
+services.columnar builds the same dtypes and LazyResult picks the same paging), SHOW TABLES,
+EXPLAIN FORMAT=JSON and an attached information_schema with TABLES, COLUMNS and KEY_COLUMN_USAGE
+filled in when the database is seeded. Errors are raised as mysql.connector.Error. Timings
+measure the app's own work over an in-process engine, so they are for comparing revisions, not
+for predicting MySQL latency.
+"""
+import datetime
+import json
+import os
+import queue
+import random
+import re
+import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+from decimal import Decimal
+
+import sqlglot
+from sqlglot import exp
+from mysql.connector import Error, FieldType
+
+# table -> [(column, SQLite declared type, MySQL COLUMN_TYPE, COLUMN_KEY)]; foreign keys are in FOREIGN_KEYS
+TABLES = {
+    "customers": [
+        ("id", "INTEGER PRIMARY KEY", "int", "PRI"),
+        ("name", "TEXT", "varchar(100)", ""),
+        ("email", "TEXT", "varchar(150)", ""),
+        ("country", "TEXT", "varchar(2)", ""),
+        ("segment", "TEXT", "varchar(20)", ""),
+        ("created_at", "DATETIME", "datetime", ""),
+    ],
+    "products": [
+        ("id", "INTEGER PRIMARY KEY", "int", "PRI"),
+        ("name", "TEXT", "varchar(100)", ""),
+        ("category", "TEXT", "varchar(50)", ""),
+        ("price", "DECIMAL", "decimal(10,2)", ""),
+    ],
+    "orders": [
+        ("id", "INTEGER PRIMARY KEY", "int", "PRI"),
+        ("customer_id", "INTEGER", "int", "MUL"),
+        ("status", "TEXT", "varchar(20)", ""),
+        ("total", "DECIMAL", "decimal(12,2)", ""),
+        ("created_at", "DATETIME", "datetime", "MUL"),
+        ("shipped_on", "DATE", "date", ""),
+    ],
+    "order_items": [
+        ("id", "INTEGER PRIMARY KEY", "int", "PRI"),
+        ("order_id", "INTEGER", "int", "MUL"),
+        ("product_id", "INTEGER", "int", "MUL"),
+        ("quantity", "INTEGER", "int", ""),
+        ("unit_price", "DECIMAL", "decimal(10,2)", ""),
+    ],
+}
+NOT_NULL_COLUMNS = {("customers", "created_at"), ("orders", "created_at")} # Besides the primary keys
+FOREIGN_KEYS = [ # (table, column, referenced table, referenced column)
+    ("orders", "customer_id", "customers", "id"),
+    ("order_items", "order_id", "orders", "id"),
+    ("order_items", "product_id", "products", "id"),
+]
+ROWS_PER_SCALE = {"customers": 1_000, "products": 100, "orders": 10_000, "order_items": 30_000}
+
+COUNTRIES = ["US", "DE", "FR", "GB", "IN", "BR", "JP", "CA", "AU", "NL"]
+SEGMENTS = ["consumer", "smb", "enterprise"]
+CATEGORIES = ["books", "games", "garden", "kitchen", "music", "office", "sports", "toys"]
+STATUSES = ["new", "paid", "shipped", "delivered", "returned", "cancelled"]
+
+_SQLITE_TO_MYSQL_TYPE = {int: FieldType.LONGLONG, float: FieldType.DOUBLE, Decimal: FieldType.NEWDECIMAL,
+                         datetime.datetime: FieldType.DATETIME, datetime.date: FieldType.DATE,
+                         str: FieldType.VAR_STRING, bytes: FieldType.BLOB}
+# Result columns reported NOT NULL in cursor.description. SQLite does not say which table a result
+# column came from, so this goes by name, which is unambiguous in this schema.
+_NOT_NULL_NAMES = ({column for _, column in NOT_NULL_COLUMNS}
+                   | {name for definition in TABLES.values() for name, _, _, key in definition if key == "PRI"})
+_EXPLAIN_RE = re.compile(r"^\s*EXPLAIN\s+FORMAT\s*=\s*JSON\s+", re.IGNORECASE)
+_SHOW_TABLES_RE = re.compile(r"^\s*SHOW\s+TABLES\s*;?\s*$", re.IGNORECASE)
+_SET_RE = re.compile(r"^\s*SET\s", re.IGNORECASE)
+
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_converter("DECIMAL", lambda raw: Decimal(raw.decode()))
+sqlite3.register_converter("DATETIME", lambda raw: datetime.datetime.fromisoformat(raw.decode()))
+sqlite3.register_converter("DATE", lambda raw: datetime.date.fromisoformat(raw.decode()))
+
+
+def seed_rows(scale, seed=7):
+    """Deterministic synthetic rows per table for a scale factor (1 = 10,000 orders)."""
+    rng = random.Random(seed)
+    counts = {table: max(1, int(rows * scale)) for table, rows in ROWS_PER_SCALE.items()}
+    start = datetime.datetime(2023, 1, 1)
+    rows = {}
+    rows["customers"] = [
+        (i, f"Customer {i}", f"customer{i}@example.com", rng.choice(COUNTRIES), rng.choice(SEGMENTS),
+         start + datetime.timedelta(seconds=rng.randint(0, 86400 * 365)))
+        for i in range(1, counts["customers"] + 1)
+    ]
+    rows["products"] = [
+        (i, f"Product {i}", rng.choice(CATEGORIES), Decimal(rng.randint(199, 19999)) / 100)
+        for i in range(1, counts["products"] + 1)
+    ]
+    rows["orders"] = []
+    for i in range(1, counts["orders"] + 1):
+        created = start + datetime.timedelta(seconds=rng.randint(0, 86400 * 700))
+        shipped = None if rng.random() < 0.2 else (created + datetime.timedelta(days=rng.randint(1, 9))).date()
+        rows["orders"].append((i, rng.randint(1, counts["customers"]), rng.choice(STATUSES),
+                               Decimal(rng.randint(500, 500000)) / 100, created, shipped))
+    rows["order_items"] = [
+        (i, rng.randint(1, counts["orders"]), rng.randint(1, counts["products"]), rng.randint(1, 5),
+         Decimal(rng.randint(199, 19999)) / 100)
+        for i in range(1, counts["order_items"] + 1)
+    ]
+    return rows
+
+
+def _information_schema_rows(database, row_counts):
+    created = "2024-01-01 00:00:00"
+    tables = [(database, name, "BASE TABLE", row_counts[name], "", created, None) for name in TABLES]
+    columns = []
+    keys = []
+    for table, definition in TABLES.items():
+        for position, (column, _, column_type, key) in enumerate(definition, 1):
+            nullable = "NO" if key == "PRI" or (table, column) in NOT_NULL_COLUMNS else "YES"
+            columns.append((database, table, column, position, column_type, nullable, key, ""))
+            if key == "PRI":
+                keys.append((database, table, "PRIMARY", column, 1, None, None))
+    for table, column, ref_table, ref_column in FOREIGN_KEYS:
+        keys.append((database, table, f"fk_{table}_{column}", column, 1, ref_table, ref_column))
+    return tables, columns, keys
+
+
+def create_sqlite_database(directory, database, scale, seed=7):
+    """Seeds <directory>/<database>.sqlite3 plus its information_schema file. Returns the two paths."""
+    path = os.path.join(directory, f"{database}.sqlite3")
+    info_path = os.path.join(directory, f"{database}.information_schema.sqlite3")
+    for stale in (path, info_path):
+        if os.path.exists(stale):
+            os.remove(stale)
+    rows = seed_rows(scale, seed)
+
+    connection = sqlite3.connect(path)
+    with connection:
+        for table, definition in TABLES.items():
+            columns = ", ".join(f"{name} {sqlite_type}" + (" NOT NULL" if (table, name) in NOT_NULL_COLUMNS else "")
+                                for name, sqlite_type, _, _ in definition)
+            connection.execute(f"CREATE TABLE {table} ({columns})")
+            placeholders = ", ".join("?" * len(definition))
+            connection.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows[table])
+        for table, column, _, _ in FOREIGN_KEYS:
+            connection.execute(f"CREATE INDEX idx_{table}_{column} ON {table} ({column})")
+        connection.execute("CREATE INDEX idx_orders_created_at ON orders (created_at)")
+    connection.execute("ANALYZE")
+    connection.close()
+
+    tables, columns, keys = _information_schema_rows(database, {t: len(r) for t, r in rows.items()})
+    info = sqlite3.connect(info_path)
+    with info:
+        info.execute("CREATE TABLE TABLES (TABLE_SCHEMA, TABLE_NAME, TABLE_TYPE, TABLE_ROWS, TABLE_COMMENT, "
+                     "CREATE_TIME, UPDATE_TIME)")
+        info.execute("CREATE TABLE COLUMNS (TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION, COLUMN_TYPE, "
+                     "IS_NULLABLE, COLUMN_KEY, COLUMN_COMMENT)")
+        info.execute("CREATE TABLE KEY_COLUMN_USAGE (TABLE_SCHEMA, TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, "
+                     "ORDINAL_POSITION, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME)")
+        info.executemany("INSERT INTO TABLES VALUES (?, ?, ?, ?, ?, ?, ?)", tables)
+        info.executemany("INSERT INTO COLUMNS VALUES (?, ?, ?, ?, ?, ?, ?, ?)", columns)
+        info.executemany("INSERT INTO KEY_COLUMN_USAGE VALUES (?, ?, ?, ?, ?, ?, ?)", keys)
+    info.close()
+    return path, info_path
+
+
+def create_mysql_database(host, user, password, database, scale, seed=7, batch_size=5000):
+    """Seeds the same tables into a local MySQL/MariaDB database (dropped and recreated)."""
+    import mysql.connector
+    rows = seed_rows(scale, seed)
+    connection = mysql.connector.connect(host=host, user=user, password=password)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+        cursor.execute(f"CREATE DATABASE `{database}`")
+        cursor.execute(f"USE `{database}`")
+        for table, definition in TABLES.items():
+            columns = ", ".join(f"`{name}` {column_type.upper()}" + (" PRIMARY KEY" if key == "PRI" else "")
+                                + (" NOT NULL" if (table, name) in NOT_NULL_COLUMNS else "")
+                                for name, _, column_type, key in definition)
+            cursor.execute(f"CREATE TABLE `{table}` ({columns}) ENGINE=InnoDB")
+            placeholders = ", ".join(["%s"] * len(definition))
+            for start in range(0, len(rows[table]), batch_size):
+                cursor.executemany(f"INSERT INTO `{table}` VALUES ({placeholders})",
+                                   rows[table][start:start + batch_size])
+            connection.commit()
+        for table, column, ref_table, ref_column in FOREIGN_KEYS:
+            cursor.execute(f"ALTER TABLE `{table}` ADD CONSTRAINT `fk_{table}_{column}` "
+                           f"FOREIGN KEY (`{column}`) REFERENCES `{ref_table}` (`{ref_column}`)")
+        cursor.execute("ALTER TABLE `orders` ADD INDEX `idx_orders_created_at` (`created_at`)")
+        for table in TABLES:
+            cursor.execute(f"ANALYZE TABLE `{table}`")
+            cursor.fetchall()
+    finally:
+        cursor.close()
+        connection.close()
+
+
+class _Cursor:
+    """Buffered cursor with mysql.connector's surface: execute(%s params), fetch*, description."""
+    def __init__(self, connection):
+        self._connection = connection
+        self._rows = []
+        self._position = 0
+        self.description = None
+
+    def execute(self, query, params=None):
+        self._rows, self._position, self.description = [], 0, None
+        if _SET_RE.match(query):
+            return # Session variables (e.g. information_schema_stats_expiry) have no equivalent
+        if _SHOW_TABLES_RE.match(query):
+            query = "SELECT name AS Tables_in_db FROM sqlite_master WHERE type = 'table' ORDER BY name"
+        explain = _EXPLAIN_RE.match(query)
+        try:
+            if explain:
+                self._explain(query[explain.end():], params)
+                return
+            cursor = self._connection.raw.execute(query.replace("%s", "?"), tuple(params or ()))
+            self._rows = cursor.fetchall()
+            if cursor.description:
+                self.description = self._describe(cursor.description)
+        except sqlite3.Error as e:
+            raise Error(msg=f"{e} (SQLite stand-in)") from e
+
+    def _describe(self, sqlite_description):
+        description = []
+        for index, column in enumerate(sqlite_description):
+            value = next((row[index] for row in self._rows if row[index] is not None), None)
+            type_code = FieldType.NULL if value is None else _SQLITE_TO_MYSQL_TYPE.get(type(value), FieldType.VAR_STRING)
+            description.append((column[0], type_code, None, None, None, None, column[0] not in _NOT_NULL_NAMES, 0))
+        return description
+
+    def _explain(self, sql, params):
+        """Checks the SQL with EXPLAIN QUERY PLAN and reports one full scan per table it reads."""
+        self._connection.raw.execute(f"EXPLAIN QUERY PLAN {sql}".replace("%s", "?"), tuple(params or ()))
+        names = {table.name for table in sqlglot.parse_one(sql, read="mysql").find_all(exp.Table)}
+        tables = []
+        for name in sorted(names):
+            found = self._connection.raw.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_NAME = ?", (name,)).fetchone()
+            rows = found[0] if found else 1
+            tables.append({"table": {"table_name": name, "rows_examined_per_scan": rows,
+                                     "rows_produced_per_join": rows}})
+        self._rows = [(json.dumps({"query_block": {"tables": tables}}),)]
+        self.description = [("EXPLAIN", FieldType.VAR_STRING, None, None, None, None, True, 0)]
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+
+    def close(self):
+        self._rows = []
+
+
+class _Connection:
+    _ids = iter(range(1, 1_000_000))
+
+    def __init__(self, path, info_path, database):
+        self.raw = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self.raw.execute("ATTACH DATABASE ? AS information_schema", (info_path,))
+        self.raw.create_function("CRC32", 1, lambda value: zlib.crc32(str(value).encode()), deterministic=True)
+        self.raw.create_function("CONCAT_WS", -1, lambda sep, *values: sep.join(str(v) for v in values if v is not None),
+                                 deterministic=True)
+        self.raw.create_function("DATABASE", 0, lambda: database)
+        self.connection_id = next(_Connection._ids)
+
+    def cursor(self, buffered=None, dictionary=None):
+        return _Cursor(self)
+
+    def is_connected(self):
+        return True
+
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        pass
+
+
+class SQLitePool:
+    """Drop-in for db_service.ConnectionPool over a database made by create_sqlite_database()."""
+    def __init__(self, path, info_path, database, pool_size=5):
+        self.details = {"host": "sqlite-standin", "user": "", "password": "", "database": database}
+        self.pool_size = pool_size
+        self._idle = queue.Queue()
+        for _ in range(pool_size):
+            self._idle.put(_Connection(path, info_path, database))
+
+    @contextmanager
+    def connection(self, timeout=30):
+        try:
+            connection = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise Error(msg=f"Timed out after {timeout}s waiting for a free database connection.")
+        try:
+            yield connection
+        finally:
+            self._idle.put(connection)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().raw.close()
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Response:
+    """Non-streaming response with the attributes nlp_service.generate_text_with_gemini reads."""
+    def __init__(self, text):
+        self.text = text
+        self.candidates = [type("Candidate", (), {"content": type("Content", (), {"parts": [text]})()})()]
+
+
+class FakeGemini:
+    """
+    Deterministic stand-in for genai.GenerativeModel. The question is read back out of the prompt
+    and answered from `answers` as a fenced SQL block, streamed in chunk_chars pieces with fixed
+    delays, so the streaming extractor and early guard run exactly as they do against Gemini.
+    """
+    def __init__(self, answers, first_token_ms=0.0, chunk_ms=0.0, chunk_chars=16):
+        self.answers = answers
+        self.first_token_ms = first_token_ms
+        self.chunk_ms = chunk_ms
+        self.chunk_chars = chunk_chars
+
+    def _answer(self, prompt):
+        question = prompt.split("Natural Language Question:", 1)[-1].split("SQL Query:", 1)[0].strip()
+        sql = self.answers.get(question, "SELECT 1")
+        return f"```sql\n{sql};\n```\nThis query answers: {question}"
+
+    def generate_content(self, prompt, stream=False):
+        text = self._answer(prompt)
+        if not stream:
+            time.sleep((self.first_token_ms + self.chunk_ms * len(text) / self.chunk_chars) / 1000)
+            return _Response(text)
+        return self._stream(text)
+
+    def _stream(self, text):
+        time.sleep(self.first_token_ms / 1000)
+        for start in range(0, len(text), self.chunk_chars):
+            if start:
+                time.sleep(self.chunk_ms / 1000)
+            yield _Chunk(text[start:start + self.chunk_chars])
@@ -0,0 +1,87 @@
+import sqlite3
+from contextlib import contextmanager
+from decimal import Decimal
+
+import pytest
+from mysql.connector import Error, FieldType
+
+_TYPE_CODES = {int: FieldType.LONGLONG, float: FieldType.DOUBLE, str: FieldType.VAR_STRING, bytes: FieldType.BLOB,
+               Decimal: FieldType.NEWDECIMAL}
+
+# Columns declared DECIMAL round-trip as exact Decimal values, like MySQL sends them
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter("DECIMAL", lambda raw: Decimal(raw.decode()))
+
+
+class FakeCursor:
+    """Buffered cursor over sqlite3 with the parts of mysql.connector's cursor that db_service uses."""
+    def __init__(self, connection):
+        self._connection = connection
+        self._rows = []
+        self.description = None
+
+    def execute(self, query, params=None):
+        self._connection.statements.append(query)
+        try:
+            cursor = self._connection.raw.execute(query.replace("%s", "?"), tuple(params or ()))
+        except sqlite3.Error as e:
+            raise Error(msg=str(e)) from e
+        self._rows = cursor.fetchall()
+        self.description = None
+        if cursor.description:
+            self.description = []
+            for index, column in enumerate(cursor.description):
+                value = next((row[index] for row in self._rows if row[index] is not None), None)
+                type_code = FieldType.NULL if value is None else _TYPE_CODES[type(value)]
+                null_ok = column[0] not in self._connection.not_null
+                self.description.append((column[0], type_code, None, None, None, None, null_ok, 0))
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        self._rows = []
+
+
+class FakeConnection:
+    connection_id = 1
+
+    def __init__(self, not_null):
+        self.raw = sqlite3.connect(":memory:", detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self.not_null = set(not_null) # Result column names reported NOT NULL in cursor.description
+        self.statements = []
+
+    def cursor(self, buffered=None, dictionary=None):
+        return FakeCursor(self)
+
+
+class FakePool:
+    """
+    Single-connection stand-in for db_service.ConnectionPool. raw is the sqlite3 connection for
+    setting up tables; statements lists every query the code under test ran.
+    """
+    def __init__(self, not_null=()):
+        self.details = {"host": "fake", "user": "", "password": "", "database": "test"}
+        self.pool_size = 5
+        self._connection = FakeConnection(not_null)
+        self.raw = self._connection.raw
+        self.statements = self._connection.statements
+
+    @contextmanager
+    def connection(self, timeout=30):
+        yield self._connection
+
+
+@pytest.fixture
+def fake_pool():
+    """Factory: fake_pool(not_null=("id",)) returns a FakePool over an empty in-memory database."""
+    return FakePool
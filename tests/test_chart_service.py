@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import chart_service, query_guard
+
+
+def _plan_with_rows(rows):
+    return {"query_block": {"table": {"table_name": "_chart_source", "rows_examined_per_scan": rows}}}
+
+
+@pytest.fixture
+def sales_pool(fake_pool, monkeypatch):
+    """Six regions (one of them NULL) whose row counts are 6, 5, ... 1; EXPLAIN reports 21 rows."""
+    monkeypatch.setattr(query_guard, "explain_query", lambda connection, sql: _plan_with_rows(21))
+    pool = fake_pool()
+    pool.raw.execute("CREATE TABLE sales (region TEXT, amount INTEGER)")
+    regions = ["north", "south", "east", "west", "centre", None]
+    for count, region in zip(range(6, 0, -1), regions):
+        pool.raw.executemany("INSERT INTO sales VALUES (?, ?)", [(region, 1)] * count)
+    return pool
+
+
+def _bar_chart(pool, top_categories, **kwargs):
+    sample = pd.DataFrame({"region": ["north"], "amount": [1]})
+    return chart_service.chart_query_result(pool, "SELECT region, amount FROM sales", sample,
+                                            top_categories=top_categories, **kwargs)
+
+
+def test_bar_chart_counts_all_groups_including_null_when_truncated(sales_pool):
+    data = _bar_chart(sales_pool, top_categories=3)
+
+    assert data.x == ["north", "south", "east"]
+    assert list(data.y) == [6.0, 5.0, 4.0]
+    assert data.note == "6 groups in MySQL, top 3 shown"
+    assert not any("OVER" in statement.upper() for statement in sales_pool.statements)
+
+
+def test_bar_chart_skips_the_count_when_every_group_fits(sales_pool):
+    data = _bar_chart(sales_pool, top_categories=10)
+
+    assert data.x == ["north", "south", "east", "west", "centre", "NULL"]
+    assert data.note == "6 groups in MySQL"
+    assert not any("COUNT(DISTINCT" in statement for statement in sales_pool.statements)
+
+
+def test_aggregates_go_through_the_guard(sales_pool):
+    _bar_chart(sales_pool, top_categories=3, max_execution_ms=1500)
+
+    aggregates = [statement for statement in sales_pool.statements if "_chart_source" in statement]
+    assert aggregates and all("MAX_EXECUTION_TIME(1500)" in statement for statement in aggregates)
+
+
+def test_aggregate_over_the_row_limit_is_rejected_before_it_runs(sales_pool):
+    with pytest.raises(RuntimeError, match="examine about"):
+        _bar_chart(sales_pool, top_categories=3, max_rows_examined=20)
+
+    assert sales_pool.statements == []
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.zeros(1000)
+    y[500] = 100.0
+
+    sampled_x, sampled_y = chart_service.lttb(x, y, 50)
+
+    assert len(sampled_x) == 50
+    assert sampled_x[0] == 0 and sampled_x[-1] == 999
+    assert np.all(np.diff(sampled_x) > 0)
+    assert 500 in sampled_x and sampled_y.max() == 100.0
+
+
+def test_lttb_returns_short_series_unchanged():
+    x, y = [1, 2, 3], [4, 5, 6]
+
+    sampled_x, sampled_y = chart_service.lttb(x, y, 10)
+
+    assert list(sampled_x) == x and list(sampled_y) == y
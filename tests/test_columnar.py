@@ -0,0 +1,81 @@
+import datetime
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from mysql.connector import FieldFlag, FieldType
+
+from services import columnar
+
+
+def _description(*columns):
+    return [(name, type_code, None, None, None, None, True, flags) for name, type_code, flags in columns]
+
+
+def test_types_follow_the_cursor_description():
+    rows = [
+        (1, 1.5, Decimal("2.25"), datetime.datetime(2024, 1, 2, 3, 4, 5), datetime.date(2024, 1, 2),
+         datetime.timedelta(hours=1), "a", b"\x00"),
+        (2, None, None, None, None, None, None, None),
+    ]
+    description = _description(
+        ("id", FieldType.LONGLONG, 0), ("ratio", FieldType.DOUBLE, 0), ("price", FieldType.NEWDECIMAL, 0),
+        ("created", FieldType.DATETIME, 0), ("day", FieldType.DATE, 0), ("duration", FieldType.TIME, 0),
+        ("name", FieldType.VAR_STRING, 0), ("payload", FieldType.BLOB, 0),
+    )
+
+    df = columnar.rows_to_dataframe(rows, description)
+
+    assert df["id"].dtype == np.int64
+    assert df["ratio"].dtype == np.float64 and np.isnan(df["ratio"].iloc[1])
+    assert df["price"].dtype == np.float64 and df["price"].iloc[0] == 2.25
+    assert df["created"].dtype == "datetime64[us]" and pd.isna(df["created"].iloc[1])
+    assert df["day"].dtype == "datetime64[us]"
+    assert df["duration"].dtype == "timedelta64[us]"
+    assert df["name"].iloc[0] == "a" and pd.isna(df["name"].iloc[1])
+    assert df["payload"].iloc[0] == b"\x00"
+
+
+def test_integers_with_nulls_stay_integers():
+    df = columnar.rows_to_dataframe([(1,), (None,), (3,)], _description(("n", FieldType.LONG, 0)))
+
+    assert df["n"].dtype == "Int64"
+    assert df["n"].tolist() == [1, pd.NA, 3]
+
+
+def test_unsigned_bigint_does_not_overflow():
+    big = 2 ** 64 - 1
+    df = columnar.rows_to_dataframe([(big,), (1,)], _description(("n", FieldType.LONGLONG, FieldFlag.UNSIGNED)))
+
+    assert df["n"].dtype == np.uint64 and int(df["n"].iloc[0]) == big
+
+
+def test_exact_decimals_keep_decimal_objects():
+    df = columnar.rows_to_dataframe([(Decimal("0.10"),), (None,)], _description(("amount", FieldType.NEWDECIMAL, 0)),
+                                    exact_decimals=True)
+
+    assert df["amount"].iloc[0] == Decimal("0.10") and df["amount"].iloc[1] is None
+
+
+def test_values_that_do_not_match_the_type_fall_back_to_objects():
+    df = columnar.rows_to_dataframe([("not a number",), (2,)], _description(("n", FieldType.LONG, 0)))
+
+    assert df["n"].dtype == object and df["n"].tolist() == ["not a number", 2]
+
+
+def test_low_cardinality_strings_are_categorized_only_on_request():
+    rows = [("red" if i % 2 else None,) for i in range(columnar.CATEGORY_MIN_ROWS)]
+    description = _description(("colour", FieldType.VAR_STRING, 0))
+
+    assert not isinstance(columnar.rows_to_dataframe(rows, description)["colour"].dtype, pd.CategoricalDtype)
+    categorized = columnar.rows_to_dataframe(rows, description, categorize=True)["colour"]
+    assert isinstance(categorized.dtype, pd.CategoricalDtype)
+    assert categorized.isna().sum() == columnar.CATEGORY_MIN_ROWS // 2
+
+
+def test_duplicate_names_and_empty_results():
+    description = _description(("id", FieldType.LONG, 0), ("id", FieldType.LONG, 0))
+
+    assert list(columnar.rows_to_dataframe([(1, 2)], description).columns) == ["id", "id"]
+    empty = columnar.rows_to_dataframe([], description)
+    assert empty.empty and list(empty.columns) == ["id", "id"]
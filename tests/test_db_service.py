@@ -0,0 +1,60 @@
+import pytest
+from mysql.connector import Error
+
+from services import db_service
+
+
+@pytest.fixture
+def big_pool(fake_pool, monkeypatch):
+    """50,000 rows; KILL QUERY is recorded, and the killed statement's next fetch fails like on MySQL."""
+    pool = fake_pool()
+    pool.raw.execute("CREATE TABLE t (id INTEGER)")
+    pool.raw.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(50_000)])
+    pool.killed = []
+    pool.rows_read = 0
+    fake_cursor = type(pool._connection.cursor())
+    fetchmany = fake_cursor.fetchmany
+
+    def _fetchmany(cursor, size=1):
+        if pool.killed:
+            raise Error(msg="Query execution was interrupted")
+        rows = fetchmany(cursor, size)
+        pool.rows_read += len(rows)
+        return rows
+
+    monkeypatch.setattr(fake_cursor, "fetchmany", _fetchmany)
+    monkeypatch.setattr(db_service, "kill_query", lambda *details: pool.killed.append(details[-1]))
+    return pool
+
+
+def _first_chunk(pool, **kwargs):
+    with pool.connection() as connection:
+        chunks = db_service.iter_query_chunks(connection, "SELECT id FROM t", batch_size=100, max_rows=None, **kwargs)
+        first = next(chunks)
+        chunks.close()
+    return first
+
+
+def test_large_remainder_is_killed_not_drained(big_pool):
+    _first_chunk(big_pool, connection_details=big_pool.details)
+
+    assert big_pool.killed == [1]
+    assert big_pool.rows_read <= 100 + db_service.DRAIN_MAX_ROWS
+
+
+def test_without_connection_details_the_remainder_is_drained(big_pool):
+    _first_chunk(big_pool)
+
+    assert big_pool.killed == []
+    assert big_pool.rows_read == 50_000
+
+
+def test_small_remainder_is_drained_without_a_kill(big_pool):
+    with big_pool.connection() as connection:
+        chunks = db_service.iter_query_chunks(connection, "SELECT id FROM t WHERE id < 500", batch_size=100,
+                                              connection_details=big_pool.details)
+        next(chunks)
+        chunks.close()
+
+    assert big_pool.killed == []
+    assert big_pool.rows_read == 500
@@ -0,0 +1,101 @@
+import csv
+import json
+import os
+from decimal import Decimal
+
+import pytest
+from services import export_service
+
+AMOUNTS = [Decimal("0.10"), Decimal("19.99"), None, Decimal("12345678901234567.89"), Decimal("-3.00")]
+
+
+@pytest.fixture
+def pool(fake_pool):
+    pool = fake_pool()
+    # TEXT affinity keeps the digits exactly as written; the DECIMAL converter still applies
+    pool.raw.execute("CREATE TABLE payments (id INTEGER, amount DECIMAL TEXT)")
+    pool.raw.executemany("INSERT INTO payments VALUES (?, ?)", list(enumerate(AMOUNTS, 1)))
+    return pool
+
+
+def _export(pool, tmp_path, output_format, sql="SELECT id, amount FROM payments ORDER BY id"):
+    path = str(tmp_path / f"payments.{output_format}")
+    progress = []
+    rows = export_service.export_query(pool, sql, path, output_format, batch_size=2,
+                                       on_progress=lambda *args: progress.append(args))
+    return path, rows, progress
+
+
+def test_csv_keeps_decimals_exact(pool, tmp_path):
+    path, rows, progress = _export(pool, tmp_path, "csv")
+    with open(path, newline="", encoding="utf-8") as f:
+        records = list(csv.DictReader(f))
+    assert rows == 5 and len(progress) == 3 # Three batches of at most two rows
+    assert [r["amount"] for r in records] == ["0.10", "19.99", "", "12345678901234567.89", "-3.00"]
+    assert not os.path.exists(path + ".part")
+
+
+def test_jsonl_keeps_decimals_exact(pool, tmp_path):
+    path, _, _ = _export(pool, tmp_path, "jsonl")
+    with open(path, encoding="utf-8") as f:
+        amounts = [json.loads(line)["amount"] for line in f]
+    assert amounts == ["0.10", "19.99", None, "12345678901234567.89", "-3.00"]
+
+
+def test_parquet_stores_decimals_as_decimal_type(pool, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    pa = pytest.importorskip("pyarrow")
+    path, _, _ = _export(pool, tmp_path, "parquet")
+    table = pq.read_table(path)
+    assert pa.types.is_decimal(table.schema.field("amount").type)
+    assert table.schema.field("amount").type.scale == 2
+    # The widest value is only in a later row group than the one the schema came from
+    assert table.column("amount").to_pylist() == AMOUNTS
+
+
+def test_empty_result_creates_no_file(pool, tmp_path):
+    path, rows, _ = _export(pool, tmp_path, "csv", sql="SELECT id, amount FROM payments WHERE id > 100")
+    assert rows == 0
+    assert os.listdir(tmp_path) == []
+
+
+def test_cancel_removes_the_partial_file(pool, tmp_path):
+    class CancelAfterFirstBatch:
+        def __init__(self):
+            self.checks = 0
+
+        def is_set(self):
+            self.checks += 1
+            return self.checks > 1
+
+    path = str(tmp_path / "payments.csv")
+    with pytest.raises(export_service.CancelledError):
+        export_service.export_query(pool, "SELECT * FROM payments", path, "csv", batch_size=2,
+                                    cancel_event=CancelAfterFirstBatch())
+    assert os.listdir(tmp_path) == []
+
+
+def test_format_for_path():
+    assert export_service.format_for_path("out/result.PARQUET") == "parquet"
+    assert export_service.format_for_path("result.jsonl") == "jsonl"
+    assert export_service.format_for_path("result.txt") == "csv"
+
+
+def test_statement_id_is_cleared_when_the_query_ends(pool, tmp_path):
+    seen = []
+    export_service.export_query(pool, "SELECT * FROM payments", str(tmp_path / "p.csv"), "csv",
+                                on_statement=seen.append)
+    assert seen == [pool._connection.connection_id, None]
+
+
+def test_statement_id_is_cleared_when_the_query_fails(pool, tmp_path):
+    seen = []
+    with pytest.raises(export_service.db_service.Error):
+        export_service.export_query(pool, "SELECT * FROM missing_table", str(tmp_path / "p.csv"), "csv",
+                                    on_statement=seen.append)
+    assert seen[-1] is None
+
+
+def test_parquet_is_only_offered_with_pyarrow(monkeypatch):
+    monkeypatch.setattr(export_service.importlib.util, "find_spec", lambda name: None)
+    assert export_service.available_formats() == ("csv", "jsonl")
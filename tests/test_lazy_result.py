@@ -0,0 +1,111 @@
+import pytest
+from services import db_service
+
+
+def _fetch_all(result):
+    pages = []
+    while result.has_more:
+        pages.append(result.fetch_next_page())
+    return result.to_dataframe(), pages
+
+
+@pytest.fixture
+def scores(fake_pool):
+    def _make(not_null):
+        pool = fake_pool(not_null=not_null)
+        pool.raw.execute("CREATE TABLE scores (id INTEGER NOT NULL, score INTEGER)")
+        rows = [(i, None if i % 4 == 0 else i % 5) for i in range(1, 21)] # Five NULL scores, many ties
+        pool.raw.executemany("INSERT INTO scores VALUES (?, ?)", rows)
+        return pool
+    return _make
+
+
+def test_keyset_pages_return_every_row_in_order(scores):
+    pool = scores(not_null=("id", "score"))
+    pool.raw.execute("UPDATE scores SET score = id WHERE score IS NULL")
+    result = db_service.LazyResult(pool, "SELECT id, score FROM scores ORDER BY score DESC", page_size=6)
+    df, pages = _fetch_all(result)
+
+    assert len(df) == 20
+    assert df["score"].is_monotonic_decreasing
+    assert sorted(df["id"]) == list(range(1, 21))
+    assert any("AS _page WHERE" in statement for statement in pool.statements) # Stayed in keyset mode
+    assert all(len(page) <= 6 for page in pages)
+
+
+@pytest.mark.parametrize("direction", ["ASC", "DESC"])
+def test_nullable_key_falls_back_to_offset_pages_without_losing_null_rows(scores, direction):
+    pool = scores(not_null=("id",))
+    result = db_service.LazyResult(pool, f"SELECT id, score FROM scores ORDER BY score {direction}", page_size=6)
+    df, _ = _fetch_all(result)
+
+    assert len(df) == 20
+    assert df["score"].isna().sum() == 5
+    assert not any("_page" in statement for statement in pool.statements)
+    assert [statement.rsplit("LIMIT", 1)[1].strip() for statement in pool.statements] == [
+        "0, 6", "6, 6", "12, 6", "18, 6"]
+
+
+def test_duplicate_column_names_fall_back_to_offset_pages(fake_pool):
+    pool = fake_pool(not_null=("id",))
+    pool.raw.execute("CREATE TABLE a (id INTEGER NOT NULL)")
+    pool.raw.execute("CREATE TABLE b (id INTEGER NOT NULL, a_id INTEGER NOT NULL)")
+    pool.raw.executemany("INSERT INTO a VALUES (?)", [(i,) for i in range(1, 11)])
+    pool.raw.executemany("INSERT INTO b VALUES (?, ?)", [(100 + i, i) for i in range(1, 11)])
+    query = "SELECT a.id, b.id FROM a JOIN b ON b.a_id = a.id ORDER BY a.id"
+    result = db_service.LazyResult(pool, query, page_size=4)
+    df, _ = _fetch_all(result)
+
+    assert len(df) == 10
+    assert list(df.columns) == ["id", "id"]
+    assert not any("_page" in statement for statement in pool.statements)
+
+
+def test_trailing_limit_caps_keyset_paging(scores):
+    pool = scores(not_null=("id", "score"))
+    result = db_service.LazyResult(pool, "SELECT id FROM scores ORDER BY id LIMIT 7", page_size=3)
+    df, _ = _fetch_all(result)
+
+    assert list(df["id"]) == list(range(1, 8))
+    assert result.exhausted and not result.truncated
+
+
+@pytest.mark.parametrize("limit", ["LIMIT 5, 9", "LIMIT 9 OFFSET 5"])
+def test_trailing_limit_with_offset_is_paged_within_it(fake_pool, limit):
+    pool = fake_pool()
+    pool.raw.execute("CREATE TABLE t (id INTEGER)")
+    pool.raw.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(1, 31)])
+    result = db_service.LazyResult(pool, f"SELECT id FROM t {limit}", page_size=4)
+    df, _ = _fetch_all(result)
+
+    assert list(df["id"]) == list(range(6, 15))
+    assert result.exhausted and not result.truncated
+
+
+def test_connection_id_stays_set_until_the_page_is_read(scores, monkeypatch):
+    pool = scores(not_null=("id",))
+    current = {"id": None}
+    seen_while_reading = []
+    fake_cursor = type(pool._connection.cursor())
+
+    def _fetchall(cursor):
+        seen_while_reading.append(current["id"])
+        return fake_cursor.fetchmany(cursor, 10 ** 9)
+
+    monkeypatch.setattr(fake_cursor, "fetchall", _fetchall)
+    result = db_service.LazyResult(pool, "SELECT id, score FROM scores ORDER BY score", page_size=6,
+                                   on_statement=lambda connection_id: current.update(id=connection_id))
+    _fetch_all(result)
+
+    assert seen_while_reading and all(connection_id == 1 for connection_id in seen_while_reading)
+    assert current["id"] is None
+
+
+def test_trailing_comment_does_not_hide_the_page_limit(fake_pool):
+    pool = fake_pool()
+    pool.raw.execute("CREATE TABLE t (id INTEGER)")
+    pool.raw.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(1, 11)])
+    result = db_service.LazyResult(pool, "SELECT id FROM t -- every row", page_size=4)
+
+    assert len(result.fetch_next_page()) == 4
+    assert pool.statements == ["SELECT id FROM t LIMIT 0, 4"]
@@ -0,0 +1,59 @@
+import pytest
+from services import nlp_service
+from services.translation_cache import TranslationCache
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """generate_content(stream=True) replays `response` in small chunks and counts the calls."""
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False):
+        self.calls += 1
+        return (_Chunk(self.response[i:i + 5]) for i in range(0, len(self.response), 5))
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    translation_cache = TranslationCache(":memory:")
+    monkeypatch.setattr(nlp_service, "get_translation_cache", lambda: translation_cache)
+    return translation_cache
+
+
+def test_valid_sql_is_cached_and_replayed(cache):
+    model = FakeModel("```sql\nSELECT id FROM orders;\n```")
+    statements = []
+    for _ in range(2):
+        sql = nlp_service.nl_to_sql_stream("all orders", "orders(id)", "fp", gemini_model=model,
+                                           on_statement=statements.append)
+        assert sql == "SELECT id FROM orders"
+    assert model.calls == 1
+    assert statements == ["SELECT id FROM orders"] * 2
+
+
+def test_refusal_is_reported_and_not_cached(cache):
+    model = FakeModel("I cannot answer that.")
+    sql = nlp_service.nl_to_sql_stream("delete everything", "orders(id)", "fp", gemini_model=model)
+    assert sql.startswith("Error:") and "I cannot answer that." in sql
+    assert cache.get("delete everything", "fp", nlp_service.MODEL_NAME) is None
+
+
+def test_sql_that_does_not_validate_is_not_cached(cache):
+    model = FakeModel("DELETE FROM orders;")
+    sql = nlp_service.nl_to_sql_stream("remove orders", "orders(id)", "fp", gemini_model=model)
+    assert sql == "DELETE FROM orders" # Returned so the guard can reject it, but never replayed
+    assert cache.get("remove orders", "fp", nlp_service.MODEL_NAME) is None
+
+
+def test_stale_prose_entry_is_not_replayed(cache):
+    cache.put("all orders", "fp", nlp_service.MODEL_NAME, "I cannot answer that.")
+    model = FakeModel("SELECT id FROM orders")
+    assert nlp_service.nl_to_sql_stream("all orders", "orders(id)", "fp", gemini_model=model) == "SELECT id FROM orders"
+    assert model.calls == 1
+    assert cache.get("all orders", "fp", nlp_service.MODEL_NAME) == "SELECT id FROM orders"
@@ -0,0 +1,107 @@
+import pytest
+import sqlglot
+
+from services import query_guard
+
+
+def _needs_limit(sql):
+    return query_guard._needs_limit(sqlglot.parse_one(sql, read="mysql"))
+
+
+def test_nested_loop_multiplies_by_rows_produced_so_far():
+    plan = {"query_block": {"nested_loop": [
+        {"table": {"table_name": "orders", "rows_examined_per_scan": 1000, "rows_produced_per_join": 100}},
+        {"table": {"table_name": "customers", "rows_examined_per_scan": 1, "rows_produced_per_join": 100}},
+        {"table": {"table_name": "items", "rows_examined_per_scan": 5, "rows_produced_per_join": 500}},
+    ]}}
+
+    assert query_guard.estimate_rows_examined(plan) == 1000 + 100 * 1 + 100 * 5
+
+
+def test_derived_tables_and_subqueries_are_counted():
+    plan = {"query_block": {
+        "table": {"table_name": "t", "rows_examined_per_scan": 10,
+                  "materialized_from_subquery": {"query_block": {
+                      "table": {"table_name": "big", "rows_examined_per_scan": 5000}}}},
+        "select_list_subqueries": [{"query_block": {"table": {"table_name": "lookup", "rows_examined_per_scan": 7}}}],
+    }}
+
+    assert query_guard.estimate_rows_examined(plan) == 10 + 5000 + 7
+
+
+def test_mariadb_rows_field_and_string_numbers():
+    assert query_guard.estimate_rows_examined({"query_block": {"table": {"rows": "42"}}}) == 42
+    assert query_guard.estimate_rows_examined({"query_block": {"message": "No tables used"}}) == 0
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM orders", True),
+    ("SELECT id FROM orders LIMIT 5", False),
+    ("SELECT COUNT(*), MAX(total) FROM orders", False),
+    ("SELECT status, COUNT(*) FROM orders GROUP BY status", True),
+    ("SELECT COUNT(*), status FROM orders", True),
+    ("SELECT id FROM a UNION SELECT id FROM b", True),
+    ("SHOW TABLES", False),
+])
+def test_needs_limit(sql, expected):
+    assert _needs_limit(sql) is expected
+
+
+@pytest.fixture
+def guarded_pool(fake_pool, monkeypatch):
+    """A pool whose EXPLAIN estimate is set through pool.estimate."""
+    pool = fake_pool()
+    pool.estimate = 100
+    monkeypatch.setattr(query_guard, "explain_query", lambda connection, sql: {
+        "query_block": {"table": {"table_name": "orders", "rows_examined_per_scan": pool.estimate}}})
+    return pool
+
+
+def test_guard_adds_limit_and_execution_time(guarded_pool):
+    guard = query_guard.guard_query(guarded_pool, "SELECT * FROM orders;", default_limit=50, max_execution_ms=2000)
+
+    assert guard.error is None
+    assert guard.limit_added == 50
+    assert guard.sql.endswith("FROM orders LIMIT 50")
+    assert "MAX_EXECUTION_TIME(2000)" in guard.sql
+    assert guard.estimated_rows_examined == 100
+
+
+def test_guard_rejects_and_warns_on_the_estimate(guarded_pool):
+    guarded_pool.estimate = 5000
+    rejected = query_guard.guard_query(guarded_pool, "SELECT * FROM orders", max_rows_examined=1000)
+    warned = query_guard.guard_query(guarded_pool, "SELECT * FROM orders", max_rows_examined=10_000,
+                                     warn_rows_examined=1000, default_limit=0)
+
+    assert rejected.error.startswith("Error: Query would examine about 5,000 rows")
+    assert warned.error is None and warned.warnings == ["This query will examine about 5,000 rows and may be slow."]
+    assert "LIMIT" not in warned.sql
+
+
+@pytest.mark.parametrize("sql", ["DELETE FROM orders", "SELECT 1; SELECT 2", "SELECT * FROM orders INTO OUTFILE '/tmp/x'",
+                                 "SELECT * INTO DUMPFILE '/tmp/x' FROM orders", "SELECT id INTO @v FROM orders",
+                                 "SELEC * FROM"])
+def test_guard_rejects_without_touching_the_database(guarded_pool, sql):
+    assert query_guard.guard_query(guarded_pool, sql).error.startswith("Error:")
+    assert guarded_pool.statements == []
+
+
+def test_injected_limit_is_not_swallowed_by_a_trailing_comment(guarded_pool):
+    guard = query_guard.guard_query(guarded_pool, "SELECT * FROM orders -- all orders", default_limit=50,
+                                    max_execution_ms=0)
+
+    assert guard.limit_added == 50
+    assert guard.sql == "SELECT * FROM orders LIMIT 50"
+
+
+def test_trailing_comment_is_dropped_when_no_limit_is_added(guarded_pool):
+    guard = query_guard.guard_query(guarded_pool, "SELECT * FROM orders LIMIT 5; # five", default_limit=50)
+
+    assert guard.limit_added is None
+    assert "#" not in guard.sql and guard.sql.endswith("LIMIT 5")
+
+
+@pytest.mark.parametrize("sql", ["SELECT outfile_path, dumpfile FROM exports",
+                                 "SELECT id FROM orders WHERE note = 'sent INTO OUTFILE by mistake'"])
+def test_outfile_words_in_identifiers_and_literals_are_allowed(sql):
+    assert query_guard.validate_sql(sql) is None
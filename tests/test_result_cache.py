@@ -0,0 +1,114 @@
+import datetime
+
+import pandas as pd
+import pytest
+from services.db_service import ResultCache
+
+SCOPE = ("db1.example", "shop")
+OTHER_SCOPE = ("db2.example", "shop")
+MONDAY = datetime.datetime(2024, 1, 1, 9, 0)
+TUESDAY = datetime.datetime(2024, 1, 2, 9, 0)
+
+
+@pytest.mark.parametrize("query, tables", [
+    ("SELECT * FROM orders", ((None, "orders"),)),
+    ("select  *  from   orders", ((None, "orders"),)), # Same normalized key as above
+    ("SELECT o.id FROM shop.orders o JOIN customers c ON c.id = o.customer_id",
+     ((None, "customers"), ("shop", "orders"))),
+    ("WITH recent AS (SELECT * FROM orders) SELECT COUNT(*) FROM recent", ((None, "orders"),)),
+])
+def test_analyze_normalizes_and_lists_tables(query, tables):
+    normalized, found = ResultCache.analyze(query)
+    assert found == tables
+    assert normalized == ResultCache.analyze(normalized)[0]
+
+
+def test_analyze_normalizes_whitespace_and_case():
+    assert ResultCache.analyze("select  *  from   orders")[0] == ResultCache.analyze("SELECT * FROM orders")[0]
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT NOW()",
+    "SELECT * FROM orders WHERE created_at > NOW() - INTERVAL 1 DAY",
+    "SELECT RAND() AS r FROM orders",
+    "SELECT 1", # No table, so nothing to validate the entry against
+    "SELECT * FROM", # Does not parse
+])
+def test_analyze_rejects_uncacheable_queries(query):
+    assert ResultCache.analyze(query) is None
+
+
+@pytest.fixture
+def cache():
+    cache = ResultCache(max_bytes=10 * 1024 * 1024)
+    cache.versions = {(None, "orders"): MONDAY}
+    cache.table_versions = lambda connection, tables: {table: cache.versions.get(table) for table in tables}
+    return cache
+
+
+def _store(cache, query, df, scope=SCOPE, flags=()):
+    cached, pending = cache.lookup(None, query, scope, flags)
+    assert cached is None and pending is not None
+    cache.store(pending, df)
+
+
+def test_hit_while_tables_are_unchanged(cache):
+    df = pd.DataFrame({"id": [1, 2]})
+    _store(cache, "SELECT id FROM orders", df)
+    cached, pending = cache.lookup(None, "select id from orders", SCOPE)
+    assert pending is None
+    assert cached.equals(df)
+    assert cache.stats()["hits"] == 1
+
+
+def test_newer_update_time_invalidates(cache):
+    _store(cache, "SELECT id FROM orders", pd.DataFrame({"id": [1]}))
+    cache.versions[(None, "orders")] = TUESDAY
+    cached, pending = cache.lookup(None, "SELECT id FROM orders", SCOPE)
+    assert cached is None and pending["versions"] == {(None, "orders"): TUESDAY}
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_unknown_update_time_never_hits(cache):
+    cache.versions[(None, "orders")] = None # e.g. a table whose engine does not track it
+    _store(cache, "SELECT id FROM orders", pd.DataFrame({"id": [1]}))
+    assert cache.lookup(None, "SELECT id FROM orders", SCOPE)[0] is None
+
+
+def test_entries_are_scoped_to_the_server_and_database(cache):
+    _store(cache, "SELECT id FROM orders", pd.DataFrame({"id": [1]}))
+    cached, pending = cache.lookup(None, "SELECT id FROM orders", OTHER_SCOPE)
+    assert cached is None and pending is not None
+
+
+def test_flags_are_part_of_the_key(cache):
+    _store(cache, "SELECT id FROM orders", pd.DataFrame({"id": [1]}))
+    assert cache.lookup(None, "SELECT id FROM orders", SCOPE, ("categorize",))[0] is None
+    assert cache.lookup(None, "SELECT id FROM orders", SCOPE)[0] is not None
+
+
+def test_guarded_sql_is_a_different_entry(cache):
+    _store(cache, "SELECT id FROM orders LIMIT 10000", pd.DataFrame({"id": [1]}))
+    assert cache.lookup(None, "SELECT id FROM orders", SCOPE)[0] is None
+
+
+def test_lru_eviction_and_size_cap():
+    cache = ResultCache(max_bytes=40_000)
+    cache.table_versions = lambda connection, tables: {table: MONDAY for table in tables}
+    big = pd.DataFrame({"x": range(1_000)}) # 8 kB: under a quarter of the cap
+    for name in ("a", "b", "c", "d", "e"):
+        _store(cache, f"SELECT x FROM {name}", big)
+    assert cache.stats()["bytes"] <= 40_000
+    assert cache.lookup(None, "SELECT x FROM a", SCOPE)[0] is None # Least recently used went first
+    assert cache.lookup(None, "SELECT x FROM e", SCOPE)[0] is not None
+
+    huge = pd.DataFrame({"x": range(5_000)}) # Over a quarter of the cap: not stored at all
+    _store(cache, "SELECT x FROM f", huge)
+    assert cache.lookup(None, "SELECT x FROM f", SCOPE)[0] is None
+
+
+def test_clear(cache):
+    _store(cache, "SELECT id FROM orders", pd.DataFrame({"id": [1]}))
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+    assert cache.lookup(None, "SELECT id FROM orders", SCOPE)[0] is None
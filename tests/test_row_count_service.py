@@ -0,0 +1,24 @@
+from services import row_count_service
+
+
+def test_one_failing_table_does_not_stop_the_others(fake_pool, monkeypatch):
+    pool = fake_pool()
+    for table, rows in (("a", 3), ("b", 5), ("c", 7)):
+        pool.raw.execute(f"CREATE TABLE {table} (id INTEGER)")
+        pool.raw.executemany(f"INSERT INTO {table} VALUES (?)", [(i,) for i in range(rows)])
+
+    count_rows_exact = row_count_service.count_rows_exact
+
+    def _flaky(connection, table_name, *args, **kwargs):
+        if table_name == "b":
+            raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+        return count_rows_exact(connection, table_name, *args, use_cache=False, **kwargs)
+
+    monkeypatch.setattr(row_count_service, "count_rows_exact", _flaky)
+    results = {}
+    row_count_service.refine_row_counts(pool, ["a", "b", "c"], max_concurrency=1,
+                                        on_count=lambda table, count, error: results.update({table: (count, error)}))
+
+    assert results["a"] == (3, None)
+    assert results["c"] == (7, None)
+    assert results["b"][0] is None and isinstance(results["b"][1], UnicodeDecodeError)
@@ -0,0 +1,88 @@
+from services import schema_retrieval
+from services.schema_catalog import SchemaCatalog
+
+
+def _table(columns, primary_key=("id",), foreign_keys=(), comment=""):
+    return {
+        "type": "BASE TABLE", "row_estimate": 1000, "comment": comment,
+        "columns": [{"name": name, "type": "int", "comment": ""} for name in columns],
+        "primary_key": list(primary_key),
+        "foreign_keys": [{"columns": [column], "ref_table": ref_table, "ref_columns": ["id"]}
+                         for column, ref_table in foreign_keys],
+    }
+
+
+def _catalog(fingerprint="v1"):
+    tables = {
+        "customers": _table(["id", "name", "email", "signup_country"]),
+        "orders": _table(["id", "customer_id", "total_amount", "created_at"], foreign_keys=[("customer_id", "customers")]),
+        "orders_archive_2019": _table(["id", "customer_id", "total_amount", "created_at"]),
+        "products": _table(["id", "title", "price"]),
+        "warehouses": _table(["id", "city", "capacity"]),
+    }
+    for i in range(40): # Filler, so the whole schema is over the token budget
+        tables[f"audit_log_{i:02d}"] = _table(["id", "actor", "action", "payload", "logged_at"])
+    return SchemaCatalog("shop", fingerprint, tables)
+
+
+def test_tokenize_splits_identifiers_and_stems():
+    assert schema_retrieval.tokenize("customerOrders total_amount of the Categories") == [
+        "customer", "order", "total", "amount", "category"]
+
+
+def test_exact_table_name_beats_its_archive_copy():
+    ranked = schema_retrieval.get_schema_index(_catalog()).rank_tables("How many orders were placed?")
+
+    assert ranked[0] == "orders"
+    assert ranked.index("orders_archive_2019") > ranked.index("customers")
+
+
+def test_foreign_key_neighbours_are_pulled_in():
+    ranked = schema_retrieval.get_schema_index(_catalog()).rank_tables("total amount of orders")
+
+    assert "customers" in ranked[:3]
+    assert "warehouses" not in ranked
+
+
+def test_relevant_columns_keep_keys_and_matching_columns():
+    index = schema_retrieval.get_schema_index(_catalog())
+
+    assert index.relevant_columns("orders", "total amount by month") == {"id", "customer_id", "total_amount"}
+
+
+def test_prompt_stays_within_budget_and_leads_with_matches():
+    catalog = _catalog()
+    full = catalog.to_prompt_string()
+    budget = schema_retrieval.estimate_tokens(full) // 4
+
+    prompt = schema_retrieval.select_relevant_schema(catalog, "revenue: total amount of orders per customer", budget)
+
+    assert schema_retrieval.estimate_tokens(prompt) <= budget
+    assert prompt.splitlines()[0].startswith("orders")
+    assert "customers" in prompt and "warehouses" not in prompt
+
+
+def test_small_schema_is_sent_whole():
+    catalog = _catalog()
+
+    assert schema_retrieval.select_relevant_schema(catalog, "anything", token_budget=10 ** 6) == catalog.to_prompt_string()
+
+
+def test_index_is_rebuilt_when_the_fingerprint_changes():
+    first = schema_retrieval.get_schema_index(_catalog("v1"))
+
+    assert schema_retrieval.get_schema_index(_catalog("v1")) is first
+    assert schema_retrieval.get_schema_index(_catalog("v2")) is not first
+
+
+def test_child_tables_are_not_treated_as_copies():
+    tables = {
+        "orders": _table(["id", "customer_id", "total_amount", "status"]),
+        "orders_items": _table(["id", "orders_id", "product", "quantity"], foreign_keys=[("orders_id", "orders")]),
+        "orders_2019": _table(["id", "customer_id", "total_amount", "status"]),
+        "orders_snapshot": _table(["id", "customer_id", "total_amount", "status"]),
+    }
+    ranked = schema_retrieval.SchemaIndex(SchemaCatalog("shop", "v3", tables)).rank_tables("orders status")
+
+    assert ranked[:2] == ["orders", "orders_items"]
+    assert set(ranked[2:]) == {"orders_2019", "orders_snapshot"}
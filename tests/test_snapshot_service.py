@@ -0,0 +1,58 @@
+import threading
+
+from services import snapshot_service
+
+
+class _RecordingSnapshot:
+    engine = "test"
+
+    def __init__(self):
+        self.connections = []
+
+    def sync(self, connection, catalog, tables, watermark_columns, cancel_event, connection_details=None):
+        self.connections.append(connection)
+        return {"t": 1}
+
+
+class _Catalog:
+    database = "test"
+
+
+def test_sync_uses_a_dedicated_connection_not_the_pool(fake_pool, monkeypatch):
+    pool = fake_pool()
+    snapshot = _RecordingSnapshot()
+    dedicated = object()
+    closed = []
+    monkeypatch.setattr(snapshot_service, "get_snapshot", lambda pool: snapshot)
+    monkeypatch.setattr(snapshot_service.schema_catalog, "get_schema_catalog", lambda pool: _Catalog())
+    monkeypatch.setattr(snapshot_service.db_service, "connect_to_db", lambda *details: dedicated)
+    monkeypatch.setattr(snapshot_service.db_service, "disconnect_from_db", closed.append)
+    monkeypatch.setattr(pool, "connection", None) # Any pooled checkout would fail
+
+    assert snapshot_service.sync_snapshot(pool) == {"t": 1}
+    assert snapshot.connections == [dedicated]
+    assert closed == [dedicated]
+
+
+def test_sync_threads_never_overlap(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def _sync(pool, cancel_event=None):
+        calls.append(pool)
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(snapshot_service, "sync_snapshot", _sync)
+    try:
+        assert snapshot_service.start_sync_thread("first")
+        assert started.wait(2)
+        assert not snapshot_service.start_sync_thread("second")
+    finally:
+        release.set()
+    snapshot_service._sync_thread.join(2)
+
+    assert snapshot_service.start_sync_thread("third")
+    snapshot_service._sync_thread.join(2)
+    assert calls == ["first", "third"]
@@ -0,0 +1,55 @@
+import pytest
+from services.sql_extractor import SqlStreamExtractor, extract_sql
+
+CASES = [
+    ("```sql\nSELECT id FROM orders;\n```", "SELECT id FROM orders"),
+    ("```sql\nSELECT id\nFROM orders\n```\nThis lists every order.", "SELECT id\nFROM orders"),
+    ("```\nSELECT 1\n\nFROM dual\n```", "SELECT 1\n\nFROM dual"),
+    ("Here is the query:\nSELECT name FROM customers;", "SELECT name FROM customers"),
+    ("SELECT 'a;b', `weird;col` FROM t -- trailing; comment\n;", "SELECT 'a;b', `weird;col` FROM t -- trailing; comment"),
+    ("SELECT 1 /* ; */ + 1;", "SELECT 1 /* ; */ + 1"),
+    ("SELECT 'it\\'s;' AS s;", "SELECT 'it\\'s;' AS s"),
+    # Inline code ends at its closing backtick, not at the end of the sentence
+    ("`SELECT * FROM t` is the query.", "SELECT * FROM t"),
+    ("Try this: \n`SELECT COUNT(*) FROM orders`", "SELECT COUNT(*) FROM orders"),
+    # Bare SQL ends at a blank line followed by prose, but not at one followed by more SQL
+    ("SELECT 1\n\nThis query selects one.", "SELECT 1"),
+    ("SELECT a,\n  b\nFROM t\n\nWHERE x = 1\n\nNote: filters on x.", "SELECT a,\n  b\nFROM t\n\nWHERE x = 1"),
+    ("SELECT a FROM t\n\n  ORDER BY a", "SELECT a FROM t\n\n  ORDER BY a"),
+    # No line that starts like SQL: nothing is extracted
+    ("I cannot answer that.", ""),
+    ("Sorry,\nthe schema has no such table.", ""),
+    ("", ""),
+]
+
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_extract_sql(text, expected):
+    assert extract_sql(text) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7])
+@pytest.mark.parametrize("text, expected", CASES)
+def test_streamed_chunks_give_the_same_statement(text, expected, chunk_size):
+    extractor = SqlStreamExtractor()
+    for start in range(0, len(text), chunk_size):
+        if extractor.feed(text[start:start + chunk_size]) is not None:
+            break
+    assert extractor.finish() == expected
+
+
+def test_statement_completes_before_the_stream_ends():
+    extractor = SqlStreamExtractor()
+    assert extractor.feed("```sql\nSELECT id FROM orders") is None
+    assert extractor.partial_sql == "SELECT id FROM orders"
+    assert extractor.feed(";\n``` and some explanation") == "SELECT id FROM orders"
+    assert extractor.complete
+    assert extractor.feed("more text") is None
+
+
+def test_partial_sql_is_empty_until_sql_starts():
+    extractor = SqlStreamExtractor()
+    extractor.feed("Here is the ")
+    assert extractor.partial_sql == ""
+    extractor.feed("query:\nSELECT na")
+    assert extractor.partial_sql == "SELECT na"
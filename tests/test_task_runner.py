@@ -0,0 +1,24 @@
+import threading
+
+from core.task_runner import TaskRunner
+
+
+class _FakeTkRoot:
+    def after(self, delay_ms, callback):
+        pass
+
+
+def test_detached_work_runs_while_every_worker_is_busy():
+    runner = TaskRunner(_FakeTkRoot(), max_workers=2)
+    release = threading.Event()
+    ran = threading.Event()
+    try:
+        for _ in range(4):
+            runner.submit(release.wait)
+        runner.run_detached(ran.set)
+
+        assert ran.wait(2)
+    finally:
+        release.set()
+        runner.shutdown()
+
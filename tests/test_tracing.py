@@ -0,0 +1,44 @@
+import pytest
+
+from core.tracing import Tracer, percentile
+
+
+@pytest.mark.parametrize("pct, expected", [(0, 1), (10, 1), (30, 3), (50, 5), (90, 9), (95, 10), (100, 10)])
+def test_percentile_is_nearest_rank(pct, expected):
+    assert percentile(list(range(10, 0, -1)), pct) == expected
+
+
+def test_percentile_of_one_value():
+    assert percentile([7.5], 50) == 7.5
+    assert percentile([7.5], 95) == 7.5
+
+
+def test_stage_stats_summarize_durations_errors_and_payloads():
+    tracer = Tracer(capacity=10, enabled=True)
+    with tracer.span("db.query", rows=10):
+        pass
+    with pytest.raises(ValueError):
+        with tracer.span("db.query", rows=30):
+            raise ValueError
+    with tracer.span("llm.generate"):
+        pass
+
+    stats = tracer.stage_stats()
+
+    assert stats["db.query"]["count"] == 2
+    assert stats["db.query"]["errors"] == 1
+    assert stats["db.query"]["rows"] == 20
+    assert "rows" not in stats["llm.generate"]
+
+
+def test_disabled_tracer_records_nothing_and_ring_buffer_is_bounded():
+    disabled = Tracer(capacity=10, enabled=False)
+    with disabled.span("a"):
+        pass
+    assert disabled.spans() == []
+
+    bounded = Tracer(capacity=3, enabled=True)
+    for i in range(5):
+        with bounded.span("a", rows=i):
+            pass
+    assert [span.attrs["rows"] for span in bounded.spans()] == [2, 3, 4]
@@ -0,0 +1,90 @@
+import pytest
+
+from services import translation_cache
+from services.translation_cache import TranslationCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls time.time() inside translation_cache."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(translation_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_normalize_question_keeps_decimal_points():
+    assert translation_cache.normalize_question("  Orders over $9.99?  Thanks.") == "orders over 9.99 thanks"
+
+
+@pytest.mark.parametrize("first, second", [
+    ("orders with amount > 100", "orders with amount < 100"),
+    ("orders with amount >= 100", "orders with amount = 100"),
+    ("status != 'open'", "status = 'open'"),
+    ("accounts with balance below -5", "accounts with balance below 5"),
+])
+def test_comparisons_and_signs_give_different_keys(first, second):
+    cache = TranslationCache(":memory:", fuzzy_threshold=0.5)
+    cache.put(first, "fp", "m", "SELECT 1")
+
+    assert translation_cache.normalize_question(first) != translation_cache.normalize_question(second)
+    assert cache.get(second, "fp", "m") is None
+
+
+def test_operators_are_tokens_however_they_are_spaced():
+    assert translation_cache.normalize_question("Amount>=100!") == translation_cache.normalize_question("amount >= 100")
+
+
+def test_hit_needs_same_question_schema_and_model():
+    cache = TranslationCache(":memory:")
+    cache.put("How many orders?", "fp1", "model-a", "SELECT COUNT(*) FROM orders")
+
+    assert cache.get("how many   ORDERS", "fp1", "model-a") == "SELECT COUNT(*) FROM orders"
+    assert cache.get("How many orders?", "fp2", "model-a") is None
+    assert cache.get("How many orders?", "fp1", "model-b") is None
+    assert cache.stats()["memory_hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache" / "translations.sqlite3")
+    TranslationCache(path).put("top customers", "fp", "m", "SELECT 1")
+
+    reopened = TranslationCache(path)
+
+    assert reopened.get("top customers", "fp", "m") == "SELECT 1"
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = TranslationCache(":memory:", ttl_s=60)
+    cache.put("q", "fp", "m", "SELECT 1")
+
+    clock[0] += 59
+    assert cache.get("q", "fp", "m") == "SELECT 1"
+    clock[0] += 2
+    assert cache.get("q", "fp", "m") is None
+    assert cache.stats()["disk_entries"] == 0
+
+
+def test_memory_and_disk_are_capped_least_recently_used_first(clock):
+    cache = TranslationCache(":memory:", max_memory_entries=2, max_disk_entries=2)
+    for question in ("a", "b"):
+        cache.put(question, "fp", "m", f"SELECT '{question}'")
+        clock[0] += 1
+    cache.get("a", "fp", "m") # b is now the least recently used
+    clock[0] += 1
+    cache.put("c", "fp", "m", "SELECT 'c'")
+
+    stats = cache.stats()
+    assert stats["memory_entries"] == 2 and stats["disk_entries"] == 2
+    assert cache.get("b", "fp", "m") is None
+    assert cache.get("a", "fp", "m") == "SELECT 'a'"
+
+
+def test_fuzzy_match_requires_the_same_numbers():
+    cache = TranslationCache(":memory:", fuzzy_threshold=0.6)
+    cache.put("top 5 customers by total revenue", "fp", "m", "SELECT ... LIMIT 5")
+
+    assert cache.get("top 5 customers by revenue total please", "fp", "m") == "SELECT ... LIMIT 5"
+    assert cache.get("top 10 customers by total revenue", "fp", "m") is None
+    assert cache.get("weather in paris", "fp", "m") is None
+    assert cache.stats()["fuzzy_hits"] == 1